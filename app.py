@@ -1,11 +1,18 @@
 import streamlit as st
-import requests
 import json
-import re
 import time
-import ast # 新增：用于处理类 Python 字典格式
 import datetime # 新增：用于记录收藏时间
-import os  # 新增：用于文件持久化操作
+import os
+import hashlib
+from nuclear_check import tracing, usage  # 埋点 (span + Prometheus 指标) 与用量统计
+from nuclear_check import links  # 链接/DOI 校验 (共享缓存)
+from nuclear_check import render  # 卡片 HTML (每张卡片一个元素，带缓存)
+from nuclear_check import favorites as fav_store
+from nuclear_check.pipelines import PipelineError, note_rerequest, run_check, run_search, run_search_more, append_search_page, run_rewrite
+from nuclear_check.batch import load_claims, run_batch, read_results, results_to_csv
+from nuclear_check.paper_index import get_default_index
+from nuclear_check.query_cache import get_default_cache
+from nuclear_check.blobstore import SessionMemory, get_default_store
 
 # --- 1. 页面配置 (必须在最前面) ---
 st.set_page_config(
@@ -15,34 +22,23 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- 0. 持久化存储模块 (新增) ---
-FAV_FILE = "favorites.json"
+# 埋点：每次脚本运行分配一个请求 ID；按需启动旁路指标端点
+tracing.start_metrics_server()
+tracing.begin_request("rerun")
 
+# --- 0. 持久化存储模块 (核心实现见 nuclear_check.favorites) ---
 def get_fav_file_path():
     """根据当前用户ID生成文件名，实现多用户隔离"""
-    user_id = st.session_state.get("user_id", "default").strip()
-    if not user_id: user_id = "default"
-    # 过滤非法字符，防止文件名错误
-    safe_id = re.sub(r'[^a-zA-Z0-9_\u4e00-\u9fa5]', '_', user_id)
-    return f"favorites_{safe_id}.json"
+    return fav_store.get_fav_file_path(st.session_state.get("user_id", "default"))
 
 def load_favorites():
     """从当前用户的本地文件加载收藏"""
-    file_path = get_fav_file_path()
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+    return fav_store.load_favorites(st.session_state.get("user_id", "default"))
 
 def save_favorites():
     """保存收藏到当前用户的本地文件"""
-    file_path = get_fav_file_path()
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(st.session_state["favorites"], f, ensure_ascii=False, indent=4)
+        fav_store.save_favorites(st.session_state.get("user_id", "default"), get_favorites())
     except Exception as e:
         st.error(f"保存失败: {e}")
 
@@ -50,8 +46,16 @@ def save_favorites():
 if "user_id" not in st.session_state:
     st.session_state["user_id"] = "default"
 
-if "favorites" not in st.session_state:
-    st.session_state["favorites"] = load_favorites()
+# 结果与收藏夹存放在进程级共享存储中 (压缩 + 去重)，session_state 只保存引用；
+# 单会话超出上限时淘汰最久未访问的槽位，收藏夹被淘汰后从文件重新加载
+mem = SessionMemory(st.session_state, loaders={"favorites": load_favorites})
+
+def get_favorites():
+    """当前用户的收藏列表 (副本，可直接修改后 set_favorites)"""
+    return list(mem.get("favorites") or [])
+
+def set_favorites(favorites):
+    mem.put("favorites", favorites)
 
 # 结果缓存 (防止刷新丢失当前页面内容)
 if "check_result" not in st.session_state:
@@ -60,6 +64,11 @@ if "search_result" not in st.session_state:
     st.session_state["search_result"] = None
 if "rewrite_result" not in st.session_state:
     st.session_state["rewrite_result"] = None
+if "batch_result" not in st.session_state:
+    st.session_state["batch_result"] = None
+
+# 批量核查结果目录 (以上传文件内容哈希命名，重新上传同一文件即可断点续跑)
+BATCH_DIR = "batch_runs"
 
 # --- 2. 获取 API Key (双重保险模式) ---
 try:
@@ -206,6 +215,50 @@ st.markdown("""
             border: 1px solid #cbd5e0;
         }
         
+        /* 链接校验徽标 */
+        .link-badge {
+            display: inline-block;
+            padding: 1px 6px;
+            border-radius: 4px;
+            font-size: 0.72em;
+            margin-right: 8px;
+            vertical-align: middle;
+        }
+        .link-badge.ok { background-color: #1c4532; color: #9ae6b4; border: 1px solid #2f855a; }
+        .link-badge.dead { background-color: #4a1515; color: #feb2b2; border: 1px solid #9b2c2c; }
+        .link-badge.unknown, .link-badge.pending { background-color: #2d3748; color: #a0aec0; border: 1px solid #4a5568; }
+
+        /* 收藏列表 */
+        .fav-item {
+            padding: 4px 0 4px 12px;
+            margin-top: 8px;
+        }
+        .fav-time {
+            color: #a0aec0;
+            font-size: 0.85em;
+            margin: 2px 0 6px 0;
+        }
+        .fav-item summary {
+            cursor: pointer;
+            color: #cbd5e0;
+            font-size: 0.9em;
+        }
+        .fav-detail {
+            padding: 10px 0 4px 0;
+            line-height: 1.6;
+        }
+        .fav-note {
+            border-radius: 6px;
+            padding: 10px 14px;
+            margin: 8px 0;
+        }
+        .fav-note.info { background-color: rgba(28, 131, 225, 0.1); color: #c3dafe; }
+        .fav-note.warn { background-color: rgba(255, 193, 7, 0.1); color: #fefcbf; }
+        .fav-draft {
+            font-family: monospace;
+            white-space: pre-wrap;
+        }
+
         /* 用户ID输入框美化 */
         .user-input {
             border-bottom: 2px solid #4fd1c5;
@@ -213,157 +266,7 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# --- 4. 核心函数：获取模型轮换列表 (Model Rotation) ---
-def get_prioritized_models(api_key):
-    """
-    返回一个按优先级排序的可用模型列表。
-    """
-    if not api_key: return [], "API Key 未配置"
-    url = f"https://generativelanguage.googleapis.com/v1beta/models?key={api_key}"
-    try:
-        response = requests.get(url)
-        if response.status_code != 200:
-            return [], f"连接失败: {response.text}"
-        
-        data = response.json()
-        models = data.get('models', [])
-        
-        available_names = [m['name'] for m in models if 'generateContent' in m.get('supportedGenerationMethods', [])]
-        
-        if not available_names: return [], "未找到任何可用模型"
-
-        priority_keywords = [
-            'gemini-1.5-flash',
-            'gemini-1.5-flash-8b',
-            'gemini-2.0-flash',
-            'gemini-2.5-flash',
-            'gemini-1.5-pro'
-        ]
-
-        sorted_models = []
-        for kw in priority_keywords:
-            for name in available_names:
-                if kw in name and name not in sorted_models:
-                    sorted_models.append(name)
-        
-        for name in available_names:
-            if name not in sorted_models:
-                sorted_models.append(name)
-
-        return sorted_models, "Success"
-
-    except Exception as e:
-        return [], str(e)
-
-# --- 5. 增强版 API 调用：支持模型自动切换 ---
-def smart_api_call(model_list, payload, api_key, status_box=None):
-    """
-    智能调用函数：自动轮询模型，处理 429/400 错误
-    """
-    last_error = None
-    
-    for i, model_name in enumerate(model_list):
-        if not model_name.startswith("models/"): 
-            full_model_name = f"models/{model_name}"
-        else:
-            full_model_name = model_name
-            
-        api_url = f"https://generativelanguage.googleapis.com/v1beta/{full_model_name}:generateContent?key={api_key}"
-        
-        if status_box:
-            status_box.write(f"🔄 正在尝试模型节点 ({i+1}/{len(model_list)}): `{model_name.replace('models/', '')}` ...")
-        
-        try:
-            response = requests.post(api_url, headers={'Content-Type': 'application/json'}, json=payload)
-            
-            if response.status_code == 200:
-                return response
-            
-            elif response.status_code == 400:
-                if "tools" in payload:
-                    if status_box: status_box.write("⚠️ 检测到工具兼容性问题，正在切换至纯文本分析模式...")
-                    payload_no_tools = payload.copy()
-                    del payload_no_tools["tools"]
-                    response_retry = requests.post(api_url, headers={'Content-Type': 'application/json'}, json=payload_no_tools)
-                    if response_retry.status_code == 200:
-                        return response_retry
-                last_error = response
-                continue
-
-            elif response.status_code in [429, 503, 500]:
-                if status_box: status_box.write(f"⏳ 模型 `{model_name}` 繁忙或配额耗尽，自动切换下一节点...")
-                time.sleep(1)
-                last_error = response
-                continue
-            
-            else:
-                last_error = response
-                continue
-
-        except Exception as e:
-            if status_box: status_box.write(f"❌ 网络异常: {e}")
-            continue
-
-    return last_error
-
-# --- 6. 辅助函数：安全提取与解析 ---
-def get_response_text(response):
-    """安全提取响应文本，避免 IndexError"""
-    if not response: return None
-    try:
-        data = response.json()
-        if 'candidates' in data and data['candidates']:
-            parts = data['candidates'][0].get('content', {}).get('parts', [])
-            if parts:
-                return parts[0].get('text', '')
-        return None
-    except Exception as e:
-        return None
-
-def parse_json_response(text):
-    if not text: return None
-    try:
-        return json.loads(text)
-    except:
-        pass
-    
-    try:
-        clean_text = re.sub(r'```json\s*', '', text)
-        clean_text = re.sub(r'```\s*$', '', clean_text)
-        clean_text = clean_text.strip()
-        return json.loads(clean_text)
-    except:
-        pass
-
-    try:
-        start_obj = text.find('{')
-        start_list = text.find('[')
-        
-        if start_obj == -1 and start_list == -1:
-            return None
-            
-        if start_obj != -1 and (start_list == -1 or start_obj < start_list):
-            start = start_obj
-            end_char = '}'
-        else:
-            start = start_list
-            end_char = ']'
-            
-        end = text.rfind(end_char)
-        if end != -1 and end > start:
-            json_str = text[start : end+1]
-            return json.loads(json_str)
-    except:
-        pass
-
-    try:
-        if start_obj != -1 and end != -1:
-             potential_dict = text[start : end+1]
-             return ast.literal_eval(potential_dict)
-    except:
-        pass
-
-    return None
+# --- 4~6. 模型轮换、API 调用与结果解析：见 nuclear_check 包 ---
 
 # --- 新增：收藏功能函数 (颗粒度+持久化) ---
 def add_to_favorites(category, title, content_data):
@@ -372,32 +275,21 @@ def add_to_favorites(category, title, content_data):
     title: 简短标题
     content_data: 完整数据 (JSON或文本)
     """
-    # 1. 查重
-    for item in st.session_state["favorites"]:
-        if item['category'] == category and item['content'] == content_data:
-            st.toast("⚠️ 该内容已在收藏夹中", icon="👀")
-            return
-
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    item = {
-        "id": f"{category}_{int(time.time()*1000)}",
-        "category": category,
-        "title": title[:50] + "..." if len(title) > 50 else title, # 限制标题长度
-        "content": content_data,
-        "time": timestamp
-    }
-    
-    # 2. 添加到 Session
-    st.session_state["favorites"].append(item)
+    # 1. 查重 + 添加到 Session
+    favorites = get_favorites()
+    if fav_store.add_favorite(favorites, category, title, content_data) is None:
+        st.toast("⚠️ 该内容已在收藏夹中", icon="👀")
+        return
+    set_favorites(favorites)
     
-    # 3. 保存到本地文件 (持久化)
+    # 2. 保存到本地文件 (持久化)
     save_favorites()
     
     st.toast(f"✅ 已收藏: {title[:15]}...", icon="⭐")
 
 def delete_favorite(item_id):
     # 根据 ID 删除
-    st.session_state["favorites"] = [item for item in st.session_state["favorites"] if item['id'] != item_id]
+    set_favorites(fav_store.delete_favorite(get_favorites(), item_id))
     save_favorites()
     st.rerun()
 
@@ -415,7 +307,7 @@ with st.sidebar:
     
     if user_id_input != st.session_state["user_id"]:
         st.session_state["user_id"] = user_id_input
-        st.session_state["favorites"] = load_favorites() # 切换用户时重新加载数据
+        set_favorites(load_favorites()) # 切换用户时重新加载数据
         st.rerun()
     
     st.caption(f"当前数据文件: `{get_fav_file_path()}`")
@@ -425,6 +317,18 @@ with st.sidebar:
         st.warning("🔒 未检测到 API Key")
         API_KEY = st.text_input("请在此临时粘贴 API Key:", type="password", help="建议在 Streamlit Secrets 中配置")
     
+    # --- 用量与延迟看板 ---
+    with st.expander("📈 用量与延迟看板", expanded=False):
+        usage_records = list(usage.usage_store)
+        if not usage_records:
+            st.caption("暂无调用记录")
+        else:
+            st.caption(f"最近 {len(usage_records)} 次调用 (日志: `{usage.USAGE_LOG_FILE}`)；p50/p95 为含重试与退避的端到端耗时")
+            st.markdown("**按功能**")
+            st.dataframe(usage.summarize_usage(usage_records, "feature"), hide_index=True, use_container_width=True)
+            st.markdown("**按模型**")
+            st.dataframe(usage.summarize_usage(usage_records, "model"), hide_index=True, use_container_width=True)
+
     st.caption("Powered by Google Gemini & Streamlit")
 
 st.title("Nuclear Knowledge Hub")
@@ -443,6 +347,56 @@ with tab1:
         user_text_check = st.text_area("待核查文本", height=400, label_visibility="collapsed", placeholder="在此粘贴待核实信息...\n例如：中国现在有58座核电站？", key="input_check")
         check_btn = st.button("🚀 开始深度核查", type="primary", use_container_width=True, key="btn_check")
 
+        # --- 批量核查 (CSV/JSONL) ---
+        with st.expander("📦 批量核查 (上传 CSV/JSONL)", expanded=False):
+            batch_file = st.file_uploader("陈述文件：CSV 需含 claim 列，JSONL 每行含 claim 字段，JSON 为陈述对象/字符串的数组", type=["csv", "jsonl", "json"], key="batch_upload")
+            bc1, bc2 = st.columns(2)
+            with bc1:
+                batch_workers = st.number_input("并发数", min_value=1, max_value=16, value=4, key="batch_workers")
+            with bc2:
+                batch_rate = st.number_input("每秒请求上限", min_value=0.0, max_value=20.0, value=1.0, step=0.5, key="batch_rate", help="0 表示不限速")
+            batch_btn = st.button("▶️ 开始 / 继续批量核查", use_container_width=True, key="btn_batch", disabled=batch_file is None)
+
+            if batch_btn and batch_file is not None:
+                if not API_KEY:
+                    st.error("🔒 请在侧边栏输入 API Key")
+                else:
+                    content = batch_file.getvalue()
+                    try:
+                        claims, claim_errors = load_claims(content=content, fmt="csv" if batch_file.name.lower().endswith(".csv") else "jsonl")
+                    except Exception as e:
+                        claims, claim_errors = [], []
+                        st.error(f"文件解析失败: {e}")
+                    if claim_errors:
+                        st.warning(f"已跳过 {len(claim_errors)} 行无法解析的内容：" + "；".join(claim_errors[:5]))
+                    if claims:
+                        os.makedirs(BATCH_DIR, exist_ok=True)
+                        output_path = os.path.join(BATCH_DIR, f"batch_{hashlib.sha1(content).hexdigest()[:12]}.jsonl")
+                        batch_bar = st.progress(0.0, text=f"共 {len(claims)} 条，正在核查...")
+
+                        def on_batch_result(row, done, total):
+                            batch_bar.progress(done / total, text=f"{done}/{total} · #{row['id']} {row['status']} ({row['elapsed_ms']:.0f}ms)")
+
+                        summary = run_batch(claims, API_KEY, output_path, workers=int(batch_workers), rate=float(batch_rate), on_result=on_batch_result)
+                        st.session_state["batch_result"] = {"path": output_path, "name": batch_file.name, "summary": summary}
+
+            if st.session_state.get("batch_result"):
+                batch_res = st.session_state["batch_result"]
+                summary = batch_res["summary"]
+                st.success(f"完成 {summary['total']} 条 (续跑跳过 {summary['skipped']})：✅ {summary['ok']} · ⚠️ 未解析 {summary['unparsed']} · ❌ 失败 {summary['error']}，耗时 {summary['elapsed_s']}s")
+                batch_rows = read_results(batch_res["path"])
+                st.dataframe(
+                    [{"id": r["id"], "status": r["status"], "verdicts": " / ".join(r.get("verdicts") or []), "elapsed_ms": r.get("elapsed_ms"), "claim": r["claim"]} for r in batch_rows],
+                    hide_index=True, use_container_width=True
+                )
+                base_name = os.path.splitext(batch_res["name"])[0]
+                dl1, dl2 = st.columns(2)
+                with dl1:
+                    jsonl_str = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch_rows)
+                    st.download_button("📥 结果 (JSONL)", data=jsonl_str, file_name=f"{base_name}_results.jsonl", mime="application/json", use_container_width=True)
+                with dl2:
+                    st.download_button("📥 结果 (CSV)", data=results_to_csv(batch_rows), file_name=f"{base_name}_results.csv", mime="text/csv", use_container_width=True)
+
     with col2_check:
         st.markdown("#### 📊 核查报告")
         
@@ -452,118 +406,38 @@ with tab1:
                 st.error("🔒 请在侧边栏输入 API Key")
             else:
                 status_box = st.status("正在启动多模型引擎...", expanded=True)
-                model_list, msg = get_prioritized_models(API_KEY)
-                
-                if not model_list:
-                    status_box.update(label="初始化失败", state="error")
-                    st.error(f"无法获取模型列表: {msg}")
-                else:
-                    # --- 完整 Prompt (未修改) ---
-                    prompt_check = f"""
-                    你是一个严谨的核聚变与等离子体物理专家，同时拥有实时联网核查的能力。
-                    请利用 Google Search 工具，核查以下文本中的每一个事实陈述。
-
-                    **用户输入文本：**
-                    '''{user_text_check}'''
-
-                    **重要指示：**
-                    1. **多源数据对比**：如果不同权威机构的数据不一致（例如 IAEA 数据 vs 中国核能行业协会数据），**请不要只给出一个数字**，而必须将各方数据分别列出。
-                    2. **原文引用 (双语)**：
-                       - 对于每一个数据点，必须引用查找资料的原话。
-                       - **关键要求**：如果引用的原文是英文，**必须**在后面附带中文翻译。
-                       - 格式示例："The reactor has... (译文: 该反应堆拥有...)"。
-                    3. **实时性**：以搜索到的最新官方报告为准。
-
-                    **输出格式要求（非常重要）：**
-                    **严禁输出任何开场白或结束语（如"好的"、"以下是结果"）。**
-                    **严禁在 JSON 内部使用未转义的换行符。**
-                    **仅输出**以下 JSON 列表格式：
-                    [
-                        {{
-                            "claim": "原文中的陈述",
-                            "status": "正确/错误/存疑/数据不一致",
-                            "correction": "综合分析。如果数据冲突，请在此说明差异原因。",
-                            "evidence_list": [
-                                {{
-                                    "source_name": "机构名称",
-                                    "content": "具体描述/数据 (如果是英文请附带中文翻译)",
-                                    "url": "来源链接"
-                                }}
-                            ]
-                        }}
-                    ]
-                    """
-                    
-                    payload = {"contents": [{"parts": [{ "text": prompt_check }]}], "tools": [{"google_search": {}}]}
-                    response = smart_api_call(model_list, payload, API_KEY, status_box)
-                    
-                    # 使用新的安全提取函数
-                    raw_content = get_response_text(response)
-
-                    if raw_content:
-                        check_results = parse_json_response(raw_content)
-                        status_box.update(label="分析完成", state="complete", expanded=False)
-                        st.session_state["check_result"] = {"data": check_results, "raw": raw_content}
+                try:
+                    note_rerequest("check", mem.get("check_result"))
+                    mem.put("check_result", run_check(user_text_check, API_KEY, status_box, verify_links=True))
+                    status_box.update(label="分析完成", state="complete", expanded=False)
+                except PipelineError as e:
+                    if e.stage == "models":
+                        status_box.update(label="初始化失败", state="error")
+                        st.error(str(e))
                     else:
                         status_box.update(label="请求失败", state="error")
                         st.error("请求失败或模型未返回内容，请重试")
 
         # 2. 显示逻辑
-        if st.session_state.get("check_result"):
-            res_data = st.session_state["check_result"].get("data")
-            raw_text = st.session_state["check_result"].get("raw")
-            
-            if res_data and isinstance(res_data, list):
-                for idx, item in enumerate(res_data):
-                    status = item.get('status', '存疑')
-                    # 颜色逻辑
-                    if "错" in status:
-                        border_color = "#ff4b4b"; icon = "❌"; title_color = "#ff8a80"
-                    elif "疑" in status or "不一致" in status:
-                        border_color = "#ffa726"; icon = "⚠️"; title_color = "#ffcc80"
-                    else:
-                        border_color = "#66bb6a"; icon = "✅"; title_color = "#a5d6a7"
-                    
-                    with st.container():
-                        # --- 卡片渲染 ---
-                        st.markdown(f"""
-                        <div class="card-container check-card" style="border-left: 5px solid {border_color};">
-                            <div style="margin-bottom: 12px;">
-                                <span style="font-weight: bold; font-size: 1.3em; color: {title_color};">{icon} {status}</span>
-                                <div style="color: #b0bec5; font-size: 0.9em; margin-top: 4px;">陈述：{item.get('claim', '')}</div>
-                            </div>
-                            <div style="margin-bottom: 15px; line-height: 1.6;">
-                                <b>💡 专家分析：</b><br>{item.get('correction', '无详细分析')}
-                            </div>
-                        """, unsafe_allow_html=True)
-                        
-                        evidence_list = item.get('evidence_list', [])
-                        if not evidence_list and 'evidence_quote' in item: 
-                            evidence_list = [{'source_name': '权威数据', 'content': item['evidence_quote'], 'url': '#'}]
-                        
-                        if evidence_list:
-                            st.markdown('<div class="evidence-container">', unsafe_allow_html=True)
-                            st.markdown('<div style="color: #555; margin-bottom: 8px; font-weight:bold;">🔍 权威数据/原文证据：</div>', unsafe_allow_html=True)
-                            for ev in evidence_list:
-                                st.markdown(f"""
-                                <div class="quote-item">
-                                    <span class="tag-pill">[{ev.get('source_name', '来源')}]</span>
-                                    "{ev.get('content', '')}"<br>
-                                    <a href="{ev.get('url', '#')}" target="_blank" class="source-link" style="margin-top:4px; display:inline-block;">🔗 来源</a>
-                                </div>
-                                """, unsafe_allow_html=True)
-                            st.markdown('</div>', unsafe_allow_html=True)
-                        
-                        st.markdown("</div>", unsafe_allow_html=True)
-                        
-                        # --- 独立收藏按钮 ---
-                        col_space, col_fav = st.columns([6, 1])
-                        with col_fav:
-                            if st.button("⭐ 收藏", key=f"fav_chk_{idx}", help="收藏这条核查结论"):
-                                add_to_favorites("核查结论", item.get('claim'), item)
-            else:
-                st.warning("原始结果展示：")
-                st.markdown(raw_text)
+        check_res = mem.get("check_result")
+        if not check_res and mem.was_evicted("check_result"):
+            st.caption("♻️ 该结果已因会话内存上限被释放，请重新核查")
+        if check_res:
+            render_start = time.perf_counter()
+            with tracing.span("render.check"):
+                res_data = check_res.get("data")
+                raw_text = check_res.get("raw")
+
+                if res_data and isinstance(res_data, list):
+                    for idx, item in enumerate(res_data):
+                        # 卡片 (含全部证据) 为一个元素，只有收藏按钮单独渲染
+                        st.markdown(render.check_card(item), unsafe_allow_html=True)
+                        if st.button("⭐ 收藏", key=f"fav_chk_{idx}", help="收藏这条核查结论"):
+                            add_to_favorites("核查结论", item.get('claim'), item)
+                else:
+                    st.warning("原始结果展示：")
+                    st.markdown(raw_text)
+            usage.finish_usage(check_res, (time.perf_counter() - render_start) * 1000)
 
 # ==========================================
 # 模块二：学术检索 (Nuclear Search)
@@ -579,125 +453,128 @@ with tab2:
     with col2_search:
         st.markdown("#### 📚 检索结果")
         
+        # "重新检索" / "加载更多" 按钮在下方结果区，点击后置位并 rerun，在这里处理
+        force_refresh = st.session_state.pop("search_refresh", False)
+        load_more = st.session_state.pop("search_more", False)
+        cache_hit = None
+        query_cache = get_default_cache()
         if search_btn and search_query:
+            cache_hit = query_cache.lookup(search_query)
+        if cache_hit:
+            cached, cache_meta = cache_hit
+            mem.put("search_result", {"data": cached["data"], "raw": cached["raw"], "cache": cache_meta,
+                                      "pages": {"query": cache_meta["query"], "generation": cache_meta["generation"]}})
+            links.verify_links(links.link_targets(cached["data"]), budget=0)  # 过期的链接在后台重新校验
+        elif load_more and not search_btn:
+            # 续页：只请求未展示过的文献并追加到当前结果；加载过的页从缓存读取
+            prev_res = mem.get("search_result")
+            if prev_res and isinstance(prev_res.get("data"), dict):
+                prev_pages = prev_res.get("pages") or {}
+                page_query = prev_pages.get("query") or search_query
+                # 续页缓存按结果所属的缓存代号读写：其他会话已重新检索时不会串到新结果上
+                page_generation = prev_pages.get("generation")
+                page_index = len(prev_pages.get("added") or [None]) - 1
+                page = query_cache.page(page_query, page_generation, page_index)
+                if page is not None:
+                    links.verify_links(links.link_targets(page["data"]), budget=0)
+                elif not API_KEY:
+                    st.error("🔒 请在侧边栏输入 API Key")
+                else:
+                    status_box_more = st.status("正在检索更多文献...", expanded=True)
+                    try:
+                        page = run_search_more(page_query, prev_res["data"]["papers"], API_KEY, status_box_more,
+                                               paper_index=get_default_index(), verify_links=True)
+                        status_box_more.update(label="检索完成", state="complete", expanded=False)
+                        if page.get("data") is not None:
+                            query_cache.add_page(page_query, page_generation, page_index, {k: page[k] for k in ("data", "raw")})
+                    except PipelineError as e:
+                        status_box_more.update(label="请求失败", state="error")
+                        st.error(str(e))
+                if page is not None:
+                    if page.get("data") is None:
+                        st.warning("⚠️ 续页结果未能解析，请稍后重试")
+                    mem.put("search_result", append_search_page(prev_res, page))
+        elif (search_btn or force_refresh) and search_query:
             if not API_KEY:
                 st.error("🔒 请在侧边栏输入 API Key")
             else:
+                # 先展示本地文献库的即时命中，再等待联网检索
+                paper_index = get_default_index()
+                local_hits = paper_index.search(search_query, limit=8)
+                if local_hits:
+                    with st.expander(f"⚡ 本地文献库命中 {len(local_hits)} 篇 (联网检索进行中...)", expanded=True):
+                        for hit in local_hits:
+                            link = f" [🔗]({hit['url']})" if hit.get("url") else ""
+                            st.markdown(f"- **{hit['title']}** · {hit.get('publication') or 'N/A'}, {hit.get('year') or 'N/A'}{link}")
+
                 status_box_search = st.status("正在进行深度学术检索...", expanded=True)
-                model_list, _ = get_prioritized_models(API_KEY)
-                
-                if model_list:
-                    # --- 恢复完整的 Prompt (未修改) ---
-                    prompt_search = f"""
-                    你是一位资深的核科学研究员。请利用 Google Search 为用户寻找**真实存在**的权威学术文献、官方技术报告、行业白皮书或权威数据库记录。
-
-                    **用户课题：** "{search_query}"
-
-                    **任务 (两部分)：**
-                    1. **Overview (综述)**: 基于搜索到的所有文献或数据库或相关官方报道，用中文写一段 150 字左右的学术综述，总结该领域的最新进展或回答用户问题。
-                    2. **Papers (文献列表)**: 列出具体的文献、报告或数据库条目。
-
-                    **严厉禁止 (Anti-Hallucination)：**
-                    1. 严禁编造标题、作者、发布机构、报告编号、期刊或链接。
-                    2. 严格区分“新闻报道”与“原始报告/论文”，优先引用原始出处
-                    3. 如果没有 PDF 链接、DOI 或官方归档页面，请留空。
-
-                    **执行步骤：**
-                    1. 搜索 Nature, Science等期刊, IAEA (国际原子能机构), OECD-NEA (核能署), ITER, DOE (美国能源部), WNA (世界核协会) 等官方渠道等来源。
-                    2. 提取关键数据，确保来源链接真实有效且可访问。
-                    3. 编写综述，按学术规范整理输出。
-
-                    **输出格式要求（非常重要）：**
-                    **严禁输出任何开场白（如"好的"、"我找到了"等）。**
-                    **仅输出**纯 JSON 对象，格式如下：
-                    {{
-                        "overview": "这里写中文综述，总结研究现状...",
-                        "papers": [
-                            {{
-                                "title": "标题 (必须完全匹配搜索结果，如果是英文，请在括号内附上中文翻译)",
-                                "authors": "作者/机构",
-                                "publication": "来源 (如 Nature, IAEA)",
-                                "year": "年份",
-                                "summary": "详细摘要 (请保留英文原文，并在后面附带中文翻译)",
-                                "doi": "DOI或空字符串",
-                                "url": "真实URL"
-                            }}
-                        ]
-                    }}
-                    """
-                    
-                    payload = {"contents": [{"parts": [{ "text": prompt_search }]}], "tools": [{"google_search": {}}]}
-                    response = smart_api_call(model_list, payload, API_KEY, status_box_search)
-                    
-                    # 使用新的安全提取函数
-                    raw_content = get_response_text(response)
-
-                    if raw_content:
-                        search_results = parse_json_response(raw_content)
-                        status_box_search.update(label="检索完成", state="complete", expanded=False)
-                        st.session_state["search_result"] = {"data": search_results, "raw": raw_content}
-                    else:
-                        status_box_search.update(label="请求失败", state="error")
-                        st.error("请求失败或模型未返回内容")
+                try:
+                    note_rerequest("search", mem.get("search_result"))
+                    search_res = run_search(search_query, API_KEY, status_box_search, paper_index=paper_index, local_hits=local_hits, verify_links=True)
+                    search_res["pages"] = {"query": search_query}
+                    if isinstance(search_res.get("data"), dict):
+                        search_res["pages"]["generation"] = query_cache.put(search_query, {k: search_res[k] for k in ("data", "raw")})
+                    mem.put("search_result", search_res)
+                    status_box_search.update(label="检索完成", state="complete", expanded=False)
+                except PipelineError as e:
+                    status_box_search.update(label="请求失败", state="error")
+                    st.error(str(e))
         
         # 2. 显示逻辑
-        if st.session_state.get("search_result"):
-            s_res = st.session_state["search_result"].get("data")
-            s_raw = st.session_state["search_result"].get("raw")
-            
-            if s_res and isinstance(s_res, dict):
-                papers = s_res.get('papers', [])
-                overview = s_res.get('overview', "")
-                
-                # --- 综述部分 ---
-                if overview:
-                    with st.container():
-                        st.markdown(f"""
-                        <div class="card-container overview-card">
-                            <div style="font-size: 1.2em; font-weight: bold; margin-bottom: 10px;">🧪 学术综述 (Overview)</div>
-                            <div style="line-height: 1.6; font-size: 1.0em;">{overview}</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        # 综述的收藏按钮
-                        col_sp, col_fv = st.columns([6, 1])
-                        with col_fv:
-                            if st.button("⭐ 收藏综述", key="fav_overview"):
-                                add_to_favorites("学术综述", f"关于 {search_query} 的综述", overview)
-                    
-                    st.divider()
-
-                # --- 文献列表部分 ---
-                if papers:
-                    st.success(f"检索到 {len(papers)} 篇相关文献")
-                    for idx, item in enumerate(papers):
-                        with st.container():
-                            # 卡片
-                            st.markdown(f"""
-                            <div class="card-container research-card">
-                                <div style="font-size: 1.2em; font-weight: bold; color: #63b3ed; margin-bottom: 5px;">📄 {item.get('title', '无标题')}</div>
-                                <div style="font-size: 0.9em; color: #a0aec0; margin-bottom: 15px;">
-                                    {item.get('authors', 'N/A')} | {item.get('publication', 'N/A')}, {item.get('year', 'N/A')}
-                                </div>
-                                <div style="border-top: 1px solid #4a5568; margin-bottom: 10px;"></div>
-                                <div style="line-height: 1.6; color: #cbd5e0; font-family: 'Noto Serif SC', serif;">
-                                    {item.get('summary', '暂无摘要')}
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            # 操作栏：链接 + 收藏
-                            col_l, col_f = st.columns([5, 1])
-                            with col_l:
-                                links_html = f'<a href="{item.get("url", "#")}" target="_blank" class="source-link">🔗 原文</a>'
-                                if item.get('doi'):
-                                    links_html += f' <a href="https://x.sci-hub.org.cn/{item.get("doi")}" target="_blank" class="source-link scihub-btn">🔓 Sci-Hub</a>'
-                                st.markdown(links_html, unsafe_allow_html=True)
-                            
-                            with col_f:
-                                if st.button("⭐ 收藏", key=f"fav_paper_{idx}", help="收藏这篇文献"):
-                                    add_to_favorites("学术文献", item.get('title'), item)
-            else:
-                st.markdown(s_raw)
+        search_res = mem.get("search_result")
+        if not search_res and mem.was_evicted("search_result"):
+            st.caption("♻️ 该结果已因会话内存上限被释放，请重新检索")
+        if search_res:
+            render_start = time.perf_counter()
+            rerun_search = False   # 按钮在 span 内置位，span 结束后再 rerun
+            with tracing.span("render.search"):
+                s_res = search_res.get("data")
+                s_raw = search_res.get("raw")
+                cache_meta = search_res.get("cache")
+                if cache_meta:
+                    age_min = cache_meta["age_s"] // 60
+                    age_text = f"{age_min} 分钟前" if age_min else "刚刚"
+                    col_ci, col_cr = st.columns([5, 1])
+                    with col_ci:
+                        st.info(f"♻️ 相似的历史检索结果：「{cache_meta['query']}」(相似度 {cache_meta['similarity']:.2f}，{age_text})")
+                    with col_cr:
+                        if st.button("🔄 重新检索", key="btn_search_refresh", help="忽略缓存，重新联网检索"):
+                            st.session_state["search_refresh"] = True
+                            rerun_search = True
+
+                if s_res and isinstance(s_res, dict):
+                    papers = s_res.get('papers', [])
+                    overview = s_res.get('overview', "")
+
+                    # --- 综述部分 ---
+                    if overview:
+                        st.markdown(render.overview_card(overview), unsafe_allow_html=True)
+                        if st.button("⭐ 收藏综述", key="fav_overview"):
+                            add_to_favorites("学术综述", f"关于 {search_query} 的综述", overview)
+                        st.divider()
+
+                    # --- 文献列表部分 (卡片含链接与校验徽标) ---
+                    pages = search_res.get("pages") or {}
+                    page_counts = pages.get("added") or []
+                    if papers:
+                        page_note = f" (已加载 {len(page_counts)} 页)" if len(page_counts) > 1 else ""
+                        st.success(f"检索到 {len(papers)} 篇相关文献{page_note}")
+                        # 追加的续页只是列表尾部的新卡片，已有卡片命中渲染缓存
+                        for idx, item in enumerate(papers):
+                            st.markdown(render.paper_card(item), unsafe_allow_html=True)
+                            if st.button("⭐ 收藏", key=f"fav_paper_{idx}", help="收藏这篇文献"):
+                                add_to_favorites("学术文献", item.get('title'), item)
+                    if pages.get("exhausted"):
+                        st.caption("📭 没有找到更多新文献")
+                    elif st.button("📄 加载更多文献", key="btn_search_more", use_container_width=True,
+                                   help="只检索尚未列出的文献并追加到列表末尾"):
+                        st.session_state["search_more"] = True
+                        rerun_search = True
+                else:
+                    st.markdown(s_raw)
+            if rerun_search:
+                st.rerun()
+            usage.finish_usage(search_res, (time.perf_counter() - render_start) * 1000)
 
 # ==========================================
 # 模块三：学术改写 (Academic Rewrite)
@@ -718,162 +595,44 @@ with tab3:
                 st.error("🔒 请在侧边栏输入 API Key")
             else:
                 status_box_rewrite = st.status("正在进行语言润色...", expanded=True)
-                model_list, _ = get_prioritized_models(API_KEY)
-                
-                if model_list:
-                    # --- 恢复完整的 Prompt (未修改) ---
-                    prompt_rewrite = f"""
-                    你是一位在高级核杂质期刊有丰富经验的**人类学术编辑**。
-                    请对以下文本进行**彻底的去AI化（De-AI）改写**，并提供双语对照。【需要注意的是我提供给你的句子有可能有些部分或是词语是可以采纳的，你不必每个词都完全转换。只需要符合学术要求即可】
-
-                    **待改写文本：**
-                    '''{user_text_rewrite}'''
-
-                    **🚫 负面约束（绝对禁止 - Violations will be rejected）：**
-                    1.  **禁止滥用连接副词**：严禁在句中堆砌你认为高大上的 "Fundamentally", "Crucially", "Furthermore", "Moreover", "Additionally", "Importantly"等副词进行强调。请通过句子内在的逻辑流来衔接，而非生硬的路标词。
-                    2.  **拒绝名词化（Nominalization）**：例如：不要说 "The realization of X necessitates Y"（X的实现需要Y），要说 "To realize X, we must Y"（为了实现X，我们必须Y）。少用抽象名词（如 modality, provision, utilization, facilitation）。
-                    3.  **拒绝僵硬的长难句**：不要写那种中间没有停顿、修饰语密集堆砌的长句。句子要有呼吸感（Rhythm），自然地长短句结合。
-                    4.  **去"机器味"**：像人类专家一样直接表达观点。
-
-                    **✅ 核心目标：**
-                    1.  **人类化（Human-like）**：模仿人类专家的写作习惯，词汇选择要精准但不做作。
-                    2.  **双语输出（Bilingual Output）**：
-                        -   如果改写后的正文是**英文**，必须在下方附上高水平的**中文翻译**。
-                        -   如果改写后的正文是**中文**，必须在下方附上地道的**英文翻译**。
-                        -   翻译也要符合上述的学术标准，不要直译。
-
-                    **✅可以参考学习模仿以下PPCF\PR系列的文章的写作风格：**
-                      1.  "The cutoff energy and the divergence of the protons generated by the target normal sheath
-acceleration mechanism are known to be significantly influenced by micrometer and
-nanometer-size structures on the target front and rear surfaces. Specifically, the cutoff energy is
-significantly enhanced by creating a central rectangular groove (RG) on the target front surface,
-as shown in a recent study (Khan and Saxena 2023 Phys. Plasmas 30 063102). Here, we report
-on 2D particle-in-cell simulations to thoroughly explore the effect of the depth of the central RG
-on the energy spectra of the accelerated protons. The proton cutoff energy is found to enhance
-drastically as a result of relativistically induced transparency as the thickness of the rear wall of
-the groove is reduced from a few micrometers to a few tens of nanometers, however, it drops
-sharply as the thickness of the rear wall is further reduced towards creating a complete hole
-through the target." 
-                      2.  "The interaction of a high-intensity femtosecond laser pulse
-with a solid target results in highly energetic ions with MeV
-energies. These ion sources are of much interest as they offer
-measurement of fast-evolving electric and magnetic fields
-using proton radiography technique. Other potential
-cutting-edge applications, in the foresight, include hadron
-therapy, isochoric heating of matter, fast ignition of
-fusion targets, and many more."
-                      3.  "In the present work, we investigate the impact of the depth
-of a micrometer-size groove on the front side of the target, or
-in other words the role of the thickness of the rear wall of the
-grooved target, in improving proton cutoff energies and their
-angular divergence. In particular, we investigate the variation
-in proton energy spectra as the thickness of the rear wall of the
-groove is reduced from a few micrometers to a couple of tens
-of nanometers, and then to the case of no wall representing a
-target with a complete hole through it. It is observed that the
-onset time of relativistically induced transparency of the target
-rear wall with respect to the peak of the laser pulse plays a key
-role in determining the optimum width/thickness of the target
-rear wall. This is in agreement with the previous studies" 
-                    4. “Proton generation, transport and interaction with hollow cone targets are investigated by means of two-dimensional PIC simulations. A
-scaled-down hollow cone with gold walls, a carbon tip and a curved hydrogen foil inside the cone has been considered. Proton acceleration is
-driven by a 1020 W$cm	2 and 1 ps laser pulse focused on the hydrogen foil. Simulations show an important surface current at the cone walls
-which generates a magnetic field. This magnetic field is dragged by the quasi-neutral plasma formed by fast protons and co-moving electrons
-when they propagate towards the cone tip. As a result, a tens of kT Bz field is set up at the cone tip, which is strong enough to deflect the protons
-and increase the beam divergence substantially. We propose using heavy materials at the cone tip and increasing the laser intensity in order to
-mitigate magnetic field generation and proton beam divergence.”
-                 5.“The standard proton fast ignition scheme assumes that the
-proton beam is generated inside a hollow cone attached to an
-inertial fusion capsule by means of the TNSA scheme.Most
-of the proton FI calculations carried out so far are based on the
-strong assumptions of ideal perfectly collimated beams and
-optimal target configurations, which clearly under-estimate the
-laser energy requirements for ignition. Other studies assumed that proton acceleration and transport within the cone
-takes place in an idealmanner, i.e. protons are focused on the cone
-tip and emerge with a given divergence angle. In addition, it is
-widely assumed that there are not any relevant interactions be-
-tween the proton beam and the cone tip. Only recently, collective
-stopping of ion beams in solid matter has been reported”
-                 6.“This article is organised as follows. In Section 2, the data
-used in PIC simulations are described. Section 3 summarises
-the results obtained for the proton beam generation and
-transport within a standard cone design. Next, in Section 4,it
-is proposed using heavy elements in the cone tip and higher
-intensity laser pulses in order to mitigate the magnetic field
-growth and the subsequent beam deflection at the cone tip.
-Finally, conclusions and future work are summarized in Sec-
-tion 5.”
-                7.“Alarge number ofstudies have been performed to understand the mechanism involved in the laser-plasma
-interaction-driven proton/ion acceleration. Among all possible candidates the target normal sheath
-acceleration (TNSA) mechanism [9–11] has received wider attention than other (radiation pressure-based)
-mechanisms. The paramount factor has been the wide accessibility ofthe laser parameters required for the
-TNSAmechanism to operate. In this mechanism, the energetic electrons generated bylaser-plasma interaction
-at the front surface ofthe target escape to the rear side ofthe target. This electron cloud while emerging from the
-rear surface ofthe target forms a strong sheath electric field which is responsible for accelerating protons/ions to
-several 10s ofMeV energies.”
-
-
-                    **输出格式（必须严格遵守）：**
-                    请按以下标签分隔内容：
-
-                    [REWRITE]
-                    (这里是改写后的优美学术文本)
-
-                    [TRANSLATION]
-                    (这里是对应的另一种语言的高水平翻译)
-                    """
-                    
-                    payload = {"contents": [{"parts": [{ "text": prompt_rewrite }]}]}
-                    response = smart_api_call(model_list, payload, API_KEY, status_box_rewrite)
-                    
-                    # 使用新的安全提取函数
-                    raw_content = get_response_text(response)
-
-                    if raw_content:
-                        status_box_rewrite.update(label="润色完成", state="complete", expanded=False)
-                        
-                        rewrite_c = raw_content
-                        trans_c = ""
-                        if "[REWRITE]" in raw_content and "[TRANSLATION]" in raw_content:
-                            parts = raw_content.split("[TRANSLATION]")
-                            rewrite_c = parts[0].replace("[REWRITE]", "").strip()
-                            trans_c = parts[1].strip()
-                        
-                        st.session_state["rewrite_result"] = {
-                            "rewrite": rewrite_c, 
-                            "translation": trans_c, 
-                            "draft": user_text_rewrite
-                        }
-                    else:
-                        status_box_rewrite.update(label="请求失败", state="error")
-                        st.error("请求失败或模型未返回内容")
-
-        if st.session_state.get("rewrite_result"):
-            res = st.session_state["rewrite_result"]
-            
-            # --- 改写结果展示 + 收藏 ---
-            st.markdown(f"""
-            <div class="card-container rewrite-card">
-                <div style="margin-bottom: 10px; font-weight: bold; color: #81e6d9;">🖋️ Revised Text:</div>
-                {res['rewrite'].replace(chr(10), '<br>')}
-            </div>
-            """, unsafe_allow_html=True)
-            
-            c1, c2 = st.columns([6, 1])
-            with c2:
-                if st.button("⭐ 收藏改写", key="fav_btn_rewrite"):
-                    title_preview = res["rewrite"][:30].replace("\n", " ") + "..."
-                    add_to_favorites("改写结果", title_preview, res)
-            
-            # --- 翻译展示 ---
-            if res.get('translation'):
+                try:
+                    mem.put("rewrite_result", run_rewrite(user_text_rewrite, API_KEY, status_box_rewrite))
+                    status_box_rewrite.update(label="润色完成", state="complete", expanded=False)
+                except PipelineError as e:
+                    status_box_rewrite.update(label="请求失败", state="error")
+                    st.error(str(e))
+
+        res = mem.get("rewrite_result")
+        if not res and mem.was_evicted("rewrite_result"):
+            st.caption("♻️ 该结果已因会话内存上限被释放，请重新改写")
+        if res:
+            render_start = time.perf_counter()
+            with tracing.span("render.rewrite"):
+
+                # --- 改写结果展示 + 收藏 ---
                 st.markdown(f"""
-                <div class="translation-section">
-                    <div style="margin-bottom: 8px; font-weight: bold;">🌐 Translation:</div>
-                    {res['translation'].replace(chr(10), '<br>')}
+                <div class="card-container rewrite-card">
+                    <div style="margin-bottom: 10px; font-weight: bold; color: #81e6d9;">🖋️ Revised Text:</div>
+                    {res['rewrite'].replace(chr(10), '<br>')}
                 </div>
                 """, unsafe_allow_html=True)
 
+                c1, c2 = st.columns([6, 1])
+                with c2:
+                    if st.button("⭐ 收藏改写", key="fav_btn_rewrite"):
+                        title_preview = res["rewrite"][:30].replace("\n", " ") + "..."
+                        add_to_favorites("改写结果", title_preview, {k: v for k, v in res.items() if k != "usage"})
+
+                # --- 翻译展示 ---
+                if res.get('translation'):
+                    st.markdown(f"""
+                    <div class="translation-section">
+                        <div style="margin-bottom: 8px; font-weight: bold;">🌐 Translation:</div>
+                        {res['translation'].replace(chr(10), '<br>')}
+                    </div>
+                    """, unsafe_allow_html=True)
+            usage.finish_usage(res, (time.perf_counter() - render_start) * 1000)
+
 # ==========================================
 # 模块四：我的收藏 (Favorites)
 # ==========================================
@@ -886,7 +645,7 @@ with tab4:
         with col_ex:
             st.markdown("**1. 导出数据**")
             # 准备数据
-            json_str = json.dumps(st.session_state["favorites"], ensure_ascii=False, indent=2)
+            json_str = json.dumps(get_favorites(), ensure_ascii=False, indent=2)
             
             # 生成带时间戳的文件名
             file_name = f"nuclear_backup_{st.session_state['user_id']}_{datetime.datetime.now().strftime('%Y%m%d')}.json"
@@ -911,7 +670,7 @@ with tab4:
                     try:
                         data = json.loads(restore_str)
                         if isinstance(data, list):
-                            st.session_state["favorites"] = data
+                            set_favorites(data)
                             save_favorites()
                             st.success("恢复成功！刷新页面生效。")
                             time.sleep(1)
@@ -920,64 +679,30 @@ with tab4:
 
     st.divider()
     
-    favs = st.session_state["favorites"]
+    favs = get_favorites()
     if not favs:
         st.info("👋 暂无收藏。请在其他板块点击 '⭐' 按钮添加内容。")
     else:
         st.caption(f"共 {len(favs)} 条记录")
         
-        # 遍历显示收藏项 (倒序：最新的在最上面)
-        for index, item in enumerate(reversed(favs)):
-            # 注意：删除时需要用原始索引或者唯一ID
-            
-            with st.container():
-                # 使用自定义 CSS 框来美化
-                col_mark, col_content = st.columns([0.05, 0.95])
-                with col_mark:
-                    # 左侧彩色条
-                    color = "#63b3ed" if item['category'] == "学术文献" else "#66bb6a" if item['category'] == "核查结论" else "#d69e2e"
-                    st.markdown(f"<div style='height:100%; min-height: 50px; border-left: 4px solid {color};'>&nbsp;</div>", unsafe_allow_html=True)
-                
-                with col_content:
-                    # 标题栏
-                    c_title, c_del = st.columns([9, 1])
-                    with c_title:
-                        st.markdown(f"**[{item['category']}]** {item['title']}")
-                        st.caption(f"🕒 {item['time']}")
-                    with c_del:
-                        if st.button("🗑️", key=f"del_{item['id']}", help="删除此条"):
-                            delete_favorite(item['id'])
-                    
-                    # 内容详情折叠区
-                    with st.expander("查看详情"):
-                        content = item['content']
-                        
-                        # 1. 学术文献 (字典格式)
-                        if item['category'] == "学术文献" and isinstance(content, dict):
-                            st.markdown(f"**Authors:** {content.get('authors')}")
-                            st.info(content.get('summary'))
-                            st.markdown(f"[🔗 原文链接]({content.get('url')})")
-                        
-                        # 2. 核查结论 (字典格式)
-                        elif item['category'] == "核查结论" and isinstance(content, dict):
-                            st.markdown(f"**状态:** {content.get('status')}")
-                            st.warning(f"**分析:** {content.get('correction')}")
-                            st.markdown("**证据来源:**")
-                            for e in content.get('evidence_list', []):
-                                st.markdown(f"- [{e.get('source_name')}]({e.get('url')}): {e.get('content')}")
-                        
-                        # 3. 改写结果 (字典格式)
-                        elif item['category'] == "改写结果" and isinstance(content, dict):
-                            st.caption("原始草稿:")
-                            st.text(content.get('draft'))
-                            st.markdown("---")
-                            st.markdown("**改写:**")
-                            st.markdown(content.get('rewrite'))
-                            if content.get('translation'):
-                                st.markdown("**翻译:**")
-                                st.markdown(content.get('translation'))
-                        
-                        # 4. 纯文本/其他
-                        else:
-                            st.markdown(str(content))
-            st.markdown("---")
+        # 遍历显示收藏项 (倒序：最新的在最上面)；每项 = 一段 HTML (详情用 <details> 折叠) + 删除按钮
+        for item in reversed(favs):
+            st.markdown(render.favorite_item(item), unsafe_allow_html=True)
+            if st.button("🗑️", key=f"del_{item['id']}", help="删除此条"):
+                delete_favorite(item['id'])
+
+# --- 会话内存诊断 (放在脚本末尾，反映本轮运行后的占用) ---
+with st.sidebar:
+    with st.expander("🧠 会话内存", expanded=False):
+        footprint = mem.footprint()
+        st.caption(f"本会话 {footprint['compressed_bytes'] / 1024:.1f} KB (压缩前 {footprint['raw_bytes'] / 1024:.1f} KB) / 上限 {footprint['cap_bytes'] / 1024:.0f} KB，已淘汰 {footprint['evictions']} 次；收藏夹等可重新加载的数据 {footprint['reloadable_bytes'] / 1024:.1f} KB 不计入上限")
+        if footprint["slots"]:
+            st.dataframe(
+                [{"slot": k, "compressed_kb": round(v["compressed_bytes"] / 1024, 1), "raw_kb": round(v["raw_bytes"] / 1024, 1), "reloadable": v["reloadable"]} for k, v in footprint["slots"].items()],
+                hide_index=True, use_container_width=True
+            )
+        shared = get_default_store().summary()
+        st.caption(f"共享存储：{shared['blobs']} 个对象 ({shared['referenced']} 个被引用)，{shared['compressed_bytes'] / 1024:.1f} KB，去重命中 {shared['dedup_hits']} 次")
+
+# 埋点：按需写出指标文件
+tracing.write_metrics_file()
@@ -0,0 +1,342 @@
+"""
+端到端基准测试：请求管线 / JSON 解析 / 收藏夹 / 整脚本 rerun
+
+全部运行在本地 mock_gemini.py 上，不需要 API Key 与网络。
+
+    python benchmarks/bench_pipeline.py                      # 全量
+    python benchmarks/bench_pipeline.py --quick              # 快速 (小规模)
+    python benchmarks/bench_pipeline.py --only parse,favorites
+    python benchmarks/bench_pipeline.py --output bench.json --compare baseline.json --threshold 0.25
+
+报告为 JSON (见 --output)，包含环境信息与每项的 mean/p50/p95/p99/ops_per_sec。
+使用 --compare 与历史报告对比时，若任一项 p50 变慢超过阈值则以退出码 1 结束。
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+import concurrent.futures
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# mock 返回的链接/DOI 指向真实站点；校验会访问外网，使基准既不离线也不可复现
+os.environ.setdefault("NC_LINK_VERIFY", "0")
+
+import nuclear_check  # noqa: E402
+from mock_gemini import MockGeminiServer, synthesize_text, DEFAULT_CONFIG  # noqa: E402
+
+# smart_api_call 在 429/5xx 时 sleep(1)，不同失败组合下的吞吐差异主要来自这里
+FAILURE_MIXES = {
+    "clean": {},
+    "429_20pct": {"errors": {"429": 0.2}},
+    "5xx_mix": {"errors": {"500": 0.1, "503": 0.1}},
+    "tools_rejected": {"reject_tools": ["gemini-1.5-flash", "gemini-1.5-pro"]},
+    "first_model_down": {"model_errors": {"gemini-1.5-flash": 429}},
+}
+
+
+# --- 工具函数 ---
+def summarize(samples_ms, extra=None):
+    samples = sorted(samples_ms)
+    n = len(samples)
+
+    def pct(p):
+        return round(samples[max(0, math.ceil(p / 100 * n) - 1)], 4)
+
+    result = {
+        "n": n,
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": round(samples[-1], 4),
+        "ops_per_sec": round(1000 / statistics.fmean(samples), 2) if statistics.fmean(samples) > 0 else None,
+    }
+    if extra:
+        result.update(extra)
+    return result
+
+
+def timeit(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+@contextlib.contextmanager
+def workdir():
+    """在临时目录运行，避免污染仓库中的 favorites_*.json / usage_log.jsonl"""
+    old = os.getcwd()
+    path = tempfile.mkdtemp(prefix="nc-bench-")
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(old)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def make_favorites(n, seed=0):
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        category = rng.choice(["核查结论", "学术文献", "改写结果"])
+        if category == "学术文献":
+            content = json.loads(synthesize_text('"papers" **用户课题：** "bench"', dict(DEFAULT_CONFIG, papers=1), rng))["papers"][0]
+        elif category == "核查结论":
+            content = json.loads(synthesize_text('"claim"', dict(DEFAULT_CONFIG, claims=1), rng))[0]
+        else:
+            content = {"rewrite": "text " * 40, "translation": "译文 " * 40, "draft": "draft " * 40}
+        items.append({
+            "id": f"{category}_{i}",
+            "category": category,
+            "title": f"item {i}",
+            "content": content,
+            "time": "2024-01-01 00:00:00",
+        })
+    return items
+
+
+# --- 1. smart_api_call 吞吐与尾延迟 ---
+def bench_api(core, sizes, quick):
+    results = []
+    calls = 20 if quick else 100
+    concurrency = 4 if quick else 8
+    payload = {"contents": [{"parts": [{"text": '"claim" 基准测试'}]}], "tools": [{"google_search": {}}]}
+    for mix_name, mix in FAILURE_MIXES.items():
+        config = dict(mix, latency_ms=20, jitter_ms=30, seed=42)
+        with MockGeminiServer(config) as mock:
+            models, _ = core.get_prioritized_models("bench-key", mock.base_url)
+
+            def one_call():
+                t0 = time.perf_counter()
+                resp = core.smart_api_call(models, payload, "bench-key", base_url=mock.base_url)
+                ok = bool(resp is not None and resp.status_code == 200)
+                attempts = (getattr(resp, "call_meta", None) or {}).get("attempts", 0)
+                return (time.perf_counter() - t0) * 1000, ok, attempts
+
+            wall0 = time.perf_counter()
+            with concurrent.futures.ThreadPoolExecutor(concurrency) as pool:
+                outcomes = list(pool.map(lambda _: one_call(), range(calls)))
+            wall = time.perf_counter() - wall0
+            samples = [o[0] for o in outcomes]
+            results.append({
+                "name": f"api.smart_api_call[{mix_name}]",
+                **summarize(samples, {
+                    "concurrency": concurrency,
+                    "throughput_rps": round(calls / wall, 2),
+                    "success_rate": round(sum(o[1] for o in outcomes) / calls, 3),
+                    "avg_attempts": round(sum(o[2] for o in outcomes) / calls, 2),
+                    "upstream_requests": mock.stats["requests"],
+                }),
+            })
+    return results
+
+
+# --- 2. parse_json_response 成本 ---
+def parse_corpus():
+    rng = random.Random(7)
+    check = synthesize_text('"claim"', dict(DEFAULT_CONFIG, claims=5), rng)
+    search = synthesize_text('"papers" **用户课题：** "可控核聚变"', dict(DEFAULT_CONFIG, papers=20), rng)
+    big_search = synthesize_text('"papers" **用户课题：** "可控核聚变"', dict(DEFAULT_CONFIG, papers=500), rng)
+    return {
+        # 真实输出形态
+        "clean_check": check,
+        "clean_search_20": search,
+        "fenced_search": f"```json\n{search}\n```",
+        "prose_wrapped": f"好的，以下是核查结果：\n{check}\n希望对您有帮助。",
+        "python_dict": repr(json.loads(search)),
+        # 对抗输入
+        "large_search_500": big_search,
+        "truncated_large": big_search[: len(big_search) * 2 // 3],
+        "unbalanced_braces": "{" * 5000 + "not json" + "]" * 5000,
+        "deep_nesting": "[" * 900 + "]" * 900,
+        "no_json_prose": "这是一段没有任何 JSON 的长文本。" * 5000,
+    }
+
+
+def bench_parse(core, sizes, quick):
+    repeat = 20 if quick else 200
+    results = []
+    for name, text in parse_corpus().items():
+        ok = core.parse_json_response(text) is not None
+        r = max(3, repeat // 10) if len(text) > 100_000 else repeat
+        results.append({
+            "name": f"parse.{name}",
+            **summarize(timeit(lambda: core.parse_json_response(text), r), {"input_bytes": len(text.encode("utf-8")), "parsed": ok}),
+        })
+    return results
+
+
+# --- 3. 收藏夹增删与加载 ---
+def bench_favorites(core, sizes, quick):
+    store = core.favorites
+    results = []
+    for n in sizes:
+        base = make_favorites(n)
+        repeat = 3 if n >= 100_000 else 10 if n >= 10_000 else 50
+        if quick:
+            repeat = max(2, repeat // 5)
+        with workdir():
+            favorites = list(base)
+            store.save_favorites("bench", favorites)
+            size = os.path.getsize(store.get_fav_file_path("bench"))
+
+            load = timeit(lambda: store.load_favorites("bench"), repeat)
+
+            counter = iter(range(10 ** 9))
+
+            def add():
+                # 与 UI 一致：查重追加后整体落盘
+                i = next(counter)
+                store.add_favorite(favorites, "学术文献", f"new {i}", {"title": f"new {i}", "doi": f"10.1/{i}"})
+                store.save_favorites("bench", favorites)
+
+            adds = timeit(add, repeat)
+
+            def delete():
+                nonlocal favorites
+                favorites = store.delete_favorite(favorites, favorites[-1]["id"])
+                store.save_favorites("bench", favorites)
+
+            deletes = timeit(delete, repeat)
+
+        results.append({"name": f"favorites.load[{n}]", **summarize(load, {"items": n, "file_bytes": size})})
+        results.append({"name": f"favorites.add[{n}]", **summarize(adds, {"items": n})})
+        results.append({"name": f"favorites.delete[{n}]", **summarize(deletes, {"items": n})})
+    return results
+
+
+# --- 4. 整脚本 rerun ---
+def delta_stats(at):
+    """统计一次运行发送给前端的元素数与序列化大小 (近似 websocket 负载)"""
+    count, size = 0, 0
+    stack = [at._tree]
+    while stack:
+        node = stack.pop()
+        proto = getattr(node, "proto", None)
+        if proto is not None:
+            count += 1
+            size += proto.ByteSize()
+        stack.extend(getattr(node, "children", {}).values())
+    return count, size
+
+
+def bench_rerun(core, sizes, quick):
+    from streamlit.testing.v1 import AppTest
+    results = []
+    repeat = 3 if quick else 10
+    for n in sizes:
+        with workdir(), MockGeminiServer({"seed": 1, "claims": 8, "papers": 10}) as mock:
+            os.environ["GEMINI_BASE_URL"] = mock.base_url
+            with open("favorites_default.json", "w", encoding="utf-8") as f:
+                json.dump(make_favorites(n), f, ensure_ascii=False)
+            at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=600)
+            at.secrets["GEMINI_API_KEY"] = "bench-key"
+            t0 = time.perf_counter()
+            at.run()
+            first = (time.perf_counter() - t0) * 1000
+            at.text_area(key="input_check").input("中国现在有58座核电站？")
+            at.button(key="btn_check").click().run()
+            at.text_input(key="input_search").input("可控核聚变")
+            at.button(key="btn_search").click().run()
+            samples = timeit(at.run, repeat)
+            elements, payload = delta_stats(at)
+            results.append({
+                "name": f"rerun.full_script[{n}]",
+                **summarize(samples, {"favorites": n, "first_run_ms": round(first, 2),
+                                      "elements": elements, "payload_bytes": payload}),
+            })
+    os.environ.pop("GEMINI_BASE_URL", None)
+    return results
+
+
+SUITES = {
+    "api": (bench_api, None),
+    "parse": (bench_parse, None),
+    "favorites": (bench_favorites, [100, 10_000, 100_000]),
+    "rerun": (bench_rerun, [0, 100, 1_000, 10_000]),
+}
+QUICK_SIZES = {"favorites": [100, 1_000], "rerun": [0, 100]}
+
+
+# --- 报告 ---
+def environment():
+    try:
+        commit = subprocess.check_output(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(report, baseline, threshold):
+    """对比 p50，返回变慢超过阈值的项"""
+    old = {r["name"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for r in report["results"]:
+        prev = old.get(r["name"])
+        if not prev or not prev.get("p50_ms"):
+            continue
+        ratio = r["p50_ms"] / prev["p50_ms"]
+        r["baseline_p50_ms"] = prev["p50_ms"]
+        r["change"] = round(ratio - 1, 3)
+        if ratio - 1 > threshold:
+            regressions.append(r["name"])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nuclear Hub pipeline benchmarks")
+    parser.add_argument("--only", help=f"逗号分隔的子集: {','.join(SUITES)}")
+    parser.add_argument("--quick", action="store_true", help="小规模快速运行")
+    parser.add_argument("--output", default="bench_report.json")
+    parser.add_argument("--compare", help="历史报告路径")
+    parser.add_argument("--threshold", type=float, default=0.25, help="p50 回归阈值 (默认 25%%)")
+    args = parser.parse_args(argv)
+
+    selected = args.only.split(",") if args.only else list(SUITES)
+    report = {"environment": environment(), "quick": args.quick, "results": []}
+    for name in selected:
+        func, sizes = SUITES[name]
+        if args.quick and name in QUICK_SIZES:
+            sizes = QUICK_SIZES[name]
+        print(f"== {name} ==", flush=True)
+        for r in func(nuclear_check, sizes, args.quick):
+            report["results"].append(r)
+            print(f"  {r['name']:<42} p50={r['p50_ms']:>10.3f}ms  p95={r['p95_ms']:>10.3f}ms", flush=True)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        report["regressions"] = regressions
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"report written to {args.output}")
+    if regressions:
+        print("REGRESSIONS: " + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""
+并发会话压测：启动一个真实的 `streamlit run app.py` 实例，用 N 个 websocket 客户端模拟 N 个浏览器标签页
+
+每个会话循环执行：核查 → 检索 → 改写 → 收藏 → 删除收藏 → 切换用户，
+后端为本地 mock_gemini.py。每一步都像浏览器一样发送一次 rerun_script
+(携带全部控件值与按钮触发)，并等待脚本运行结束 (包括 st.rerun 触发的后续运行)。
+
+    python benchmarks/load_sessions.py                         # N = 1,2,4,8,16
+    python benchmarks/load_sessions.py --sessions 1,4,16,32 --steps 12 --think-ms 1000
+    python benchmarks/load_sessions.py --output load_report.json
+
+报告 (JSON) 中每个 N 包含 rerun 延迟百分位、吞吐 (rerun/s) 与内存：
+- 会话内存：各会话侧边栏 "🧠 会话内存" 中的结果占用 (压缩/原始)，以及共享存储的总体积
+- 服务进程 RSS：每个 N 使用一个新实例，预热后记录基线；每会话内存 = (结束时 RSS - 基线) / N
+饱和点定义为：吞吐增长低于 --saturation-gain，或 p95 超过 --slo-ms 的最小 N。
+
+所有会话共享同一个服务进程 (blob 存储、查询缓存、渲染缓存与链接缓存都是进程级)，
+测得的是单实例能承载的并发会话数。客户端线程只做 protobuf 收发，与服务端运行在同一台机器上。
+客户端使用 websockets 库 (新版 Streamlit 的依赖，旧版需单独 pip install websockets)。
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import contextlib
+import subprocess
+import urllib.request
+import concurrent.futures
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 导入 bench_pipeline 时同时关闭链接校验 (NC_LINK_VERIFY=0)，压测不访问外网；服务进程继承该环境变量
+from bench_pipeline import ROOT, summarize, workdir, make_favorites, environment  # noqa: E402
+from mock_gemini import MockGeminiServer  # noqa: E402
+
+ACTIONS = ["check", "search", "rewrite", "star", "delete", "switch_user"]
+RUN_TIMEOUT_S = 600
+SERVER_START_TIMEOUT_S = 60
+WIDGET_TYPES = ("button", "text_input", "text_area")
+USER_ID_LABEL = "当前用户 ID (回车切换)"   # 侧边栏用户 ID 输入框没有 key，按标签定位
+_WIDGET_KEY = re.compile(r"^\$\$ID-[0-9a-f]+-(.*)$")
+_SESSION_CAPTION = re.compile(r"本会话 ([\d.]+) KB \(压缩前 ([\d.]+) KB\)")
+_STORE_CAPTION = re.compile(r"共享存储：(\d+) 个对象 \((\d+) 个被引用\)，([\d.]+) KB")
+
+
+def rss_mb(pid):
+    """进程当前 RSS (MB)；没有 /proc 时返回 None"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def streamlit_server():
+    """在当前目录启动 streamlit run app.py，等待 /_stcore/health 就绪，返回 (pid, port)"""
+    port = free_port()
+    os.makedirs(".streamlit", exist_ok=True)
+    with open(os.path.join(".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        f.write('GEMINI_API_KEY = "load-key"\n')
+    log = open("streamlit.log", "w", encoding="utf-8")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, "app.py"),
+         "--server.headless", "true", "--server.address", "127.0.0.1", "--server.port", str(port),
+         "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false", "--logger.level", "error"],
+        stdout=log, stderr=subprocess.STDOUT,
+    )
+    try:
+        deadline = time.monotonic() + SERVER_START_TIMEOUT_S
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"streamlit exited with {proc.returncode}, see {os.path.abspath('streamlit.log')}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as resp:
+                    if resp.read() == b"ok": break
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"streamlit not healthy after {SERVER_START_TIMEOUT_S}s")
+            time.sleep(0.2)
+        yield proc.pid, port
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        log.close()
+
+
+class WebSession:
+    """一个浏览器标签页：一条 websocket 连接，每次 rerun 像浏览器一样上报全部控件值"""
+    def __init__(self, port):
+        from websockets.sync.client import connect
+        self._stack = contextlib.ExitStack()
+        self.ws = self._stack.enter_context(connect(
+            f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"], max_size=None, open_timeout=RUN_TIMEOUT_S))
+        self.values = {}      # 控件 (key 或标签) -> 用户输入的文本
+        self.widgets = {}     # 上一次运行渲染出的控件 (key 或标签) -> element id
+        self.captions = []
+        self.exceptions = 0
+        self._cache = {}      # 可缓存的 ForwardMsg (hash -> msg)，服务端可能只发引用
+
+    def close(self):
+        self._stack.close()
+
+    def buttons(self, *prefixes):
+        return [k for k in self.widgets if k.startswith(prefixes)]
+
+    def run(self, click=None):
+        """发送 rerun_script 并等到脚本运行结束 (跟随 st.rerun 触发的后续运行)"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        states = msg.rerun_script.widget_states.widgets
+        for name, text in self.values.items():
+            if name in self.widgets:
+                state = states.add()
+                state.id = self.widgets[name]
+                state.string_value = text
+        if click is not None:
+            state = states.add()
+            state.id = self.widgets[click]
+            state.trigger_value = True
+        widgets, captions = {}, []
+        self.ws.send(msg.SerializeToString())
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(self.ws.recv(RUN_TIMEOUT_S))
+            if fwd.ref_hash:
+                fwd = self._cache.get(fwd.ref_hash, fwd)
+            elif fwd.metadata.cacheable:
+                self._cache[fwd.hash] = fwd
+            kind = fwd.WhichOneof("type")
+            if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                etype = element.WhichOneof("type")
+                if etype in WIDGET_TYPES:
+                    widget = getattr(element, etype)
+                    key = _WIDGET_KEY.match(widget.id)
+                    name = key.group(1) if key and key.group(1) != "None" else widget.label
+                    widgets[name] = widget.id
+                elif etype == "markdown":
+                    captions.append(element.markdown.body)
+                elif etype == "exception":
+                    self.exceptions += 1
+            elif kind == "script_finished":
+                if fwd.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN: break
+                widgets, captions = {}, []   # st.rerun：以后续运行渲染的页面为准
+        self.widgets, self.captions = widgets, captions
+
+    def memory(self):
+        """侧边栏 "🧠 会话内存" 中的本会话与共享存储占用"""
+        text = "\n".join(self.captions)
+        found = {}
+        m = _SESSION_CAPTION.search(text)
+        if m:
+            found["session_compressed_bytes"] = round(float(m.group(1)) * 1024)
+            found["session_raw_bytes"] = round(float(m.group(2)) * 1024)
+        m = _STORE_CAPTION.search(text)
+        if m:
+            found["store_blobs"] = int(m.group(1))
+            found["store_referenced"] = int(m.group(2))
+            found["store_compressed_bytes"] = round(float(m.group(3)) * 1024)
+        return found
+
+
+class SimulatedSession:
+    """一个模拟用户：持有独立的 websocket 会话，记录每类动作的 rerun 延迟"""
+    def __init__(self, index, seed, port):
+        self.index = index
+        self.rng = random.Random(seed)
+        self.client = WebSession(port)
+        self.samples = {a: [] for a in ACTIONS + ["initial"]}
+
+    @property
+    def errors(self):
+        return self.client.exceptions
+
+    def _timed(self, name, click=None):
+        t0 = time.perf_counter()
+        self.client.run(click)
+        self.samples[name].append((time.perf_counter() - t0) * 1000)
+
+    def start(self):
+        self._timed("initial")
+
+    def step(self, action):
+        client = self.client
+        if action == "check":
+            client.values["input_check"] = f"会话 {self.index}：中国现在有58座核电站？"
+            self._timed(action, "btn_check")
+        elif action == "search":
+            client.values["input_search"] = f"可控核聚变 {self.rng.randint(2015, 2025)} 突破"
+            self._timed(action, "btn_search")
+        elif action == "rewrite":
+            client.values["input_rewrite"] = "The realization of ignition necessitates high gain."
+            self._timed(action, "btn_rewrite")
+        elif action == "star":
+            keys = client.buttons("fav_chk_", "fav_paper_", "fav_btn_rewrite")
+            if keys:
+                self._timed(action, self.rng.choice(keys))
+        elif action == "delete":
+            keys = client.buttons("del_")
+            if keys:
+                self._timed(action, keys[0])
+        elif action == "switch_user" and USER_ID_LABEL in client.widgets:
+            client.values[USER_ID_LABEL] = f"user{self.index}_{self.rng.randint(0, 2)}"
+            self._timed(action)
+
+
+def run_level(n, steps, think_ms, seed):
+    """对一个新启动的实例运行 N 个并发会话，返回该级别的统计"""
+    with streamlit_server() as (pid, port):
+        # 预热：导入与进程级缓存初始化不计入每会话内存
+        warmup = WebSession(port)
+        warmup.run()
+        warmup.close()
+        time.sleep(1)
+        rss_base = rss_mb(pid)
+
+        sessions = [SimulatedSession(i, seed + i, port) for i in range(n)]
+        barrier = threading.Barrier(n)
+        spans = []
+
+        def drive(session):
+            try:
+                session.start()
+                barrier.wait()
+            except Exception:
+                barrier.abort()
+                raise
+            t0 = time.perf_counter()
+            for k in range(steps):
+                session.step(ACTIONS[k % len(ACTIONS)])
+                if think_ms:
+                    time.sleep(session.rng.random() * think_ms / 1000)
+            spans.append((t0, time.perf_counter()))
+
+        with concurrent.futures.ThreadPoolExecutor(n) as pool:
+            list(pool.map(drive, sessions))
+        wall = max(end for _, end in spans) - min(start for start, _ in spans)
+
+        # 会话仍在线时读取内存；共享存储以最后一次运行的结果为准
+        sessions[0].client.run()
+        rss_after = rss_mb(pid)
+        memory = [sess.client.memory() for sess in sessions]
+        store = memory[0]
+        for sess in sessions:
+            sess.client.close()
+
+    all_samples = [s for sess in sessions for a in ACTIONS for s in sess.samples[a]]
+    per_action = {}
+    for action in ACTIONS:
+        values = [s for sess in sessions for s in sess.samples[action]]
+        if values:
+            per_action[action] = summarize(values)
+    return {
+        "sessions": n,
+        "reruns": len(all_samples),
+        "throughput_rps": round(len(all_samples) / wall, 2) if wall > 0 else None,
+        "errors": sum(sess.errors for sess in sessions),
+        "rerun": summarize(all_samples),
+        "initial_run": summarize([s for sess in sessions for s in sess.samples["initial"]]),
+        "per_action": per_action,
+        "session_blob_bytes_avg": round(sum(m.get("session_compressed_bytes", 0) for m in memory) / n),
+        "session_raw_bytes_avg": round(sum(m.get("session_raw_bytes", 0) for m in memory) / n),
+        "store_compressed_bytes": store.get("store_compressed_bytes"),
+        "store_blobs": store.get("store_blobs"),
+        "store_referenced": store.get("store_referenced"),
+        "server_rss_base_mb": rss_base,
+        "server_rss_mb": rss_after,
+        "rss_delta_per_session_mb": round((rss_after - rss_base) / n, 2) if rss_after is not None and rss_base is not None else None,
+    }
+
+
+def find_saturation(levels, min_gain, slo_ms):
+    """吞吐不再随 N 增长，或 p95 超过 SLO 的最小 N"""
+    for prev, cur in zip(levels, levels[1:]):
+        gain = cur["throughput_rps"] / prev["throughput_rps"] - 1 if prev["throughput_rps"] and cur["throughput_rps"] else 0
+        if gain < min_gain:
+            return {"sessions": cur["sessions"], "reason": f"throughput gain {gain:.1%} < {min_gain:.0%}"}
+    for level in levels:
+        if level["rerun"]["p95_ms"] > slo_ms:
+            return {"sessions": level["sessions"], "reason": f"p95 {level['rerun']['p95_ms']:.0f}ms > SLO {slo_ms:.0f}ms"}
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent Streamlit session load test")
+    parser.add_argument("--sessions", default="1,2,4,8,16", help="逗号分隔的并发会话数")
+    parser.add_argument("--steps", type=int, default=12, help="每个会话执行的动作数")
+    parser.add_argument("--think-ms", type=float, default=2000, help="动作间随机思考时间上限")
+    parser.add_argument("--latency-ms", type=float, default=0, help="mock 后端延迟")
+    parser.add_argument("--favorites", type=int, default=200, help="每个用户预置的收藏条数")
+    parser.add_argument("--slo-ms", type=float, default=1000, help="rerun p95 SLO")
+    parser.add_argument("--saturation-gain", type=float, default=0.1, help="吞吐增长低于该比例视为饱和")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_report.json")
+    args = parser.parse_args(argv)
+
+    levels = []
+    output = os.path.abspath(args.output)
+    with workdir(), MockGeminiServer({"latency_ms": args.latency_ms, "seed": args.seed}) as mock:
+        os.environ["GEMINI_BASE_URL"] = mock.base_url   # 由服务进程继承
+        favorites = make_favorites(args.favorites)
+        for n in (int(x) for x in args.sessions.split(",")):
+            for name in ["default"] + [f"user{i}_{j}" for i in range(n) for j in range(3)]:
+                with open(f"favorites_{name}.json", "w", encoding="utf-8") as f:
+                    json.dump(favorites, f, ensure_ascii=False)
+            level = run_level(n, args.steps, args.think_ms, args.seed)
+            levels.append(level)
+            print(f"N={n:<4} reruns={level['reruns']:<5} rps={level['throughput_rps']:<8} "
+                  f"p50={level['rerun']['p50_ms']:.0f}ms p95={level['rerun']['p95_ms']:.0f}ms "
+                  f"blobs={level['session_blob_bytes_avg'] / 1024:.0f}KB store={(level['store_compressed_bytes'] or 0) / 1024:.0f}KB "
+                  f"rss={level['server_rss_mb']}MB (+{level['rss_delta_per_session_mb']}MB/session) "
+                  f"errors={level['errors']}", flush=True)
+
+    report = {
+        "environment": environment(),
+        "params": vars(args),
+        "levels": levels,
+        "saturation": find_saturation(levels, args.saturation_gain, args.slo_ms),
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"saturation: {report['saturation']}")
+    print(f"report written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
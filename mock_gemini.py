@@ -0,0 +1,436 @@
+"""
+本地 Mock Gemini 服务 + 录制/回放 (cassette) 代理
+
+用法:
+    # 纯 mock：模拟 models 列表 / generateContent / streamGenerateContent
+    python mock_gemini.py --port 8765 --latency-ms 300 --error 429=0.2 --reject-tools gemini-1.5-flash
+
+    # 录制：转发到真实上游，并把响应写入 cassettes/ (不保存 API Key)
+    python mock_gemini.py --port 8765 --record cassettes/
+
+    # 回放：只从 cassettes/ 返回录制结果，未命中返回 404
+    python mock_gemini.py --port 8765 --replay cassettes/
+
+    # 让应用指向本地服务
+    GEMINI_BASE_URL=http://127.0.0.1:8765/v1beta streamlit run app.py
+
+运行时可通过 POST /_mock/config (JSON) 修改行为，GET /_mock/stats 查看计数。
+"""
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+import http.server
+import urllib.parse
+
+UPSTREAM_URL = "https://generativelanguage.googleapis.com"
+
+DEFAULT_CONFIG = {
+    "models": ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-2.0-flash", "gemini-2.5-flash"],
+    "latency_ms": 0,          # 每次 generateContent 的基础延迟
+    "jitter_ms": 0,           # 均匀分布抖动 [0, jitter_ms)
+    "list_latency_ms": 0,     # models 列表延迟
+    "errors": {},             # 随机错误注入: {"429": 0.2, "500": 0.05}
+    "model_errors": {},       # 固定失败的模型: {"gemini-1.5-flash": 429}
+    "reject_tools": [],       # 带 tools 时返回 400 的模型，"*" 表示全部
+    "script": [],             # 按顺序消费的结果: [429, 400, 200, "malformed"]
+    "malformed_rate": 0.0,    # 返回包裹在说明文字/代码块中的 JSON 的概率
+    "claims": 3,              # 每次核查返回的结论条数
+    "papers": 5,              # 每次检索返回的文献篇数
+    "seed": 0,
+}
+
+
+# --- 合成响应 ---
+def _approx_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _fake_check(rng, n):
+    items = []
+    for i in range(n):
+        items.append({
+            "claim": f"陈述 {i + 1}",
+            "status": rng.choice(["正确", "错误", "存疑", "数据不一致"]),
+            "correction": f"Mock 分析 #{i + 1}：根据模拟数据源给出的综合判断。",
+            "evidence_list": [
+                {"source_name": "IAEA PRIS", "content": "The reactor count is 55. (译文: 反应堆数量为 55。)", "url": "https://pris.iaea.org/"},
+                {"source_name": "中国核能行业协会", "content": f"模拟数据 {rng.randint(50, 60)}", "url": "https://www.china-nea.cn/"},
+            ],
+        })
+    return items
+
+
+def _fake_search(rng, n, query, start=0):
+    papers = []
+    for i in range(start, start + n):
+        year = rng.randint(2015, 2025)
+        papers.append({
+            "title": f"Mock Paper {i + 1} on {query[:40]} (关于 {query[:20]} 的模拟文献)",
+            "authors": f"Author {chr(65 + i % 26)} et al.",
+            "publication": rng.choice(["Nature", "Nuclear Fusion", "Phys. Plasmas", "IAEA"]),
+            "year": str(year),
+            "summary": "A simulated abstract for offline benchmarking. (译文: 用于离线基准测试的模拟摘要。)",
+            "doi": f"10.0000/mock.{year}.{i + 1:04d}",
+            "url": f"https://example.org/mock/{year}/{i + 1}",
+        })
+    return {"overview": f"这是关于「{query[:40]}」的模拟综述，用于离线测试与基准测量。", "papers": papers}
+
+
+def synthesize_text(prompt, config, rng):
+    """根据 prompt 类型生成与真实模型输出格式一致的文本"""
+    if '"papers"' in prompt:
+        m = re.search(r'\*\*用户课题：\*\*\s*"(.*?)"', prompt, re.S)
+        query = m.group(1) if m else "query"
+        data = _fake_search(rng, config["papers"], query)
+        seen = re.search(r'\*\*已列出的文献.*?\n((?:- .*\n)*)', prompt)
+        if seen:
+            # "加载更多"：只返回新文献，编号接在已列出的之后
+            data = {"papers": _fake_search(rng, config["papers"], query, start=seen.group(1).count("\n"))["papers"]}
+        text = json.dumps(data, ensure_ascii=False)
+    elif '"claim"' in prompt:
+        text = json.dumps(_fake_check(rng, config["claims"]), ensure_ascii=False)
+    elif "[REWRITE]" in prompt:
+        text = "[REWRITE]\nThis is a simulated rewrite.\n\n[TRANSLATION]\n这是模拟的改写译文。"
+    else:
+        text = "Mock response."
+    if config["malformed_rate"] and rng.random() < config["malformed_rate"]:
+        text = f"好的，以下是结果：\n```json\n{text}\n```"
+    return text
+
+
+def build_response(text, prompt, grounded):
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}
+    if grounded:
+        candidate["groundingMetadata"] = {
+            "webSearchQueries": ["mock query"],
+            "groundingChunks": [{"web": {"uri": "https://example.org/", "title": "example.org"}}],
+        }
+    prompt_tokens, out_tokens = _approx_tokens(prompt), _approx_tokens(text)
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": out_tokens,
+            "totalTokenCount": prompt_tokens + out_tokens,
+        },
+        "modelVersion": "mock",
+    }
+
+
+def error_body(code, message):
+    status = {400: "INVALID_ARGUMENT", 404: "NOT_FOUND", 429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE"}
+    return {"error": {"code": code, "message": message, "status": status.get(code, "UNKNOWN")}}
+
+
+# --- Cassette ---
+def cassette_key(method, path, query, body):
+    """请求指纹：方法 + 路径 + 去掉 key 的查询参数 + 规范化 JSON body"""
+    params = sorted((k, v) for k, v in urllib.parse.parse_qsl(query) if k != "key")
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False) if body else ""
+    except ValueError:
+        canonical = body.decode("utf-8", "replace") if isinstance(body, bytes) else str(body)
+    raw = f"{method} {path} {params} {canonical}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class CassetteStore:
+    """每个交互一个 JSON 文件：<dir>/<key>.json"""
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, key, record):
+        tmp = self._path(key) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._path(key))
+
+
+# --- HTTP 服务 ---
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, body, content_type="application/json; charset=utf-8"):
+        data = body if isinstance(body, bytes) else json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        self.server.mock.handle(self, "GET", b"")
+
+    def do_POST(self):
+        self.server.mock.handle(self, "POST", self._read_body())
+
+    def do_HEAD(self):
+        self.send_response(200 if self.path.startswith("/v1beta") else 404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class MockGeminiServer:
+    """
+    可嵌入的 mock 服务 (基准测试/压测脚本直接 import 使用):
+
+        with MockGeminiServer({"latency_ms": 50}) as mock:
+            os.environ["GEMINI_BASE_URL"] = mock.base_url
+    """
+    def __init__(self, config=None, host="127.0.0.1", port=0, record_dir=None, replay_dir=None,
+                 upstream=UPSTREAM_URL, replay_latency=False):
+        self._lock = threading.Lock()
+        self.config = dict(DEFAULT_CONFIG)
+        self.configure(config or {})
+        self.host = host
+        self.port = port
+        self.record = CassetteStore(record_dir) if record_dir else None
+        self.replay = CassetteStore(replay_dir) if replay_dir else None
+        self.upstream = upstream.rstrip("/")
+        self.replay_latency = replay_latency
+        self.stats = {"requests": 0, "by_status": {}, "by_route": {}}
+        self._httpd = None
+        self._thread = None
+
+    # --- 配置 ---
+    def configure(self, updates):
+        with self._lock:
+            self.config.update(updates)
+            self.config["script"] = list(self.config.get("script") or [])
+            self._rng = random.Random(self.config["seed"])
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/v1beta"
+
+    # --- 生命周期 ---
+    def start(self):
+        self._httpd = http.server.ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True, name="mock-gemini")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def serve_forever(self):
+        self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            self.stop()
+
+    # --- 请求处理 ---
+    def _count(self, route, status):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["by_status"][str(status)] = self.stats["by_status"].get(str(status), 0) + 1
+            self.stats["by_route"][route] = self.stats["by_route"].get(route, 0) + 1
+
+    def handle(self, h, method, body):
+        parsed = urllib.parse.urlsplit(h.path)
+        path, query = parsed.path, parsed.query
+
+        if path == "/_mock/stats":
+            return h._send(200, self.stats)
+        if path == "/_mock/config":
+            if method == "POST":
+                self.configure(json.loads(body or b"{}"))
+            return h._send(200, {k: v for k, v in self.config.items()})
+
+        if self.record:
+            return self._proxy_and_record(h, method, path, query, body)
+        if self.replay:
+            return self._replay(h, method, path, query, body)
+
+        if method == "GET" and path.rstrip("/") == "/v1beta/models":
+            time.sleep(self.config["list_latency_ms"] / 1000)
+            models = [{"name": f"models/{m}", "supportedGenerationMethods": ["generateContent", "countTokens"]}
+                      for m in self.config["models"]]
+            self._count("models", 200)
+            return h._send(200, {"models": models})
+
+        m = re.match(r"^/v1beta/models/([^/:]+):(generateContent|streamGenerateContent)$", path)
+        if method == "POST" and m:
+            return self._generate(h, m.group(1), m.group(2), query, body)
+
+        self._count("unknown", 404)
+        return h._send(404, error_body(404, f"Unknown route {method} {path}"))
+
+    def _next_outcome(self, model, payload):
+        """决定本次请求的结果：脚本 > 固定失败模型 > 工具拒绝 > 随机错误"""
+        with self._lock:
+            if self.config["script"]:
+                return self.config["script"].pop(0)
+            if model in self.config["model_errors"]:
+                return int(self.config["model_errors"][model])
+            reject = self.config["reject_tools"]
+            if "tools" in payload and ("*" in reject or model in reject):
+                return 400
+            roll = self._rng.random()
+            acc = 0.0
+            for code, rate in self.config["errors"].items():
+                acc += float(rate)
+                if roll < acc:
+                    return int(code)
+            return 200
+
+    def _generate(self, h, model, method_name, query, body):
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            self._count(method_name, 400)
+            return h._send(400, error_body(400, "Invalid JSON payload"))
+
+        with self._lock:
+            delay = self.config["latency_ms"] + (self._rng.random() * self.config["jitter_ms"] if self.config["jitter_ms"] else 0)
+        time.sleep(delay / 1000)
+
+        # 与真实 API 一致：JSON 模式不能与工具同时使用；JSON 模式下输出总是合法 JSON
+        json_mode = (payload.get("generationConfig") or {}).get("responseMimeType") == "application/json"
+        if json_mode and "tools" in payload:
+            self._count(method_name, 400)
+            return h._send(400, error_body(400, "Tool use with a response mime type: 'application/json' is unsupported"))
+
+        outcome = self._next_outcome(model, payload)
+        if outcome != 200 and outcome != "malformed":
+            code = int(outcome)
+            msg = "Tool use with function calling is unsupported" if code == 400 else f"Mock error {code}"
+            self._count(method_name, code)
+            return h._send(code, error_body(code, msg))
+
+        prompt = "".join(p.get("text", "") for c in payload.get("contents", []) for p in c.get("parts", []))
+        with self._lock:
+            text = synthesize_text(prompt, dict(self.config, malformed_rate=0) if json_mode else self.config, self._rng)
+        if outcome == "malformed":
+            text = f"以下是结果：\n```json\n{text[: max(1, len(text) * 2 // 3)]}"
+        grounded = "tools" in payload
+        self._count(method_name, 200)
+
+        if method_name == "generateContent":
+            return h._send(200, build_response(text, prompt, grounded))
+
+        # streamGenerateContent：按块切分，alt=sse 时输出 SSE，否则输出 JSON 数组
+        step = max(1, len(text) // 4)
+        chunks = [build_response(text[i:i + step], prompt, grounded and i == 0) for i in range(0, len(text), step)]
+        if "alt=sse" in query:
+            data = "".join(f"data: {json.dumps(c, ensure_ascii=False)}\r\n\r\n" for c in chunks).encode("utf-8")
+            return h._send(200, data, "text/event-stream")
+        return h._send(200, chunks)
+
+    # --- 录制/回放 ---
+    def _proxy_and_record(self, h, method, path, query, body):
+        import requests  # 仅录制模式需要
+        key = cassette_key(method, path, query, body)
+        url = f"{self.upstream}{path}" + (f"?{query}" if query else "")
+        t0 = time.perf_counter()
+        resp = requests.request(method, url, data=body or None, headers={"Content-Type": "application/json"})
+        elapsed = (time.perf_counter() - t0) * 1000
+        content_type = resp.headers.get("Content-Type", "application/json")
+        self.record.save(key, {
+            "request": {
+                "method": method,
+                "path": path,
+                "query": [(k, v) for k, v in urllib.parse.parse_qsl(query) if k != "key"],
+                "body": json.loads(body) if body else None,
+            },
+            "response": {"status": resp.status_code, "content_type": content_type, "body": resp.text},
+            "latency_ms": round(elapsed, 1),
+            "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        self._count("record", resp.status_code)
+        return h._send(resp.status_code, resp.content, content_type)
+
+    def _replay(self, h, method, path, query, body):
+        record = self.replay.load(cassette_key(method, path, query, body))
+        if record is None:
+            self._count("replay_miss", 404)
+            return h._send(404, error_body(404, f"No cassette for {method} {path}"))
+        if self.replay_latency:
+            time.sleep(record.get("latency_ms", 0) / 1000)
+        resp = record["response"]
+        self._count("replay", resp["status"])
+        return h._send(resp["status"], resp["body"].encode("utf-8"), resp.get("content_type", "application/json"))
+
+
+def _parse_errors(values):
+    errors = {}
+    for item in values or []:
+        code, _, rate = item.partition("=")
+        errors[code] = float(rate or 1.0)
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local mock Gemini server with record/replay")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenario", help="JSON 配置文件 (字段同 DEFAULT_CONFIG)")
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--jitter-ms", type=float)
+    parser.add_argument("--error", action="append", metavar="CODE=RATE", help="随机错误注入，可重复，例如 429=0.2")
+    parser.add_argument("--reject-tools", action="append", metavar="MODEL", help="带 tools 时返回 400 的模型 ('*' 表示全部)")
+    parser.add_argument("--malformed-rate", type=float)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--record", metavar="DIR", help="录制模式：转发到上游并写入 cassette")
+    parser.add_argument("--replay", metavar="DIR", help="回放模式：只返回 cassette 中的响应")
+    parser.add_argument("--replay-latency", action="store_true", help="回放时复现录制的延迟")
+    parser.add_argument("--upstream", default=UPSTREAM_URL)
+    args = parser.parse_args(argv)
+
+    config = {}
+    if args.scenario:
+        with open(args.scenario, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    for name in ("latency_ms", "jitter_ms", "malformed_rate", "seed"):
+        if getattr(args, name) is not None:
+            config[name] = getattr(args, name)
+    if args.error:
+        config["errors"] = _parse_errors(args.error)
+    if args.reject_tools:
+        config["reject_tools"] = args.reject_tools
+
+    server = MockGeminiServer(config, host=args.host, port=args.port, record_dir=args.record,
+                              replay_dir=args.replay, upstream=args.upstream, replay_latency=args.replay_latency)
+    mode = "record" if args.record else "replay" if args.replay else "mock"
+    print(f"Mock Gemini ({mode}) listening on http://{args.host}:{args.port}/v1beta")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Nuclear Knowledge Hub 核心库：可脱离 Streamlit 导入使用
+
+    from nuclear_check import run_check
+    result = run_check("中国现在有58座核电站？", api_key)
+"""
+from .api import get_prioritized_models, smart_api_call, get_response_text
+from .parsing import parse_json_response, repair_json, split_rewrite
+from .pipelines import PipelineError, run_check, run_search, run_search_more, append_search_page, run_rewrite
+from . import favorites
+
+__all__ = [
+    "get_prioritized_models",
+    "smart_api_call",
+    "get_response_text",
+    "parse_json_response",
+    "repair_json",
+    "split_rewrite",
+    "PipelineError",
+    "run_check",
+    "run_search",
+    "run_search_more",
+    "append_search_page",
+    "run_rewrite",
+    "favorites",
+]
@@ -0,0 +1,159 @@
+"""
+Gemini REST 调用：模型轮换、自动切换与响应提取
+"""
+import re
+import time
+
+import requests
+
+from . import tracing
+from .config import get_base_url
+
+
+# --- 核心函数：获取模型轮换列表 (Model Rotation) ---
+@tracing.traced("models.list")
+def get_prioritized_models(api_key, base_url=None):
+    """
+    返回一个按优先级排序的可用模型列表。
+    """
+    if not api_key: return [], "API Key 未配置"
+    url = f"{base_url or get_base_url()}/models?key={api_key}"
+    try:
+        response = requests.get(url)
+        if response.status_code != 200:
+            return [], f"连接失败: {response.text}"
+
+        data = response.json()
+        models = data.get('models', [])
+
+        available_names = [m['name'] for m in models if 'generateContent' in m.get('supportedGenerationMethods', [])]
+
+        if not available_names: return [], "未找到任何可用模型"
+
+        priority_keywords = [
+            'gemini-1.5-flash',
+            'gemini-1.5-flash-8b',
+            'gemini-2.0-flash',
+            'gemini-2.5-flash',
+            'gemini-1.5-pro'
+        ]
+
+        sorted_models = []
+        for kw in priority_keywords:
+            for name in available_names:
+                if kw in name and name not in sorted_models:
+                    sorted_models.append(name)
+
+        for name in available_names:
+            if name not in sorted_models:
+                sorted_models.append(name)
+
+        return sorted_models, "Success"
+
+    except Exception as e:
+        return [], str(e)
+
+
+def supports_structured_output(model_name):
+    """responseSchema 需要 Gemini 1.5 及以上"""
+    return bool(re.search(r'gemini-(1\.5|[2-9])', model_name))
+
+
+def _with_generation_config(payload, generation_config, model_name):
+    """JSON 模式不能与 google_search 同时使用，只加在不带 tools 的请求上"""
+    if not generation_config or "tools" in payload or not supports_structured_output(model_name):
+        return payload
+    return {**payload, "generationConfig": {**payload.get("generationConfig", {}), **generation_config}}
+
+
+# --- 增强版 API 调用：支持模型自动切换 ---
+@tracing.traced("api.call")
+def smart_api_call(model_list, payload, api_key, status_box=None, base_url=None, generation_config=None):
+    """
+    智能调用函数：自动轮询模型，处理 429/400 错误
+    status_box: 任意带 write() 方法的进度输出对象 (st.status / CLI 进度打印等)
+    generation_config: 结构化输出配置 (见 schemas.generation_config)，仅用于不带 tools 的请求
+    返回的 response 上附带 call_meta (模型、尝试次数、上游延迟)，供用量统计使用
+    """
+    last_error = None
+    attempts = 0
+    call_start = time.perf_counter()
+    base_url = base_url or get_base_url()
+
+    def _post(url, body, model_name):
+        nonlocal attempts
+        attempts += 1
+        t0 = time.perf_counter()
+        with tracing.span("api.attempt", model=model_name, attempt=attempts) as sp:
+            resp = requests.post(url, headers={'Content-Type': 'application/json'}, json=body)
+            sp.set(status=resp.status_code)
+        tracing.inc("nc_api_attempts_total", help_text="Gemini generateContent attempts", model=model_name.replace('models/', ''), status=resp.status_code)
+        tracing.observe("nc_api_latency_seconds", time.perf_counter() - t0, help_text="Gemini upstream latency", model=model_name.replace('models/', ''))
+        resp.call_meta = {
+            "model": model_name.replace('models/', ''),
+            "attempts": attempts,
+            "latency_ms": round((time.perf_counter() - t0) * 1000, 1),
+            "total_ms": round((time.perf_counter() - call_start) * 1000, 1),
+        }
+        return resp
+
+    for i, model_name in enumerate(model_list):
+        if not model_name.startswith("models/"):
+            full_model_name = f"models/{model_name}"
+        else:
+            full_model_name = model_name
+
+        api_url = f"{base_url}/{full_model_name}:generateContent?key={api_key}"
+
+        if status_box:
+            status_box.write(f"🔄 正在尝试模型节点 ({i+1}/{len(model_list)}): `{model_name.replace('models/', '')}` ...")
+
+        try:
+            response = _post(api_url, _with_generation_config(payload, generation_config, model_name), model_name)
+
+            if response.status_code == 200:
+                return response
+
+            elif response.status_code == 400:
+                if "tools" in payload:
+                    if status_box: status_box.write("⚠️ 检测到工具兼容性问题，正在切换至纯文本分析模式...")
+                    payload_no_tools = payload.copy()
+                    del payload_no_tools["tools"]
+                    with tracing.span("api.retry_no_tools", model=model_name):
+                        response_retry = _post(api_url, _with_generation_config(payload_no_tools, generation_config, model_name), model_name)
+                    if response_retry.status_code == 200:
+                        return response_retry
+                last_error = response
+                continue
+
+            elif response.status_code in [429, 503, 500]:
+                if status_box: status_box.write(f"⏳ 模型 `{model_name}` 繁忙或配额耗尽，自动切换下一节点...")
+                time.sleep(1)
+                last_error = response
+                continue
+
+            else:
+                last_error = response
+                continue
+
+        except Exception as e:
+            if status_box: status_box.write(f"❌ 网络异常: {e}")
+            continue
+
+    return last_error
+
+
+# --- 辅助函数：安全提取 ---
+@tracing.traced("response.extract")
+def get_response_text(response):
+    """安全提取响应文本，避免 IndexError"""
+    if not response: return None
+    try:
+        data = response.json()
+        if 'candidates' in data and data['candidates']:
+            parts = data['candidates'][0].get('content', {}).get('parts', [])
+            if parts:
+                return parts[0].get('text', '')
+        return None
+    except Exception as e:
+        return None
@@ -0,0 +1,286 @@
+"""
+批量核查：CSV/JSONL 陈述文件 → 有界并发 + 限速 → 流式输出 JSONL/CSV，支持断点续跑
+
+输入：
+    CSV   需包含 claim 或 text 列 (否则取第一列)，可选 id 列
+    JSONL 每行一个对象，字段 claim/text，可选 id；无法解析的行跳过并报告行号
+    未提供 id 时按陈述内容的哈希生成，插入或删除行后续跑不会错位
+输出：
+    每完成一条立即追加一行 (JSONL 或 CSV，由输出文件扩展名决定)，
+    同时在 <output>.ckpt 中记录已完成的 id。重启后跳过 checkpoint 中状态为 ok
+    的条目；失败条目会重新执行，并在输出中追加新的一行 (以最后一行为准)。
+"""
+import io
+import os
+import csv
+import json
+import time
+import hashlib
+import threading
+import concurrent.futures
+
+from . import tracing
+from .pipelines import PipelineError, run_check
+from .usage import record_usage
+
+BATCH_FIELDS = ["id", "claim", "status", "elapsed_ms", "model", "attempts", "total_tokens", "verdicts", "error", "result"]
+
+
+# --- 输入 ---
+def _claim_text(row):
+    for key in ("claim", "text", "statement", "content"):
+        if row.get(key):
+            return str(row[key]).strip()
+    return ""
+
+
+def claim_id(text):
+    """未提供 id 时由陈述内容生成 (插入/删除行后续跑，已完成的条目 id 不变)"""
+    return "c" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def _json_array(content):
+    """整个内容是一个 JSON 数组时返回该列表 (可跨多行缩进)，否则返回 None 按 JSONL 处理"""
+    if not content.lstrip().startswith("["): return None
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return None
+    return data if isinstance(data, list) else None
+
+
+def load_claims(path=None, content=None, fmt=None):
+    """
+    path: 文件路径 (不存在时抛出 FileNotFoundError)；content: 文本或字节内容 (UI 上传)
+    非 CSV 内容按 JSONL 解析；整个文件是一个 JSON 数组 (.json) 时按数组元素解析
+    返回 (claims, errors)：claims 为 [{"id": str, "claim": str}]，跳过空行；
+    无法解析的 JSONL 行 / 数组元素跳过，并在 errors 中记录 "第 N 行: 原因" / "第 N 项: 原因"
+    """
+    if path is not None:
+        fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+        with open(path, "r", encoding="utf-8-sig") as f:
+            content = f.read()
+    else:
+        content = content.decode("utf-8-sig") if isinstance(content, bytes) else (content or "")
+        fmt = fmt or ("jsonl" if content.lstrip().startswith(("{", "[")) else "csv")
+
+    rows, errors = [], []
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(content))
+        fields = [f.strip().lower() for f in (reader.fieldnames or [])]
+        reader.fieldnames = fields
+        for row in reader:
+            text = _claim_text(row) or (str(row.get(fields[0], "")).strip() if fields else "")
+            rows.append((row.get("id"), text))
+    else:
+        items = _json_array(content)
+        if items is not None:
+            entries = [(f"第 {i} 项", obj) for i, obj in enumerate(items, 1)]
+        else:
+            entries = []
+            for lineno, line in enumerate(content.splitlines(), 1):
+                line = line.strip()
+                if not line: continue
+                try:
+                    entries.append((f"第 {lineno} 行", json.loads(line)))
+                except ValueError as e:
+                    errors.append(f"第 {lineno} 行: JSON 格式错误 ({e})")
+        for where, obj in entries:
+            if isinstance(obj, str):
+                rows.append((None, obj.strip()))
+            elif isinstance(obj, dict):
+                rows.append((obj.get("id"), _claim_text(obj)))
+            else:
+                errors.append(f"{where}: 应为对象或字符串")
+
+    claims, seen = [], set()
+    for given_id, text in rows:
+        if not text: continue
+        cid = str(given_id) if given_id not in (None, "") else claim_id(text)
+        # 没有 id 的重复陈述按出现顺序加后缀区分
+        base, n = cid, 1
+        while cid in seen:
+            n += 1
+            cid = f"{base}-{n}"
+        seen.add(cid)
+        claims.append({"id": cid, "claim": text})
+    return claims, errors
+
+
+# --- 限速 ---
+class RateLimiter:
+    """令牌桶：平均 rate 次/秒，允许 burst 次突发；rate<=0 表示不限速"""
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0: return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# --- 断点与输出 ---
+def checkpoint_path_for(output_path):
+    return f"{output_path}.ckpt"
+
+
+def load_checkpoint(path):
+    """返回 {id: status}；文件不存在时为空"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # 崩溃时可能写了半行
+            done[rec["id"]] = rec["status"]
+    return done
+
+
+class ResultWriter:
+    """线程安全的流式写出：每条结果写入后立即 flush，并记录 checkpoint"""
+    def __init__(self, output_path, checkpoint_path):
+        self.fmt = "csv" if output_path.lower().endswith(".csv") else "jsonl"
+        new_file = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self._out = open(output_path, "a", encoding="utf-8", newline="")
+        self._ckpt = open(checkpoint_path, "a", encoding="utf-8")
+        self._csv = csv.DictWriter(self._out, fieldnames=BATCH_FIELDS) if self.fmt == "csv" else None
+        if self._csv and new_file:
+            self._csv.writeheader()
+        self._lock = threading.Lock()
+
+    def write(self, row):
+        with self._lock:
+            if self._csv:
+                flat = dict(row)
+                flat["result"] = json.dumps(row.get("result"), ensure_ascii=False)
+                flat["verdicts"] = "|".join(row.get("verdicts") or [])
+                self._csv.writerow(flat)
+            else:
+                self._out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self._out.flush()
+            self._ckpt.write(json.dumps({"id": row["id"], "status": row["status"]}, ensure_ascii=False) + "\n")
+            self._ckpt.flush()
+
+    def close(self):
+        self._out.close()
+        self._ckpt.close()
+
+
+# --- 执行 ---
+def check_one(claim, api_key, limiter=None, retries=1, base_url=None):
+    """核查单条陈述，返回输出行 (不抛异常)"""
+    start = time.perf_counter()
+    row = {"id": claim["id"], "claim": claim["claim"], "status": "error", "error": None, "result": None, "verdicts": []}
+    for attempt in range(retries + 1):
+        if limiter: limiter.acquire()
+        try:
+            result = run_check(claim["claim"], api_key, None, base_url)
+        except PipelineError as e:
+            row["error"] = str(e)
+            continue
+        except Exception as e:
+            row["error"] = f"{type(e).__name__}: {e}"
+            continue
+        data = result.get("data")
+        usage = result.get("usage") or {}
+        record_usage(usage)
+        row.update({
+            "status": "ok" if isinstance(data, list) else "unparsed",
+            "error": None,
+            "result": data if isinstance(data, list) else result.get("raw"),
+            "verdicts": [item.get("status", "") for item in data] if isinstance(data, list) else [],
+            "model": usage.get("model"),
+            "attempts": usage.get("attempts"),
+            "total_tokens": usage.get("total_tokens"),
+        })
+        break
+    row["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return row
+
+
+def run_batch(claims, api_key, output_path, workers=4, rate=1.0, retries=1, checkpoint_path=None,
+              on_result=None, base_url=None):
+    """
+    并发核查 claims，结果流式写入 output_path。
+    on_result(row, done, total) 在调用线程中回调 (可安全更新 Streamlit 进度条)。
+    返回汇总 {"total", "skipped", "ok", "unparsed", "error", "elapsed_s"}
+    """
+    checkpoint_path = checkpoint_path or checkpoint_path_for(output_path)
+    completed = load_checkpoint(checkpoint_path)
+    pending = [c for c in claims if completed.get(c["id"]) != "ok"]
+    rerequests = sum(1 for c in pending if completed.get(c["id"]) == "unparsed")
+    if rerequests:
+        tracing.inc("nc_parse_rerequests_total", value=rerequests, help_text="Full re-requests after an unparsed result", feature="check")
+    summary = {"total": len(claims), "skipped": len(claims) - len(pending), "ok": 0, "unparsed": 0, "error": 0}
+    limiter = RateLimiter(rate, burst=workers)
+    writer = ResultWriter(output_path, checkpoint_path)
+    start = time.perf_counter()
+    done = summary["skipped"]
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(check_one, c, api_key, limiter, retries, base_url) for c in pending]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    row = future.result()
+                    writer.write(row)
+                    summary[row["status"]] += 1
+                    done += 1
+                    if on_result:
+                        on_result(row, done, len(claims))
+            except BaseException:
+                # 中断时丢弃未开始的任务，已完成的结果均已落盘，可续跑
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        writer.close()
+    summary["elapsed_s"] = round(time.perf_counter() - start, 2)
+    return summary
+
+
+# --- 结果读取 ---
+def read_results(output_path):
+    """读取结果文件，同一 id 以最后一行为准，按首次出现顺序返回"""
+    latest = {}
+    if not os.path.exists(output_path):
+        return []
+    with open(output_path, "r", encoding="utf-8", newline="") as f:
+        if output_path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                latest[row["id"]] = row
+        else:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                latest[row["id"]] = row
+    return list(latest.values())
+
+
+def results_to_csv(rows):
+    """将 JSONL 结果行转换为 CSV 文本 (供下载)"""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=BATCH_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        flat = dict(row)
+        flat["result"] = json.dumps(row.get("result"), ensure_ascii=False)
+        flat["verdicts"] = "|".join(row.get("verdicts") or [])
+        writer.writerow(flat)
+    return buf.getvalue()
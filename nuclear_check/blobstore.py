@@ -0,0 +1,268 @@
+"""
+共享结果存储：内容寻址 (sha256)、zlib 压缩、跨会话去重；session_state 中只保存引用
+
+- BlobStore：进程级存储。被引用的 blob 不会被淘汰；引用数归零后进入空闲 LRU，
+  总压缩体积超过 NC_BLOB_STORE_MB 时从最久未用的空闲 blob 开始释放
+- SessionMemory：单个会话的槽位 (check_result / search_result / favorites ...)，
+  结果槽位压缩后合计超过 NC_SESSION_CAP_KB 时淘汰最早写入的结果 (每次 rerun 都会按
+  标签页顺序读取全部槽位，读取不计入先后，否则淘汰顺序只取决于标签页顺序)；
+  带 loader 的槽位 (如收藏夹可从文件重新加载) 单独计量，不参与淘汰——
+  否则收藏夹本身超过上限时，结果与收藏夹会在每次 rerun 中互相挤出
+- 解码结果有一个按体积限制的小缓存，rerun 时无需重复解压；返回的对象为共享只读数据
+"""
+import os
+import json
+import zlib
+import weakref
+import hashlib
+import threading
+import collections
+
+BLOB_STORE_BYTES = int(float(os.environ.get("NC_BLOB_STORE_MB", "256")) * 1024 * 1024)
+SESSION_CAP_BYTES = int(float(os.environ.get("NC_SESSION_CAP_KB", "2048")) * 1024)
+DECODED_CACHE_BYTES = int(float(os.environ.get("NC_BLOB_DECODED_MB", "32")) * 1024 * 1024)
+
+# 结果字典中留在 session_state 的小字段 (finish_usage 会原地修改 usage)
+LIGHT_KEYS = ("usage", "links", "cache", "pages")
+
+
+class BlobStore:
+    """线程安全的内容寻址存储 (所有会话共享)"""
+    def __init__(self, max_bytes=BLOB_STORE_BYTES, decoded_bytes=DECODED_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.decoded_bytes = decoded_bytes
+        self._blobs = {}                          # ref -> [compressed, refcount, raw_size]
+        self._idle = collections.OrderedDict()    # refcount 为 0 的 ref (LRU)
+        self._decoded = collections.OrderedDict() # ref -> (obj, raw_size)
+        self._decoded_size = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self._deferred = collections.deque()      # 会话回收时待释放的 ref (见 defer_release)
+        self.stats = {"puts": 0, "dedup_hits": 0, "evictions": 0}
+
+    def put(self, obj):
+        """写入并增加引用，返回 ref；相同内容只存一份"""
+        raw = json.dumps(obj, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+        ref = hashlib.sha256(raw).hexdigest()[:32]
+        with self._lock:
+            self._drain_deferred()
+            self.stats["puts"] += 1
+            entry = self._blobs.get(ref)
+            if entry is not None:
+                self.stats["dedup_hits"] += 1
+                entry[1] += 1
+                self._idle.pop(ref, None)
+                return ref
+            data = zlib.compress(raw, 6)
+            self._blobs[ref] = [data, 1, len(raw)]
+            self._size += len(data)
+            self._trim()
+        return ref
+
+    def get(self, ref):
+        """解码 blob；不存在时返回 None"""
+        with self._lock:
+            cached = self._decoded.get(ref)
+            if cached is not None:
+                self._decoded.move_to_end(ref)
+                return cached[0]
+            entry = self._blobs.get(ref)
+            if entry is None: return None
+            data, _, raw_size = entry
+        obj = json.loads(zlib.decompress(data))
+        with self._lock:
+            if ref not in self._decoded and raw_size <= self.decoded_bytes:
+                self._decoded[ref] = (obj, raw_size)
+                self._decoded_size += raw_size
+                while self._decoded_size > self.decoded_bytes:
+                    _, (_, size) = self._decoded.popitem(last=False)
+                    self._decoded_size -= size
+        return obj
+
+    def _release_locked(self, ref):
+        entry = self._blobs.get(ref)
+        if entry is None: return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            entry[1] = 0
+            self._idle[ref] = True
+
+    def _drain_deferred(self):
+        while self._deferred:
+            self._release_locked(self._deferred.popleft())
+
+    def release(self, ref):
+        with self._lock:
+            self._drain_deferred()
+            self._release_locked(ref)
+            self._trim()
+
+    def release_many(self, refs):
+        with self._lock:
+            self._drain_deferred()
+            for ref in list(refs):
+                self._release_locked(ref)
+            self._trim()
+
+    def defer_release(self, refs):
+        """
+        供 weakref.finalize 使用：GC 可能在任意线程、甚至在本对象持锁期间触发，
+        因此这里不取锁，只把 ref 排队，由下一次 put/release/summary 统一释放
+        """
+        self._deferred.extend(list(refs.values()) if isinstance(refs, dict) else list(refs))
+
+    def sizes(self, ref):
+        """返回 (压缩体积, 原始体积)"""
+        entry = self._blobs.get(ref)
+        return (len(entry[0]), entry[2]) if entry else (0, 0)
+
+    def _trim(self):
+        while self._size > self.max_bytes and self._idle:
+            ref, _ = self._idle.popitem(last=False)
+            data = self._blobs.pop(ref)[0]
+            self._size -= len(data)
+            if ref in self._decoded:
+                self._decoded_size -= self._decoded.pop(ref)[1]
+            self.stats["evictions"] += 1
+
+    def summary(self):
+        with self._lock:
+            self._drain_deferred()
+            self._trim()
+            raw = sum(e[2] for e in self._blobs.values())
+            return {
+                "blobs": len(self._blobs),
+                "referenced": len(self._blobs) - len(self._idle),
+                "compressed_bytes": self._size,
+                "raw_bytes": raw,
+                "decoded_cache_bytes": self._decoded_size,
+                **self.stats,
+            }
+
+
+class _SessionSlots:
+    """保存在 session_state 中的槽位元数据；会话销毁 (被回收) 时释放其全部引用"""
+    def __init__(self, store):
+        self.order = []   # 按写入先后排列，最早写入的在前
+        self.evicted = []
+        self.evictions = 0
+        self.refs = {}   # slot -> ref
+        weakref.finalize(self, store.defer_release, self.refs)
+
+
+class SessionMemory:
+    """
+    state: 任意 MutableMapping (st.session_state 或普通 dict)
+    槽位值为 {"_ref": ref, **LIGHT_KEYS 中的小字段}；列表等非字典值整体存入 blob
+    loaders: {slot: callable}，槽位被淘汰或尚未加载时调用以恢复数据
+    """
+    META_KEY = "_blob_slots"
+
+    def __init__(self, state, store=None, cap_bytes=SESSION_CAP_BYTES, loaders=None):
+        self.state = state
+        self.store = store or get_default_store()
+        self.cap_bytes = cap_bytes
+        self.loaders = loaders or {}
+        if self.META_KEY not in state:
+            state[self.META_KEY] = _SessionSlots(self.store)
+        self.meta = state[self.META_KEY]
+
+    def _touch(self, slot):
+        order = self.meta.order
+        if slot in order:
+            order.remove(slot)
+        order.append(slot)
+
+    def put(self, slot, value):
+        self.drop(slot)
+        if value is None:
+            self.state[slot] = None
+            return
+        if isinstance(value, dict):
+            light = {k: value[k] for k in LIGHT_KEYS if k in value}
+            ref = self.store.put({k: v for k, v in value.items() if k not in LIGHT_KEYS})
+            self.state[slot] = {"_ref": ref, **light}
+        else:
+            ref = self.store.put(value)
+            self.state[slot] = {"_ref": ref, "_whole": True}
+        self.meta.refs[slot] = ref
+        self._touch(slot)
+        if slot in self.meta.evicted:
+            self.meta.evicted.remove(slot)
+        self._enforce(keep=slot)
+
+    def get(self, slot):
+        """返回槽位数据 (字典为新的浅拷贝，usage 等小字段与 session_state 共享)"""
+        entry = self.state.get(slot)
+        if isinstance(entry, dict) and "_ref" in entry:
+            value = self.store.get(entry["_ref"])
+            if value is not None:
+                if entry.get("_whole"):
+                    return value
+                return {**value, **{k: v for k, v in entry.items() if not k.startswith("_")}}
+        elif entry is not None:
+            return entry   # 尚未托管的旧值
+        loader = self.loaders.get(slot)
+        if loader is None: return None
+        value = loader()
+        self.put(slot, value)
+        return value
+
+    def drop(self, slot):
+        ref = self.meta.refs.pop(slot, None)
+        if ref is not None:
+            self.store.release(ref)
+        self.state[slot] = None
+        if slot in self.meta.order:
+            self.meta.order.remove(slot)
+
+    def _slot_sizes(self, slot):
+        ref = self.meta.refs.get(slot)
+        return self.store.sizes(ref) if ref else (0, 0)
+
+    def _capped_slots(self):
+        """计入会话上限的槽位 (不含可由 loader 恢复的槽位)"""
+        return [s for s in self.meta.order if s not in self.loaders]
+
+    def _enforce(self, keep=None):
+        """结果槽位超出上限时从最早写入的开始淘汰 (保留刚写入的 keep)"""
+        while sum(self._slot_sizes(s)[0] for s in self._capped_slots()) > self.cap_bytes:
+            victims = [s for s in self._capped_slots() if s != keep]
+            if not victims: break
+            victim = victims[0]
+            self.drop(victim)
+            self.meta.evictions += 1
+            if victim not in self.meta.evicted:
+                self.meta.evicted.append(victim)
+
+    def was_evicted(self, slot):
+        return slot in self.meta.evicted
+
+    def footprint(self):
+        """单会话占用：每个槽位的压缩/原始体积、计入上限的合计与上限"""
+        slots = {}
+        for slot in self.meta.order:
+            compressed, raw = self._slot_sizes(slot)
+            slots[slot] = {"compressed_bytes": compressed, "raw_bytes": raw, "reloadable": slot in self.loaders}
+        capped = [s for slot, s in slots.items() if not s["reloadable"]]
+        return {
+            "slots": slots,
+            "compressed_bytes": sum(s["compressed_bytes"] for s in capped),
+            "raw_bytes": sum(s["raw_bytes"] for s in capped),
+            "reloadable_bytes": sum(s["compressed_bytes"] for s in slots.values() if s["reloadable"]),
+            "cap_bytes": self.cap_bytes,
+            "evictions": self.meta.evictions,
+        }
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_default_store():
+    """进程级共享存储 (上限由 NC_BLOB_STORE_MB 指定)"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = BlobStore()
+    return _default_store
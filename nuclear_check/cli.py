@@ -0,0 +1,196 @@
+"""
+命令行入口：nuclear-check check|search|rewrite|batch
+
+    nuclear-check check "中国现在有58座核电站？"
+    nuclear-check search "可控核聚变 2024 突破" --format json > result.json
+    nuclear-check search "可控核聚变 2024 突破" --more 2
+    cat draft.txt | nuclear-check rewrite -
+    nuclear-check batch claims.csv -o results.jsonl --workers 4 --rate 1
+
+API Key 取自 --api-key 或环境变量 GEMINI_API_KEY；GEMINI_BASE_URL 可指向本地 mock。
+退出码：0 成功，1 请求失败，2 参数错误。
+"""
+import sys
+import json
+import time
+import argparse
+
+
+class StderrProgress:
+    """与 st.status 相同的 write() 接口，进度输出到 stderr"""
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+
+    def write(self, message):
+        if not self.quiet:
+            print(message, file=sys.stderr, flush=True)
+
+
+def _read_input(args):
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            return f.read()
+    if args.text in (None, "-"):
+        if args.text is None and sys.stdin.isatty():
+            return ""
+        return sys.stdin.read()
+    return args.text
+
+
+# --- 文本格式输出 ---
+LINK_MARKS = {"ok": " [✔ 已验证]", "dead": " [✖ 失效]", "unknown": " [? 无法验证]"}
+
+
+def _link_mark(result, url=None, doi=None):
+    """--verify-links 时追加校验结果"""
+    if not result.get("links"): return ""
+    from .links import link_key
+    return LINK_MARKS.get(result["links"].get(link_key(url=url, doi=doi)), "")
+
+
+def format_check(result):
+    data = result.get("data")
+    if not (data and isinstance(data, list)):
+        return result.get("raw") or ""
+    lines = []
+    for item in data:
+        status = item.get('status', '存疑')
+        icon = "❌" if "错" in status else "⚠️" if ("疑" in status or "不一致" in status) else "✅"
+        lines.append(f"{icon} {status}")
+        lines.append(f"陈述：{item.get('claim', '')}")
+        lines.append(f"专家分析：{item.get('correction', '无详细分析')}")
+        for ev in item.get('evidence_list', []):
+            lines.append(f"  - [{ev.get('source_name', '来源')}] {ev.get('content', '')} <{ev.get('url', '')}>{_link_mark(result, url=ev.get('url'))}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def format_search(result):
+    data = result.get("data")
+    if not (data and isinstance(data, dict)):
+        return result.get("raw") or ""
+    lines = []
+    if data.get('overview'):
+        lines += ["学术综述：", data['overview'], ""]
+    for idx, item in enumerate(data.get('papers', []), 1):
+        lines.append(f"{idx}. {item.get('title', '无标题')}")
+        lines.append(f"   {item.get('authors', 'N/A')} | {item.get('publication', 'N/A')}, {item.get('year', 'N/A')}")
+        if item.get('doi'): lines.append(f"   DOI: {item['doi']}{_link_mark(result, doi=item['doi'])}")
+        if item.get('url'): lines.append(f"   {item['url']}{_link_mark(result, url=item['url'])}")
+        if item.get('summary'): lines.append(f"   {item['summary']}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def format_rewrite(result):
+    text = result.get("rewrite", "")
+    if result.get("translation"):
+        text += "\n\n---\n" + result["translation"]
+    return text
+
+
+FORMATTERS = {"check": format_check, "search": format_search, "rewrite": format_rewrite}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="nuclear-check", description="Nuclear Knowledge Hub 命令行工具")
+    parser.add_argument("--api-key", help="Gemini API Key (默认读取环境变量 GEMINI_API_KEY)")
+    parser.add_argument("--base-url", help="API 地址 (默认读取环境变量 GEMINI_BASE_URL)")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="输出格式")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不输出进度信息")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("check", "智能核查"), ("search", "学术检索"), ("rewrite", "学术改写")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("text", nargs="?", help="输入文本；'-' 或省略时从 stdin 读取")
+        p.add_argument("-f", "--file", help="从文件读取输入")
+        if name != "rewrite":
+            p.add_argument("--verify-links", action="store_true", help="并发校验结果中的链接/DOI")
+        if name == "search":
+            p.add_argument("--more", type=int, default=0, metavar="N", help="再加载 N 页新文献 (不重复已列出的)")
+    p = sub.add_parser("batch", help="批量核查 CSV/JSONL 陈述文件 (支持断点续跑)")
+    p.add_argument("input", help="CSV (claim/text 列) 或 JSONL 文件")
+    p.add_argument("-o", "--output", required=True, help="结果文件 (.jsonl 或 .csv)，已存在时追加并续跑")
+    p.add_argument("--workers", type=int, default=4, help="并发数")
+    p.add_argument("--rate", type=float, default=1.0, help="每秒最多发起的核查数 (0 表示不限速)")
+    p.add_argument("--retries", type=int, default=1, help="单条失败后的重试次数")
+    p.add_argument("--checkpoint", help="断点文件 (默认 <output>.ckpt)")
+    return parser
+
+
+def run_batch_command(args, api_key):
+    from .batch import load_claims, run_batch
+
+    try:
+        claims, errors = load_claims(path=args.input)
+    except OSError as e:
+        print(f"错误：无法读取输入文件 {args.input}: {e.strerror or e}", file=sys.stderr)
+        return 2
+    for error in errors:
+        print(f"警告：已跳过 {error}", file=sys.stderr)
+    if not claims:
+        print("错误：输入文件中没有可核查的陈述", file=sys.stderr)
+        return 2
+    progress = StderrProgress(args.quiet)
+
+    def on_result(row, done, total):
+        progress.write(f"[{done}/{total}] {row['id']} {row['status']} {row['elapsed_ms']:.0f}ms")
+
+    summary = run_batch(claims, api_key, args.output, workers=args.workers, rate=args.rate, retries=args.retries,
+                        checkpoint_path=args.checkpoint, on_result=on_result, base_url=args.base_url)
+    if args.format == "json":
+        print(json.dumps(summary, ensure_ascii=False))
+    else:
+        print(f"完成 {summary['total']} 条 (跳过 {summary['skipped']})：ok={summary['ok']} "
+              f"unparsed={summary['unparsed']} error={summary['error']}，耗时 {summary['elapsed_s']}s → {args.output}")
+    return 0 if summary["error"] == 0 else 1
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # 延迟导入，保证 --help 等命令即时返回
+    from .config import get_api_key
+    from .pipelines import PipelineError, run_check, run_search, run_search_more, append_search_page, run_rewrite
+    from .usage import finish_usage
+
+    api_key = args.api_key or get_api_key()
+    if not api_key:
+        print("错误：未配置 API Key (使用 --api-key 或设置 GEMINI_API_KEY)", file=sys.stderr)
+        return 2
+    if args.command == "batch":
+        return run_batch_command(args, api_key)
+    text = _read_input(args).strip()
+    if not text:
+        print("错误：输入为空", file=sys.stderr)
+        return 2
+
+    runner = {"check": run_check, "search": run_search, "rewrite": run_rewrite}[args.command]
+    extra = {}
+    if args.command in ("check", "search"):
+        extra["verify_links"] = args.verify_links
+    if args.command == "search":
+        from .paper_index import get_default_index
+        extra["paper_index"] = get_default_index()
+    try:
+        result = runner(text, api_key, StderrProgress(args.quiet), args.base_url, **extra)
+        for _ in range(getattr(args, "more", 0)):
+            if not isinstance(result.get("data"), dict) or (result.get("pages") or {}).get("exhausted"): break
+            finish_usage(result, 0)   # 每页各记录一次用量
+            page = run_search_more(text, result["data"]["papers"], api_key, StderrProgress(args.quiet), args.base_url, **extra)
+            result = append_search_page(result, page)
+    except PipelineError as e:
+        print(f"错误：{e}", file=sys.stderr)
+        return 1
+
+    render_start = time.perf_counter()
+    if args.format == "json":
+        output = json.dumps(result, ensure_ascii=False, indent=2)
+    else:
+        output = FORMATTERS[args.command](result)
+    print(output)
+    finish_usage(result, (time.perf_counter() - render_start) * 1000)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+"""
+运行配置：API 地址与 API Key (均可通过环境变量覆盖)
+"""
+import os
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+
+def get_base_url():
+    """GEMINI_BASE_URL 可指向本地 mock_gemini.py 或录制/回放代理；每次调用时读取"""
+    return os.environ.get("GEMINI_BASE_URL", DEFAULT_BASE_URL).rstrip("/")
+
+
+def get_api_key():
+    return os.environ.get("GEMINI_API_KEY", "")
+
+
+def structured_output_enabled():
+    """NC_STRUCTURED_OUTPUT=0 时不请求 JSON 模式 (responseSchema)"""
+    return os.environ.get("NC_STRUCTURED_OUTPUT", "1") != "0"
@@ -0,0 +1,69 @@
+"""
+收藏夹持久化：每个用户一个 JSON 文件 (favorites_<user_id>.json)
+
+函数只操作传入的列表与文件，不依赖 Streamlit；UI 层负责把列表放进 session_state。
+"""
+import re
+import os
+import json
+import time
+import datetime
+
+
+def get_fav_file_path(user_id):
+    """根据用户ID生成文件名，实现多用户隔离"""
+    user_id = (user_id or "default").strip()
+    if not user_id: user_id = "default"
+    # 过滤非法字符，防止文件名错误
+    safe_id = re.sub(r'[^a-zA-Z0-9_\u4e00-\u9fa5]', '_', user_id)
+    return f"favorites_{safe_id}.json"
+
+
+def load_favorites(user_id):
+    """从用户的本地文件加载收藏"""
+    file_path = get_fav_file_path(user_id)
+    if os.path.exists(file_path):
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except:
+            return []
+    return []
+
+
+def save_favorites(user_id, favorites):
+    """保存收藏到用户的本地文件 (失败时抛出异常，由调用方提示)"""
+    file_path = get_fav_file_path(user_id)
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(favorites, f, ensure_ascii=False, indent=4)
+
+
+def make_favorite(category, title, content_data):
+    """
+    category: 'Check' (单条结论) | 'Search' (单篇文献/综述) | 'Rewrite' (改写结果)
+    title: 简短标题
+    content_data: 完整数据 (JSON或文本)
+    """
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return {
+        "id": f"{category}_{int(time.time()*1000)}",
+        "category": category,
+        "title": title[:50] + "..." if len(title) > 50 else title, # 限制标题长度
+        "content": content_data,
+        "time": timestamp
+    }
+
+
+def add_favorite(favorites, category, title, content_data):
+    """查重后追加到列表；已存在时返回 None"""
+    for item in favorites:
+        if item['category'] == category and item['content'] == content_data:
+            return None
+    item = make_favorite(category, title, content_data)
+    favorites.append(item)
+    return item
+
+
+def delete_favorite(favorites, item_id):
+    """根据 ID 删除，返回新列表"""
+    return [item for item in favorites if item['id'] != item_id]
@@ -0,0 +1,215 @@
+"""
+链接 / DOI 有效性校验：结果返回后并发检测，结果写入进程级 TTL 缓存 (所有会话共享)
+
+- 普通链接：HEAD，连接失败或 4xx/5xx 时退化为 GET (只读响应头)；跳转逐跳手动跟随
+- DOI：查询 doi.org handle 接口，200 为有效、404 为不存在
+- 状态：ok (已验证) / dead (404/410，或域名确认不存在) / unknown (超时、连接重置、
+  出口网络故障、限流、拒绝爬虫等无法判断)。DNS 查不到域名时先解析 NC_LINK_DNS_CANARY，
+  canary 也解析失败说明本机 DNS 不可用，记为 unknown 而不是 dead
+- SSRF 防护：链接来自模型输出，每一跳请求前都解析主机，只要有一个地址不是公网地址
+  (localhost、内网、169.254.169.254 等) 就不发请求，记为 unknown
+- 管线最多等待 NC_LINK_BUDGET 秒；未完成的检测在后台继续，渲染时只读缓存
+- NC_LINK_VERIFY=0 关闭校验 (离线基准测试等)
+"""
+import os
+import time
+import socket
+import ipaddress
+import threading
+import urllib.parse
+import concurrent.futures
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import tracing
+from .paper_index import normalize_doi
+
+LINK_TIMEOUT = float(os.environ.get("NC_LINK_TIMEOUT", "3"))
+LINK_BUDGET = float(os.environ.get("NC_LINK_BUDGET", "0.8"))
+LINK_CACHE_TTL = float(os.environ.get("NC_LINK_CACHE_TTL", str(6 * 3600)))
+LINK_CACHE_SIZE = int(os.environ.get("NC_LINK_CACHE_SIZE", "4096"))
+LINK_WORKERS = int(os.environ.get("NC_LINK_WORKERS", "8"))
+DOI_RESOLVER = os.environ.get("NC_DOI_RESOLVER", "https://doi.org/api/handles")
+DNS_CANARY = os.environ.get("NC_LINK_DNS_CANARY", "doi.org")
+LINK_VERIFY = os.environ.get("NC_LINK_VERIFY", "1").lower() not in ("0", "false", "no")
+DEAD_CODES = (404, 410)
+MAX_REDIRECTS = 5
+NXDOMAIN_ERRORS = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+
+_cache = {}     # key -> {"status", "code", "checked"}
+_pending = {}   # key -> Future (同一链接并发请求时只检测一次)
+_lock = threading.Lock()
+_pool = None
+_session = None
+
+
+def _get_session():
+    global _session, _pool
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=LINK_WORKERS, pool_maxsize=LINK_WORKERS, max_retries=0)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers["User-Agent"] = "Mozilla/5.0 (compatible; nuclear-check link verifier)"
+            _pool = concurrent.futures.ThreadPoolExecutor(max_workers=LINK_WORKERS, thread_name_prefix="nc-links")
+    return _session
+
+
+# --- 目标提取 ---
+def link_key(url=None, doi=None):
+    """缓存键：DOI 为 'doi:<规范化 DOI>'，链接为原 URL；无效时返回 None"""
+    if doi:
+        doi = normalize_doi(doi)
+        return f"doi:{doi}" if doi else None
+    if url and str(url).startswith(("http://", "https://")):
+        return str(url).strip()
+    return None
+
+
+def link_targets(data):
+    """从核查结果 (list) 或检索结果 (dict) 中提取待检测的键"""
+    keys = []
+    if isinstance(data, list):
+        for item in data:
+            if not isinstance(item, dict): continue
+            for ev in item.get("evidence_list") or []:
+                if isinstance(ev, dict):
+                    keys.append(link_key(url=ev.get("url")))
+    elif isinstance(data, dict):
+        for paper in data.get("papers") or []:
+            if isinstance(paper, dict):
+                keys += [link_key(url=paper.get("url")), link_key(doi=paper.get("doi"))]
+    return list(dict.fromkeys(k for k in keys if k))
+
+
+# --- 检测 ---
+def _classify(code):
+    if code < 400: return "ok"
+    return "dead" if code in DEAD_CODES else "unknown"
+
+
+_dns_state = {"ok": None, "checked": 0.0}
+
+
+def _resolver_ok():
+    """本机 DNS 是否可用 (结果缓存 60 秒)"""
+    now = time.time()
+    if _dns_state["ok"] is None or now - _dns_state["checked"] > 60:
+        try:
+            socket.getaddrinfo(DNS_CANARY, None)
+            ok = True
+        except OSError:
+            ok = False
+        _dns_state.update(ok=ok, checked=now)
+    return _dns_state["ok"]
+
+
+def _is_public(ip):
+    addr = ipaddress.ip_address(ip.split("%")[0])
+    return addr.is_global and not addr.is_multicast
+
+
+def _precheck(url):
+    """
+    请求前解析主机：返回 None 表示可以请求，否则返回 (status, None)。
+    注意请求时 requests 会再解析一次，无法防住 DNS rebinding，只挡住直接指向内网的链接
+    """
+    try:
+        parts = urllib.parse.urlsplit(url)
+        host = parts.hostname
+        if parts.scheme not in ("http", "https") or not host: return "unknown", None
+        ips = {info[4][0] for info in socket.getaddrinfo(host, parts.port or None, proto=socket.IPPROTO_TCP)}
+    except socket.gaierror as e:
+        if e.errno in NXDOMAIN_ERRORS and _resolver_ok():
+            return "dead", None   # 域名确认不存在
+        return "unknown", None
+    except (OSError, ValueError):
+        return "unknown", None
+    if not ips or not all(_is_public(ip) for ip in ips):
+        return "unknown", None
+    return None
+
+
+def _request(session, method, url, timeout):
+    """逐跳跟随跳转，每一跳都做地址检查；返回 (status, code)"""
+    for _ in range(MAX_REDIRECTS + 1):
+        rejected = _precheck(url)
+        if rejected: return rejected
+        with session.request(method, url, allow_redirects=False, timeout=timeout, stream=True) as resp:
+            location = resp.headers.get("location") if resp.is_redirect else None
+            code = resp.status_code
+        if not location:
+            return _classify(code), code
+        url = urllib.parse.urljoin(url, location)
+    return "unknown", None   # 跳转过多
+
+
+def _probe(key):
+    session = _get_session()
+    timeout = (LINK_TIMEOUT, LINK_TIMEOUT)
+    if key.startswith("doi:"):
+        # 解析服务由运维配置 (NC_DOI_RESOLVER)，不做地址检查
+        try:
+            resp = session.get(f"{DOI_RESOLVER}/{urllib.parse.quote(key[4:], safe='/')}", timeout=timeout)
+            return _classify(resp.status_code), resp.status_code
+        except requests.RequestException:
+            return "unknown", None
+    try:
+        status, code = _request(session, "HEAD", key, timeout)
+        if code is None or code < 400: return status, code
+    except requests.RequestException:
+        pass   # 不少站点不支持 HEAD、对其返回 403/405 或直接断开连接
+    try:
+        return _request(session, "GET", key, timeout)
+    except requests.RequestException:
+        return "unknown", None   # 超时、连接被拒或重置、出口网络故障等，无法判断链接本身
+
+
+def _check(key):
+    with tracing.span("links.probe", target="doi" if key.startswith("doi:") else "url") as sp:
+        try:
+            status, code = _probe(key)
+        except Exception:
+            status, code = "unknown", None   # 畸形 URL 等，不能让 _pending 残留
+        sp.set(status=status, code=code)
+    tracing.inc("nc_link_checks_total", help_text="Link/DOI verification results", result=status)
+    with _lock:
+        _cache[key] = {"status": status, "code": code, "checked": time.time()}
+        _pending.pop(key, None)
+        if len(_cache) > LINK_CACHE_SIZE:
+            # 淘汰最早检测的 1/4
+            for old in sorted(_cache, key=lambda k: _cache[k]["checked"])[:LINK_CACHE_SIZE // 4]:
+                del _cache[old]
+    return status
+
+
+def link_status(key):
+    """只读缓存 (供渲染使用)：返回 'ok'/'dead'/'unknown'，未检测或已过期返回 None"""
+    entry = _cache.get(key)
+    if not entry or time.time() - entry["checked"] > LINK_CACHE_TTL: return None
+    return entry["status"]
+
+
+@tracing.traced("links.verify")
+def verify_links(keys, budget=None):
+    """
+    并发检测尚未缓存的链接，最多等待 budget 秒。
+    返回 {key: status}；超时未完成的为 None (后台继续检测，稍后可通过 link_status 读取)
+    """
+    budget = LINK_BUDGET if budget is None else budget
+    if not keys or not LINK_VERIFY: return {}
+    _get_session()
+    futures = []
+    with _lock:
+        for key in keys:
+            if link_status(key) is not None: continue
+            future = _pending.get(key)
+            if future is None:
+                future = _pool.submit(_check, key)
+                _pending[key] = future
+            futures.append(future)
+    if futures and budget > 0:
+        concurrent.futures.wait(futures, timeout=budget)
+    return {key: link_status(key) for key in keys}
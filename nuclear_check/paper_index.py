@@ -0,0 +1,231 @@
+"""
+本地文献索引：学术检索返回的每篇文献都写入 SQLite，按 DOI 或 规范化标题+年份 去重
+
+- 字段索引：doi / year / publication / seen_count
+- 全文索引：FTS5 trigram (支持中文子串匹配)；查询中的中文片段拆成 trigram 后 OR，
+  不要求整句原样出现；SQLite 不支持时退化为 LIKE
+- 检索时可先返回本地命中，再等待联网检索；已知文献的摘要可直接复用
+"""
+import os
+import re
+import sqlite3
+import datetime
+import threading
+import unicodedata
+
+PAPER_DB_FILE = os.environ.get("NC_PAPER_DB", "papers.db")
+PAPER_FIELDS = ["title", "authors", "publication", "year", "summary", "doi", "url"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    doi TEXT,
+    title_key TEXT NOT NULL,
+    title TEXT, authors TEXT, publication TEXT, year TEXT, summary TEXT, url TEXT,
+    first_seen TEXT, last_seen TEXT,
+    seen_count INTEGER NOT NULL DEFAULT 1
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_papers_doi ON papers(doi) WHERE doi IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_papers_title_key ON papers(title_key);
+CREATE INDEX IF NOT EXISTS idx_papers_year ON papers(year);
+CREATE INDEX IF NOT EXISTS idx_papers_publication ON papers(publication);
+CREATE INDEX IF NOT EXISTS idx_papers_seen ON papers(seen_count);
+"""
+
+
+# --- 规范化 ---
+def normalize_doi(doi):
+    """小写并去掉 https://doi.org/、doi: 等前缀；无效时返回 None"""
+    if not doi: return None
+    doi = str(doi).strip().lower()
+    doi = re.sub(r'^(https?://)?(dx\.)?doi\.org/', '', doi)
+    doi = re.sub(r'^doi:\s*', '', doi)
+    return doi if doi.startswith("10.") else None
+
+
+def normalize_title(title):
+    """去掉末尾括号内的中文翻译、标点与大小写差异"""
+    title = unicodedata.normalize("NFKC", str(title or ""))
+    title = re.sub(r'\s*[(（][^()（）]*[)）]\s*$', '', title)
+    return re.sub(r'[^0-9a-z\u4e00-\u9fa5]+', '', title.lower())
+
+
+def title_key(title, year):
+    return f"{normalize_title(title)}|{str(year or '').strip()[:4]}"
+
+
+SEARCH_MAX_TERMS = 32
+
+
+def search_terms(query):
+    """
+    拆分检索词，返回 (fts_terms, like_terms)：
+    中文连续片段取 trigram (FTS) / bigram (LIKE)，不足长度时保留原片段；拉丁/数字片段整体保留
+    """
+    fts, like = [], []
+    text = unicodedata.normalize("NFKC", query or "")
+    for seg in re.findall(r'[\u4e00-\u9fa5]+|[^\s\u4e00-\u9fa5]+', text):
+        if re.match(r'[\u4e00-\u9fa5]', seg):
+            fts += [seg[i:i + 3] for i in range(len(seg) - 2)]
+            like += [seg[i:i + 2] for i in range(len(seg) - 1)] or [seg]
+        else:
+            if len(seg) >= 3:
+                fts.append(seg)
+            like.append(seg)
+    return list(dict.fromkeys(fts))[:SEARCH_MAX_TERMS], list(dict.fromkeys(like))[:SEARCH_MAX_TERMS]
+
+
+def paper_key(paper):
+    """文献去重键：有 DOI 时为 'doi:<DOI>'，否则为 标题+年份"""
+    doi = normalize_doi(paper.get("doi"))
+    return f"doi:{doi}" if doi else title_key(paper.get("title"), paper.get("year"))
+
+
+class PaperIndex:
+    """线程安全的 SQLite 文献索引 (所有会话共享一个连接)"""
+    def __init__(self, path=PAPER_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            try:
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5("
+                    "title, authors, publication, summary, tokenize='trigram')"
+                )
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                self.has_fts = False
+
+    def close(self):
+        self._conn.close()
+
+    # --- 写入 ---
+    def _find(self, doi, key):
+        row = None
+        if doi:
+            row = self._conn.execute("SELECT * FROM papers WHERE doi = ?", (doi,)).fetchone()
+        if row is None and not key.startswith("|"):
+            row = self._conn.execute("SELECT * FROM papers WHERE title_key = ?", (key,)).fetchone()
+        return row
+
+    def _sync_fts(self, paper_id, values):
+        if not self.has_fts: return
+        self._conn.execute("DELETE FROM papers_fts WHERE rowid = ?", (paper_id,))
+        self._conn.execute(
+            "INSERT INTO papers_fts(rowid, title, authors, publication, summary) VALUES (?, ?, ?, ?, ?)",
+            (paper_id, values.get("title") or "", values.get("authors") or "",
+             values.get("publication") or "", values.get("summary") or ""),
+        )
+
+    def upsert_many(self, papers):
+        """写入/合并一批文献，返回每篇对应的本地 id"""
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ids = []
+        with self._lock, self._conn:
+            for paper in papers or []:
+                if not isinstance(paper, dict) or not paper.get("title"):
+                    ids.append(None)
+                    continue
+                doi = normalize_doi(paper.get("doi"))
+                key = title_key(paper.get("title"), paper.get("year"))
+                existing = self._find(doi, key)
+                incoming = {f: (str(paper.get(f)).strip() if paper.get(f) else "") for f in PAPER_FIELDS}
+                if existing is None:
+                    cur = self._conn.execute(
+                        "INSERT INTO papers (doi, title_key, title, authors, publication, year, summary, url, first_seen, last_seen) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (doi, key, incoming["title"], incoming["authors"], incoming["publication"], incoming["year"],
+                         incoming["summary"], incoming["url"], now, now),
+                    )
+                    paper_id = cur.lastrowid
+                    merged = incoming
+                else:
+                    paper_id = existing["id"]
+                    # 已有字段优先，只补齐缺失内容
+                    merged = {f: existing[f] or incoming[f] for f in PAPER_FIELDS}
+                    self._conn.execute(
+                        "UPDATE papers SET doi = COALESCE(doi, ?), title = ?, authors = ?, publication = ?, year = ?, "
+                        "summary = ?, url = ?, last_seen = ?, seen_count = seen_count + 1 WHERE id = ?",
+                        (doi, merged["title"], merged["authors"], merged["publication"], merged["year"],
+                         merged["summary"], merged["url"], now, paper_id),
+                    )
+                self._sync_fts(paper_id, merged)
+                ids.append(paper_id)
+        return ids
+
+    # --- 查询 ---
+    def lookup(self, paper):
+        """按 DOI 或 标题+年份 查找已索引的文献"""
+        with self._lock:
+            row = self._find(normalize_doi(paper.get("doi")), title_key(paper.get("title"), paper.get("year")))
+        return self._to_dict(row) if row else None
+
+    def search(self, query, limit=10):
+        """
+        本地全文检索：中文连续片段拆成 trigram、其余按词，OR 后按 bm25 排序
+        ("2024年可控核聚变突破性进展" 这类不带空格的查询也能命中)；
+        没有 ≥3 字的片段或不支持 FTS 时退化为 LIKE，按命中片段数排序
+        """
+        fts_terms, like_terms = search_terms(query)
+        if not like_terms: return []
+        with self._lock:
+            if self.has_fts and fts_terms:
+                match = " OR ".join('"' + t.replace('"', '""') + '"' for t in fts_terms)
+                rows = self._conn.execute(
+                    "SELECT p.* FROM papers_fts f JOIN papers p ON p.id = f.rowid WHERE papers_fts MATCH ? "
+                    "ORDER BY bm25(papers_fts), p.seen_count DESC LIMIT ?",
+                    (match, limit),
+                ).fetchall()
+            else:
+                hit = "(title LIKE ? OR summary LIKE ? OR authors LIKE ?)"
+                params = [v for t in like_terms for v in (f"%{t}%",) * 3]
+                rows = self._conn.execute(
+                    f"SELECT * FROM papers WHERE {' OR '.join(hit for _ in like_terms)} "
+                    f"ORDER BY ({' + '.join(hit for _ in like_terms)}) DESC, seen_count DESC, last_seen DESC LIMIT ?",
+                    params + params + [limit],
+                ).fetchall()
+        return [self._to_dict(r) for r in rows]
+
+    def hydrate(self, papers):
+        """补齐模型省略的字段 (如已知文献的摘要)，返回补齐的篇数"""
+        filled = 0
+        for paper in papers or []:
+            if not isinstance(paper, dict): continue
+            missing = [f for f in PAPER_FIELDS if not paper.get(f)]
+            if not missing: continue
+            known = self.lookup(paper)
+            if not known: continue
+            for f in missing:
+                if known.get(f):
+                    paper[f] = known[f]
+            if "summary" in missing and known.get("summary"):
+                paper["from_index"] = True
+                filled += 1
+        return filled
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    @staticmethod
+    def _to_dict(row):
+        paper = {f: row[f] or "" for f in PAPER_FIELDS}
+        paper["doi"] = row["doi"] or ""
+        paper["seen_count"] = row["seen_count"]
+        return paper
+
+
+_default_index = None
+_default_lock = threading.Lock()
+
+
+def get_default_index():
+    """进程级共享索引 (路径由 NC_PAPER_DB 指定)"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = PaperIndex(PAPER_DB_FILE)
+    return _default_index
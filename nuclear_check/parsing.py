@@ -0,0 +1,136 @@
+"""
+模型输出解析：JSON 提取与改写结果切分
+"""
+import re
+import json
+import ast
+
+from . import tracing
+
+
+@tracing.traced("response.parse")
+def parse_json_response(text):
+    if not text: return None
+    try:
+        return json.loads(text)
+    except:
+        pass
+    
+    try:
+        clean_text = re.sub(r'```json\s*', '', text)
+        clean_text = re.sub(r'```\s*$', '', clean_text)
+        clean_text = clean_text.strip()
+        return json.loads(clean_text)
+    except:
+        pass
+
+    try:
+        start_obj = text.find('{')
+        start_list = text.find('[')
+        
+        if start_obj == -1 and start_list == -1:
+            return None
+            
+        if start_obj != -1 and (start_list == -1 or start_obj < start_list):
+            start = start_obj
+            end_char = '}'
+        else:
+            start = start_list
+            end_char = ']'
+            
+        end = text.rfind(end_char)
+        if end != -1 and end > start:
+            json_str = text[start : end+1]
+            return json.loads(json_str)
+    except:
+        pass
+
+    try:
+        if start_obj != -1 and end != -1:
+             potential_dict = text[start : end+1]
+             return ast.literal_eval(potential_dict)
+    except:
+        pass
+
+    return None
+
+
+_CLOSERS = {'{': '}', '[': ']'}
+REPAIR_MAX_DEPTH = 64   # 正常输出不超过 4 层；更深的嵌套视为异常输出，不尝试修复
+_STRING_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+
+def _closing(stack):
+    return "".join(_CLOSERS[c] for c in reversed(stack))
+
+
+@tracing.traced("response.repair")
+def repair_json(text):
+    """
+    本地修复 parse_json_response 无法处理的输出：
+    字符串内未转义的换行、闭合前的多余逗号、输出被截断 (回退到最近一个完整元素；
+    截断不在字符串中间或没有可回退的位置时补齐引号与括号)。返回解析结果或 None
+    """
+    if not text: return None
+    starts = [i for i in (text.find('{'), text.find('[')) if i != -1]
+    if not starts: return None
+    s = text[min(starts):]
+
+    out, stack, cuts = [], [], []
+    in_str = esc = False
+    for ch in s:
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == '\\':
+                esc = True
+            elif ch == '"':
+                in_str = False
+            else:
+                ch = _STRING_ESCAPES.get(ch, ch)
+            out.append(ch)
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in '{[':
+            stack.append(ch)
+            if len(stack) > REPAIR_MAX_DEPTH: return None
+        elif ch in '}]':
+            if not stack: break
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ',':
+                out.pop()
+            out.append(_CLOSERS[stack.pop()])
+            if not stack: break
+            continue
+        elif ch == ',':
+            cuts.append((len(out), tuple(stack)))
+        out.append(ch)
+
+    if esc: out.pop()
+    head = "".join(out) + ('"' if in_str else '')
+    candidates = [head.rstrip().rstrip(',:') + _closing(stack)]
+    # 截断在键名或值中间时，退回到之前的逗号处闭合
+    for pos, snapshot in reversed(cuts[-50:]):
+        candidates.append("".join(out[:pos]) + _closing(snapshot))
+    if in_str and len(candidates) > 1:
+        # 截断在字符串值中间：补引号得到的是半截内容 (如 "中国现在有5"、"正")，优先回退到最近完整的元素
+        candidates.append(candidates.pop(0))
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except (ValueError, RecursionError):
+            continue
+    return None
+
+
+def split_rewrite(raw_content):
+    """按 [REWRITE] / [TRANSLATION] 标签切分改写结果"""
+    rewrite_c = raw_content
+    trans_c = ""
+    if "[REWRITE]" in raw_content and "[TRANSLATION]" in raw_content:
+        parts = raw_content.split("[TRANSLATION]")
+        rewrite_c = parts[0].replace("[REWRITE]", "").strip()
+        trans_c = parts[1].strip()
+    return rewrite_c, trans_c
@@ -0,0 +1,215 @@
+"""
+核查 / 检索 / 改写三条管线 (不依赖 Streamlit)
+
+每条管线返回与 session_state 中一致的结果字典，失败时抛出 PipelineError。
+"""
+import time
+
+from . import tracing
+from . import links
+from .api import get_prioritized_models, smart_api_call, get_response_text
+from .config import structured_output_enabled
+from .parsing import parse_json_response, repair_json, split_rewrite
+from .paper_index import paper_key
+from .prompts import build_check_prompt, build_search_prompt, build_search_more_prompt, build_rewrite_prompt, build_repair_prompt
+from .schemas import VALIDATORS, generation_config
+from .usage import new_usage_record, record_usage, extract_usage
+
+
+class PipelineError(Exception):
+    """管线失败；stage 为 'models' (模型列表获取失败) 或 'request' (模型未返回内容)"""
+    def __init__(self, message, stage="request"):
+        super().__init__(message)
+        self.stage = stage
+
+
+def note_rerequest(feature, previous):
+    """
+    调用方再次发起同一功能的请求前调用：上一次结果未能解析 (data 为 None) 时，
+    计为一次因格式问题导致的整体重新请求
+    """
+    if previous and previous.get("data") is None:
+        tracing.inc("nc_parse_rerequests_total", help_text="Full re-requests after an unparsed result", feature=feature)
+
+
+def _generate(feature, prompt, api_key, status_box=None, grounded=True, base_url=None):
+    """获取模型列表 → 调用 → 提取文本，返回 (raw_content, usage, model_list)"""
+    tracing.begin_request(feature)
+    model_list, msg = get_prioritized_models(api_key, base_url)
+    if not model_list:
+        raise PipelineError(f"无法获取模型列表: {msg}", stage="models")
+
+    payload = {"contents": [{"parts": [{ "text": prompt }]}]}
+    if grounded:
+        payload["tools"] = [{"google_search": {}}]
+    config = generation_config(feature) if structured_output_enabled() else None
+    response = smart_api_call(model_list, payload, api_key, status_box, base_url, generation_config=config)
+    usage = new_usage_record(feature, response)
+
+    raw_content = get_response_text(response)
+    if not raw_content:
+        record_usage(usage)
+        raise PipelineError("请求失败或模型未返回内容")
+    return raw_content, usage, model_list
+
+
+def _parse_timed(usage, func, *args):
+    parse_start = time.perf_counter()
+    result = func(*args)
+    usage["parse_ms"] = round((time.perf_counter() - parse_start) * 1000, 1)
+    return result
+
+
+def _repair_remote(feature, raw_content, usage, model_list, api_key, status_box, base_url):
+    """一次不联网的小请求：让模型按 schema 修复 JSON；返回解析结果或 None"""
+    if status_box: status_box.write("🩹 输出格式有误，正在修复 JSON (不联网)...")
+    repair_start = time.perf_counter()
+    payload = {"contents": [{"parts": [{"text": build_repair_prompt(feature, raw_content)}]}],
+               "generationConfig": {"temperature": 0}}
+    with tracing.span("response.repair_remote", feature=feature):
+        response = smart_api_call(model_list, payload, api_key, status_box, base_url,
+                                  generation_config=generation_config(feature))
+    usage["repair_ms"] = round((time.perf_counter() - repair_start) * 1000, 1)
+    usage["repair_tokens"] = extract_usage(response).get("total_tokens", 0)
+    text = get_response_text(response)
+    return (parse_json_response(text) or repair_json(text)) if text else None
+
+
+def _parse_validated(feature, raw_content, usage, model_list, api_key, status_box, base_url):
+    """
+    解析并按 schema 校验；失败时先本地修复，仍失败再发一次不联网的修复请求，
+    避免用户为格式问题重新发起整次联网检索。usage["parse_path"] 记录走到哪一步
+    """
+    validate = VALIDATORS[feature]
+    parse_start = time.perf_counter()
+    data, errors, path = None, [], "failed"
+    for name, parser in (("direct", parse_json_response), ("local_repair", repair_json)):
+        data, errors = validate(parser(raw_content))
+        if data is not None:
+            path = name
+            break
+    usage["parse_ms"] = round((time.perf_counter() - parse_start) * 1000, 1)
+    if data is None:
+        data, errors = validate(_repair_remote(feature, raw_content, usage, model_list, api_key, status_box, base_url))
+        if data is not None:
+            path = "llm_repair"
+    usage["parse_path"] = path
+    usage["schema_errors"] = len(errors)
+    tracing.inc("nc_parse_outcomes_total", help_text="Structured output parse outcomes by repair stage", feature=feature, path=path)
+    return data
+
+
+def _verify_links(result, usage):
+    """并发校验结果中的链接/DOI，最多等待 links.LINK_BUDGET 秒"""
+    verify_start = time.perf_counter()
+    result["links"] = links.verify_links(links.link_targets(result["data"]))
+    usage["link_check_ms"] = round((time.perf_counter() - verify_start) * 1000, 1)
+
+
+def run_check(user_text_check, api_key, status_box=None, base_url=None, verify_links=False):
+    """
+    智能核查：返回 {"data": [...], "raw": str, "usage": dict}
+    verify_links: 校验证据链接，结果附带 "links": {url: 'ok'/'dead'/'unknown'/None}
+    """
+    raw_content, usage, model_list = _generate("check", build_check_prompt(user_text_check), api_key, status_box, True, base_url)
+    check_results = _parse_validated("check", raw_content, usage, model_list, api_key, status_box, base_url)
+    result = {"data": check_results, "raw": raw_content, "usage": usage}
+    if verify_links:
+        _verify_links(result, usage)
+    return result
+
+
+def run_search(search_query, api_key, status_box=None, base_url=None, paper_index=None, local_hits=None,
+               verify_links=False):
+    """
+    学术检索：返回 {"data": {"overview", "papers"}, "raw": str, "usage": dict}
+    paper_index: 可选的本地文献库；已收录且有摘要的文献告知模型无需重写摘要，
+                 结果返回后补全省略的摘要并写回索引
+    local_hits: 调用方已查询过的本地命中 (避免重复查询)
+    verify_links: 校验文献链接与 DOI，结果附带 "links" (键见 links.link_key)
+    """
+    if local_hits is None and paper_index is not None:
+        local_hits = paper_index.search(search_query)
+    known_papers = [p for p in local_hits or [] if p.get("summary")]
+    raw_content, usage, model_list = _generate("search", build_search_prompt(search_query, known_papers), api_key, status_box, True, base_url)
+    search_results = _parse_validated("search", raw_content, usage, model_list, api_key, status_box, base_url)
+    if paper_index is not None and search_results is not None:
+        usage["papers_from_index"] = paper_index.hydrate(search_results["papers"])
+        paper_index.upsert_many(search_results["papers"])
+    result = {"data": search_results, "raw": raw_content, "usage": usage}
+    if verify_links:
+        _verify_links(result, usage)
+    return result
+
+
+def run_search_more(search_query, seen_papers, api_key, status_box=None, base_url=None, paper_index=None,
+                    verify_links=False):
+    """
+    学术检索 "加载更多"：告知模型已展示的文献，只请求新文献 (不重新生成综述)
+    返回 {"data": {"papers": [...]}, "raw": str, "usage": dict}；模型重复列出的文献会被去掉，
+    papers 为空表示没有更多结果。参数含义同 run_search
+    """
+    seen = {paper_key(p) for p in seen_papers}
+    known_papers = []
+    if paper_index is not None:
+        known_papers = [p for p in paper_index.search(search_query) if p.get("summary") and paper_key(p) not in seen]
+    prompt = build_search_more_prompt(search_query, seen_papers, known_papers)
+    raw_content, usage, model_list = _generate("search_more", prompt, api_key, status_box, True, base_url)
+    page = _parse_validated("search_more", raw_content, usage, model_list, api_key, status_box, base_url)
+    if page is not None:
+        fresh = []
+        for paper in page["papers"]:
+            key = paper_key(paper)
+            if key in seen: continue
+            seen.add(key)
+            fresh.append(paper)
+        usage["duplicates_dropped"] = len(page["papers"]) - len(fresh)
+        page["papers"] = fresh
+        if paper_index is not None:
+            usage["papers_from_index"] = paper_index.hydrate(fresh)
+            paper_index.upsert_many(fresh)
+    result = {"data": page, "raw": raw_content, "usage": usage}
+    if verify_links:
+        _verify_links(result, usage)
+    return result
+
+
+def append_search_page(search_res, page):
+    """
+    把 run_search_more 的续页追加到检索结果，返回新的结果字典。
+    已有文献对象原样复用 (不重新解析，卡片渲染命中缓存)；已列出的文献 (按 paper_key) 不重复追加；
+    "pages" 记录每页新增篇数，没有新文献时标记 exhausted
+    """
+    data = search_res["data"]
+    added = (page.get("data") or {}).get("papers")
+    result = dict(search_res)
+    if added is not None:   # 续页未能解析时文献列表保持不变
+        seen = {paper_key(p) for p in data["papers"]}
+        fresh = []
+        for paper in added:
+            key = paper_key(paper)
+            if key in seen: continue
+            seen.add(key)
+            fresh.append(paper)
+        added = fresh
+        pages = dict(search_res.get("pages") or {})
+        pages["added"] = list(pages.get("added") or [len(data["papers"])]) + [len(added)]
+        pages["exhausted"] = not added
+        result.update(data={**data, "papers": data["papers"] + added}, pages=pages)
+    if page.get("usage"):
+        result["usage"] = page["usage"]   # 缓存的续页没有 usage，不重复记录
+    if page.get("links"):
+        result["links"] = {**(search_res.get("links") or {}), **page["links"]}
+    return result
+
+
+def run_rewrite(user_text_rewrite, api_key, status_box=None, base_url=None):
+    """学术改写：返回 {"rewrite", "translation", "draft", "usage"}"""
+    raw_content, usage, _ = _generate("rewrite", build_rewrite_prompt(user_text_rewrite), api_key, status_box, False, base_url)
+    rewrite_c, trans_c = _parse_timed(usage, split_rewrite, raw_content)
+    return {
+        "rewrite": rewrite_c,
+        "translation": trans_c,
+        "draft": user_text_rewrite,
+        "usage": usage
+    }
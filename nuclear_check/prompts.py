@@ -0,0 +1,259 @@
+"""
+Prompt 模板 (内容与原版保持一致，仅移动位置)
+"""
+
+
+def build_check_prompt(user_text_check):
+    """智能核查 Prompt"""
+    return f"""
+                    你是一个严谨的核聚变与等离子体物理专家，同时拥有实时联网核查的能力。
+                    请利用 Google Search 工具，核查以下文本中的每一个事实陈述。
+
+                    **用户输入文本：**
+                    '''{user_text_check}'''
+
+                    **重要指示：**
+                    1. **多源数据对比**：如果不同权威机构的数据不一致（例如 IAEA 数据 vs 中国核能行业协会数据），**请不要只给出一个数字**，而必须将各方数据分别列出。
+                    2. **原文引用 (双语)**：
+                       - 对于每一个数据点，必须引用查找资料的原话。
+                       - **关键要求**：如果引用的原文是英文，**必须**在后面附带中文翻译。
+                       - 格式示例："The reactor has... (译文: 该反应堆拥有...)"。
+                    3. **实时性**：以搜索到的最新官方报告为准。
+
+                    **输出格式要求（非常重要）：**
+                    **严禁输出任何开场白或结束语（如"好的"、"以下是结果"）。**
+                    **严禁在 JSON 内部使用未转义的换行符。**
+                    **仅输出**以下 JSON 列表格式：
+                    [
+                        {{
+                            "claim": "原文中的陈述",
+                            "status": "正确/错误/存疑/数据不一致",
+                            "correction": "综合分析。如果数据冲突，请在此说明差异原因。",
+                            "evidence_list": [
+                                {{
+                                    "source_name": "机构名称",
+                                    "content": "具体描述/数据 (如果是英文请附带中文翻译)",
+                                    "url": "来源链接"
+                                }}
+                            ]
+                        }}
+                    ]
+                    """
+
+
+def build_search_prompt(search_query, known_papers=None):
+    """学术检索 Prompt；known_papers 为本地文献库中已有的文献，模型无需重复撰写其摘要"""
+    prompt = f"""
+                    你是一位资深的核科学研究员。请利用 Google Search 为用户寻找**真实存在**的权威学术文献、官方技术报告、行业白皮书或权威数据库记录。
+
+                    **用户课题：** "{search_query}"
+
+                    **任务 (两部分)：**
+                    1. **Overview (综述)**: 基于搜索到的所有文献或数据库或相关官方报道，用中文写一段 150 字左右的学术综述，总结该领域的最新进展或回答用户问题。
+                    2. **Papers (文献列表)**: 列出具体的文献、报告或数据库条目。
+
+                    **严厉禁止 (Anti-Hallucination)：**
+                    1. 严禁编造标题、作者、发布机构、报告编号、期刊或链接。
+                    2. 严格区分“新闻报道”与“原始报告/论文”，优先引用原始出处
+                    3. 如果没有 PDF 链接、DOI 或官方归档页面，请留空。
+
+                    **执行步骤：**
+                    1. 搜索 Nature, Science等期刊, IAEA (国际原子能机构), OECD-NEA (核能署), ITER, DOE (美国能源部), WNA (世界核协会) 等官方渠道等来源。
+                    2. 提取关键数据，确保来源链接真实有效且可访问。
+                    3. 编写综述，按学术规范整理输出。
+
+                    **输出格式要求（非常重要）：**
+                    **严禁输出任何开场白（如"好的"、"我找到了"等）。**
+                    **仅输出**纯 JSON 对象，格式如下：
+                    {{
+                        "overview": "这里写中文综述，总结研究现状...",
+                        "papers": [
+                            {{
+                                "title": "标题 (必须完全匹配搜索结果，如果是英文，请在括号内附上中文翻译)",
+                                "authors": "作者/机构",
+                                "publication": "来源 (如 Nature, IAEA)",
+                                "year": "年份",
+                                "summary": "详细摘要 (请保留英文原文，并在后面附带中文翻译)",
+                                "doi": "DOI或空字符串",
+                                "url": "真实URL"
+                            }}
+                        ]
+                    }}
+                    """
+    return prompt + _known_papers_note(known_papers)
+
+
+def _paper_lines(papers):
+    return "\n".join(f"- {p.get('doi') or p.get('title')}" for p in papers)
+
+
+def _known_papers_note(known_papers):
+    if not known_papers: return ""
+    return f"""
+                    **本地文献库 (节省输出)：**
+                    以下文献已收录在本地库中。如果需要再次列出其中某篇，"summary" 请留空字符串，其余字段照常填写 (DOI 必须一致)，系统会自动补全摘要：
+{_paper_lines(known_papers)}
+                    """
+
+
+def build_search_more_prompt(search_query, seen_papers, known_papers=None):
+    """学术检索 "加载更多" Prompt：只要新文献，不再生成综述；seen_papers 为已展示的文献"""
+    prompt = f"""
+                    你是一位资深的核科学研究员。用户已经看过关于该课题的一批文献，请利用 Google Search 继续寻找**其他真实存在**的权威学术文献、官方技术报告或数据库记录。
+
+                    **用户课题：** "{search_query}"
+
+                    **已列出的文献 (按 DOI 或标题，严禁重复列出)：**
+{_paper_lines(seen_papers)}
+
+                    **要求：**
+                    1. 只列出上面没有出现过的文献，不要写综述。
+                    2. 严禁编造标题、作者、发布机构、期刊或链接；没有 DOI 或可靠链接时请留空。
+                    3. 如果确实找不到更多相关文献，返回空列表。
+
+                    **输出格式要求（非常重要）：**
+                    **严禁输出任何开场白。**
+                    **仅输出**纯 JSON 对象，格式如下：
+                    {{
+                        "papers": [
+                            {{
+                                "title": "标题 (如果是英文，请在括号内附上中文翻译)",
+                                "authors": "作者/机构",
+                                "publication": "来源 (如 Nature, IAEA)",
+                                "year": "年份",
+                                "summary": "详细摘要 (请保留英文原文，并在后面附带中文翻译)",
+                                "doi": "DOI或空字符串",
+                                "url": "真实URL"
+                            }}
+                        ]
+                    }}
+                    """
+    return prompt + _known_papers_note(known_papers)
+
+
+def build_rewrite_prompt(user_text_rewrite):
+    """学术改写 Prompt"""
+    return f"""
+                    你是一位在高级核杂质期刊有丰富经验的**人类学术编辑**。
+                    请对以下文本进行**彻底的去AI化（De-AI）改写**，并提供双语对照。【需要注意的是我提供给你的句子有可能有些部分或是词语是可以采纳的，你不必每个词都完全转换。只需要符合学术要求即可】
+
+                    **待改写文本：**
+                    '''{user_text_rewrite}'''
+
+                    **🚫 负面约束（绝对禁止 - Violations will be rejected）：**
+                    1.  **禁止滥用连接副词**：严禁在句中堆砌你认为高大上的 "Fundamentally", "Crucially", "Furthermore", "Moreover", "Additionally", "Importantly"等副词进行强调。请通过句子内在的逻辑流来衔接，而非生硬的路标词。
+                    2.  **拒绝名词化（Nominalization）**：例如：不要说 "The realization of X necessitates Y"（X的实现需要Y），要说 "To realize X, we must Y"（为了实现X，我们必须Y）。少用抽象名词（如 modality, provision, utilization, facilitation）。
+                    3.  **拒绝僵硬的长难句**：不要写那种中间没有停顿、修饰语密集堆砌的长句。句子要有呼吸感（Rhythm），自然地长短句结合。
+                    4.  **去"机器味"**：像人类专家一样直接表达观点。
+
+                    **✅ 核心目标：**
+                    1.  **人类化（Human-like）**：模仿人类专家的写作习惯，词汇选择要精准但不做作。
+                    2.  **双语输出（Bilingual Output）**：
+                        -   如果改写后的正文是**英文**，必须在下方附上高水平的**中文翻译**。
+                        -   如果改写后的正文是**中文**，必须在下方附上地道的**英文翻译**。
+                        -   翻译也要符合上述的学术标准，不要直译。
+
+                    **✅可以参考学习模仿以下PPCF\PR系列的文章的写作风格：**
+                      1.  "The cutoff energy and the divergence of the protons generated by the target normal sheath
+acceleration mechanism are known to be significantly influenced by micrometer and
+nanometer-size structures on the target front and rear surfaces. Specifically, the cutoff energy is
+significantly enhanced by creating a central rectangular groove (RG) on the target front surface,
+as shown in a recent study (Khan and Saxena 2023 Phys. Plasmas 30 063102). Here, we report
+on 2D particle-in-cell simulations to thoroughly explore the effect of the depth of the central RG
+on the energy spectra of the accelerated protons. The proton cutoff energy is found to enhance
+drastically as a result of relativistically induced transparency as the thickness of the rear wall of
+the groove is reduced from a few micrometers to a few tens of nanometers, however, it drops
+sharply as the thickness of the rear wall is further reduced towards creating a complete hole
+through the target." 
+                      2.  "The interaction of a high-intensity femtosecond laser pulse
+with a solid target results in highly energetic ions with MeV
+energies. These ion sources are of much interest as they offer
+measurement of fast-evolving electric and magnetic fields
+using proton radiography technique. Other potential
+cutting-edge applications, in the foresight, include hadron
+therapy, isochoric heating of matter, fast ignition of
+fusion targets, and many more."
+                      3.  "In the present work, we investigate the impact of the depth
+of a micrometer-size groove on the front side of the target, or
+in other words the role of the thickness of the rear wall of the
+grooved target, in improving proton cutoff energies and their
+angular divergence. In particular, we investigate the variation
+in proton energy spectra as the thickness of the rear wall of the
+groove is reduced from a few micrometers to a couple of tens
+of nanometers, and then to the case of no wall representing a
+target with a complete hole through it. It is observed that the
+onset time of relativistically induced transparency of the target
+rear wall with respect to the peak of the laser pulse plays a key
+role in determining the optimum width/thickness of the target
+rear wall. This is in agreement with the previous studies" 
+                    4. “Proton generation, transport and interaction with hollow cone targets are investigated by means of two-dimensional PIC simulations. A
+scaled-down hollow cone with gold walls, a carbon tip and a curved hydrogen foil inside the cone has been considered. Proton acceleration is
+driven by a 1020 W$cm	2 and 1 ps laser pulse focused on the hydrogen foil. Simulations show an important surface current at the cone walls
+which generates a magnetic field. This magnetic field is dragged by the quasi-neutral plasma formed by fast protons and co-moving electrons
+when they propagate towards the cone tip. As a result, a tens of kT Bz field is set up at the cone tip, which is strong enough to deflect the protons
+and increase the beam divergence substantially. We propose using heavy materials at the cone tip and increasing the laser intensity in order to
+mitigate magnetic field generation and proton beam divergence.”
+                 5.“The standard proton fast ignition scheme assumes that the
+proton beam is generated inside a hollow cone attached to an
+inertial fusion capsule by means of the TNSA scheme.Most
+of the proton FI calculations carried out so far are based on the
+strong assumptions of ideal perfectly collimated beams and
+optimal target configurations, which clearly under-estimate the
+laser energy requirements for ignition. Other studies assumed that proton acceleration and transport within the cone
+takes place in an idealmanner, i.e. protons are focused on the cone
+tip and emerge with a given divergence angle. In addition, it is
+widely assumed that there are not any relevant interactions be-
+tween the proton beam and the cone tip. Only recently, collective
+stopping of ion beams in solid matter has been reported”
+                 6.“This article is organised as follows. In Section 2, the data
+used in PIC simulations are described. Section 3 summarises
+the results obtained for the proton beam generation and
+transport within a standard cone design. Next, in Section 4,it
+is proposed using heavy elements in the cone tip and higher
+intensity laser pulses in order to mitigate the magnetic field
+growth and the subsequent beam deflection at the cone tip.
+Finally, conclusions and future work are summarized in Sec-
+tion 5.”
+                7.“Alarge number ofstudies have been performed to understand the mechanism involved in the laser-plasma
+interaction-driven proton/ion acceleration. Among all possible candidates the target normal sheath
+acceleration (TNSA) mechanism [9–11] has received wider attention than other (radiation pressure-based)
+mechanisms. The paramount factor has been the wide accessibility ofthe laser parameters required for the
+TNSAmechanism to operate. In this mechanism, the energetic electrons generated bylaser-plasma interaction
+at the front surface ofthe target escape to the rear side ofthe target. This electron cloud while emerging from the
+rear surface ofthe target forms a strong sheath electric field which is responsible for accelerating protons/ions to
+several 10s ofMeV energies.”
+
+
+                    **输出格式（必须严格遵守）：**
+                    请按以下标签分隔内容：
+
+                    [REWRITE]
+                    (这里是改写后的优美学术文本)
+
+                    [TRANSLATION]
+                    (这里是对应的另一种语言的高水平翻译)
+                    """
+
+
+REPAIR_SKELETONS = {
+    "check": '[{"claim": "...", "status": "正确/错误/存疑/数据不一致", "correction": "...", "evidence_list": [{"source_name": "...", "content": "...", "url": "..."}]}]',
+    "search": '{"overview": "...", "papers": [{"title": "...", "authors": "...", "publication": "...", "year": "...", "summary": "...", "doi": "...", "url": "..."}]}',
+    "search_more": '{"papers": [{"title": "...", "authors": "...", "publication": "...", "year": "...", "summary": "...", "doi": "...", "url": "..."}]}',
+}
+REPAIR_MAX_CHARS = 24000
+
+
+def build_repair_prompt(feature, broken_text):
+    """JSON 修复 Prompt (不联网)：只修格式，不增删内容"""
+    return f"""
+                    下面是一段格式有误或被截断的 JSON 输出。请将其修复为合法 JSON，结构如下：
+                    {REPAIR_SKELETONS[feature]}
+
+                    **要求：**
+                    1. 只修复格式 (引号、转义、逗号、括号、截断)，不要增加、删除或改写任何内容。
+                    2. 被截断的最后一个条目如果缺少必填字段，请直接丢弃。
+                    3. **仅输出** JSON，不要任何说明文字或代码块标记。
+
+                    **待修复内容：**
+                    {broken_text[:REPAIR_MAX_CHARS]}
+                    """
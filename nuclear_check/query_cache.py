@@ -0,0 +1,227 @@
+"""
+学术检索近似查询缓存：字符 n-gram TF-IDF + 余弦相似度 (纯 CPU，无外部依赖)
+
+"可控核聚变 2024 突破" 与 "2024年可控核聚变突破性进展" 这类改写会命中同一条缓存。
+- 规范化：NFKC、小写、去标点与常见虚词，中文按字 bigram，拉丁/数字按整词
+- 倒排索引召回候选，再计算 TF-IDF 余弦；超过阈值视为命中
+- 年份/数值必须一致 ("2023 突破" 与 "2024 突破" 不互相命中)
+- 两边不共有的字/词占比必须足够小：主题词相同而意图词不同的查询
+  ("可控核聚变 2024 突破" 与 "…2024 失败/挑战/投资") 余弦仍然很高，由字/词 Jaccard 下限排除
+- 容量上限 (LRU 淘汰) 与 TTL 过期
+- "加载更多" 的续页挂在同一条缓存下 (按页序号)，再次翻到已加载过的页无需请求；
+  条目被覆盖 (重新检索) 或过期时续页一并失效。每次 put 产生新的代号 (generation)，
+  读写续页时必须带上结果所属的代号：仍在展示旧结果的会话不会读到或写入新条目的续页
+"""
+import os
+import re
+import math
+import time
+import itertools
+import threading
+import unicodedata
+import collections
+
+from . import tracing
+
+QUERY_CACHE_THRESHOLD = float(os.environ.get("NC_QUERY_CACHE_THRESHOLD", "0.7"))
+QUERY_CACHE_MIN_OVERLAP = float(os.environ.get("NC_QUERY_CACHE_MIN_OVERLAP", "0.8"))
+QUERY_CACHE_TTL = float(os.environ.get("NC_QUERY_CACHE_TTL", str(24 * 3600)))
+QUERY_CACHE_SIZE = int(os.environ.get("NC_QUERY_CACHE_SIZE", "512"))
+
+# 对检索意图影响很小的虚词/后缀
+STOP_TERMS = ["最新", "进展", "相关", "关于", "现状"]
+STOP_CHARS = "的了和与及年"
+STOP_WORDS = {"the", "of", "and", "in", "on", "for", "a", "an", "to"}
+
+
+def normalize_query(query):
+    text = unicodedata.normalize("NFKC", query or "").lower()
+    text = re.sub("|".join(STOP_TERMS) + f"|[{STOP_CHARS}]", " ", text)
+    return re.sub(r"[^0-9a-z\u4e00-\u9fa5]+", " ", text).strip()
+
+
+def query_features(query):
+    """中文连续片段取字 bigram (单字片段保留单字)，拉丁/数字取整词"""
+    feats = collections.Counter()
+    for seg in re.findall(r"[\u4e00-\u9fa5]+|[0-9a-z]+", normalize_query(query)):
+        if seg.isascii():
+            if seg not in STOP_WORDS:
+                feats[seg] += 1
+        elif len(seg) == 1:
+            feats[seg] += 1
+        else:
+            for i in range(len(seg) - 1):
+                feats[seg[i:i + 2]] += 1
+    return feats
+
+
+def query_units(query):
+    """字/词集合：中文按单字，拉丁/数字按整词 (用于计算不共有部分的占比)"""
+    return {u for u in re.findall(r"[\u4e00-\u9fa5]|[0-9a-z]+", normalize_query(query)) if u not in STOP_WORDS}
+
+
+def unit_overlap(a, b):
+    """字/词集合的 Jaccard 系数"""
+    if not a or not b: return 0.0
+    return len(a & b) / len(a | b)
+
+
+class _Entry:
+    __slots__ = ("query", "features", "units", "result", "created", "hits", "generation")
+
+    def __init__(self, query, features, result, generation):
+        self.query = query
+        self.generation = generation
+        self.features = features
+        self.units = query_units(query)
+        self.result = result
+        self.created = time.time()
+        self.hits = 0
+
+
+class QueryCache:
+    """线程安全的近似查询缓存 (进程内，所有会话共享)"""
+    def __init__(self, threshold=QUERY_CACHE_THRESHOLD, ttl=QUERY_CACHE_TTL, max_size=QUERY_CACHE_SIZE,
+                 min_overlap=QUERY_CACHE_MIN_OVERLAP):
+        self.threshold = threshold
+        self.min_overlap = min_overlap
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()      # normalized query -> _Entry (LRU 顺序)
+        self._postings = collections.defaultdict(set)  # feature -> {normalized query}
+        self._lock = threading.Lock()
+        self._generations = itertools.count(1)
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _idf(self, feature):
+        n = len(self._entries)
+        df = len(self._postings.get(feature, ()))
+        return math.log((1 + n) / (1 + df)) + 1
+
+    def _vector(self, features):
+        vec = {f: tf * self._idf(f) for f, tf in features.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return vec, norm
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None: return
+        for f in entry.features:
+            bucket = self._postings.get(f)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._postings[f]
+
+    def _count(self, outcome):
+        """outcome: hits / misses"""
+        self.stats[outcome] += 1
+        tracing.inc("nc_query_cache_total", help_text="Near-duplicate search cache lookups", result=outcome)
+
+    def _expire(self, now):
+        expired = [k for k, e in self._entries.items() if now - e.created > self.ttl]
+        for k in expired:
+            self._remove(k)
+
+    def lookup(self, query, threshold=None):
+        """返回 (result, meta) 或 None；meta 含原始查询、相似度、缓存时间与代号 (读写续页时使用)"""
+        threshold = self.threshold if threshold is None else threshold
+        features = query_features(query)
+        if not features: return None
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            candidates = set()
+            for f in features:
+                candidates |= self._postings.get(f, set())
+            if not candidates:
+                self._count("misses")
+                return None
+            qvec, qnorm = self._vector(features)
+            best_key, best_sim, best_overlap = None, 0.0, 0.0
+            numbers = {f for f in features if f.isdigit()}
+            units = query_units(query)
+            for key in candidates:
+                entry = self._entries[key]
+                if numbers != {f for f in entry.features if f.isdigit()}: continue
+                overlap = unit_overlap(units, entry.units)
+                if overlap < self.min_overlap: continue
+                evec, enorm = self._vector(entry.features)
+                sim = sum(w * evec.get(f, 0.0) for f, w in qvec.items()) / (qnorm * enorm)
+                if sim > best_sim:
+                    best_key, best_sim, best_overlap = key, sim, overlap
+            if best_key is None or best_sim < threshold:
+                self._count("misses")
+                return None
+            entry = self._entries[best_key]
+            entry.hits += 1
+            self._entries.move_to_end(best_key)
+            self._count("hits")
+            meta = {"query": entry.query, "similarity": round(best_sim, 3), "overlap": round(best_overlap, 3),
+                    "created": entry.created, "generation": entry.generation,
+                    "age_s": round(now - entry.created), "exact": best_sim >= 0.999}
+            return entry.result, meta
+
+    def put(self, query, result):
+        """写入/覆盖一条结果，返回其代号 (无法缓存时为 None)"""
+        features = query_features(query)
+        if not features: return None
+        key = normalize_query(query)
+        with self._lock:
+            self._remove(key)
+            generation = next(self._generations)
+            self._entries[key] = _Entry(query, features, result, generation)
+            for f in features:
+                self._postings[f].add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats["evictions"] += 1
+        return generation
+
+    def _current(self, query, generation):
+        """原查询对应的条目；代号不一致 (已被重新检索覆盖) 时返回 None"""
+        entry = self._entries.get(normalize_query(query))
+        if entry is None or generation is None or entry.generation != generation: return None
+        return entry
+
+    def page(self, query, generation, index):
+        """按原查询与代号精确查找第 index 个续页 (从 0 开始)；不存在时返回 None"""
+        with self._lock:
+            entry = self._current(query, generation)
+            page = None
+            if entry and time.time() - entry.created <= self.ttl:
+                pages = entry.result.get("pages") or []
+                page = pages[index] if index < len(pages) else None
+        tracing.inc("nc_query_cache_pages_total", help_text="Search continuation page cache lookups",
+                    result="hits" if page is not None else "misses")
+        return page
+
+    def add_page(self, query, generation, index, page):
+        """续页只能按顺序追加；条目已不存在、已被覆盖 (代号不一致) 或页序号不连续时忽略"""
+        with self._lock:
+            entry = self._current(query, generation)
+            if entry is None: return
+            pages = entry.result.setdefault("pages", [])
+            if len(pages) == index:
+                pages.append(page)
+
+    def invalidate(self, query):
+        with self._lock:
+            self._remove(normalize_query(query))
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache():
+    """进程级共享缓存 (参数由 NC_QUERY_CACHE_* 环境变量指定)"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = QueryCache()
+    return _default_cache
@@ -0,0 +1,226 @@
+"""
+结果卡片与收藏列表的 HTML 渲染 (不依赖 Streamlit)
+
+每张卡片 (含证据、链接与校验徽标) 生成为一段完整闭合的 HTML，界面上只需一次 st.markdown，
+交互按钮 (收藏/删除) 仍为独立组件。内容与链接状态都相同的卡片直接复用缓存的 HTML。
+
+注意：
+- 模型输出与用户草稿一律先 html.escape 再拼入 HTML，链接只接受 http(s)；
+  原先按 Markdown 显示的字段 (改写、翻译、纯文本收藏) 只支持粗体/斜体/行内代码/链接这一小部分语法
+- 多行文本中的空行会结束 Markdown 的 HTML 块，因此换行统一转为 <br>
+"""
+import os
+import re
+import json
+import html
+import threading
+import functools
+import collections
+
+from . import links
+
+LINK_BADGES = {
+    "ok": ("✔ 已验证", "ok"),
+    "dead": ("✖ 链接失效", "dead"),
+    "unknown": ("? 无法验证", "unknown"),
+    None: ("… 校验中", "pending"),
+}
+FAV_COLORS = {"学术文献": "#63b3ed", "核查结论": "#66bb6a"}
+# 每次 rerun 按顺序渲染全部收藏，缓存条数小于收藏数时 LRU 命中率为 0，因此应不小于最大的收藏夹
+FAV_CACHE_SIZE = int(os.environ.get("NC_RENDER_FAV_CACHE", "20000"))
+
+
+def _text(value):
+    """纯文本：转义后换行转为 <br>"""
+    return html.escape(str(value)).replace("\n", "<br>")
+
+
+def _href(url):
+    """href 属性值：只允许 http(s) 链接，其余 (javascript: 等) 一律为 #"""
+    url = str(url or "").strip()
+    return html.escape(url, quote=True) if url.startswith(("http://", "https://")) else "#"
+
+
+_MD_INLINE = [
+    (re.compile(r"`([^`\n]+)`"), r"<code>\1</code>"),
+    (re.compile(r"\*\*(.+?)\*\*"), r"<b>\1</b>"),
+    (re.compile(r"(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?![*\w])"), r"<i>\1</i>"),
+]
+_MD_LINK = re.compile(r"\[([^\]\n]+)\]\((https?://[^)\s]+)\)")
+
+
+def _markdown(value):
+    """转义后只还原少量 Markdown 行内语法 (粗体、斜体、行内代码、http 链接)"""
+    text = html.escape(str(value))
+    for pattern, repl in _MD_INLINE:
+        text = pattern.sub(repl, text)
+    # URL 已经过转义，不会跳出 href 属性
+    text = _MD_LINK.sub(r'<a href="\2" target="_blank">\1</a>', text)
+    return text.replace("\n", "<br>")
+
+
+def _memo_key(obj):
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def link_badge(key):
+    """链接校验徽标 (只读共享缓存，不发起请求)"""
+    if not key or not links.LINK_VERIFY: return ""
+    label, css = LINK_BADGES[links.link_status(key)]
+    return f'<span class="link-badge {css}">{label}</span>'
+
+
+def status_style(status):
+    """核查结论 → (边框色, 图标, 标题色)"""
+    if "错" in status:
+        return "#ff4b4b", "❌", "#ff8a80"
+    if "疑" in status or "不一致" in status:
+        return "#ffa726", "⚠️", "#ffcc80"
+    return "#66bb6a", "✅", "#a5d6a7"
+
+
+def _evidence_list(item):
+    evidence_list = item.get('evidence_list') or []
+    if not evidence_list and 'evidence_quote' in item:
+        evidence_list = [{'source_name': '权威数据', 'content': item['evidence_quote'], 'url': '#'}]
+    return evidence_list
+
+
+# --- 1. 智能核查卡片 ---
+def check_card(item):
+    badges = tuple(link_badge(links.link_key(url=ev.get('url'))) for ev in _evidence_list(item))
+    return _check_card(_memo_key(item), badges)
+
+
+@functools.lru_cache(maxsize=1024)
+def _check_card(item_json, badges):
+    item = json.loads(item_json)
+    status = item.get('status', '存疑')
+    border_color, icon, title_color = status_style(status)
+    parts = [
+        f'<div class="card-container check-card" style="border-left: 5px solid {border_color};">',
+        '<div style="margin-bottom: 12px;">',
+        f'<span style="font-weight: bold; font-size: 1.3em; color: {title_color};">{icon} {_text(status)}</span>',
+        f'<div style="color: #b0bec5; font-size: 0.9em; margin-top: 4px;">陈述：{_text(item.get("claim", ""))}</div>',
+        '</div>',
+        f'<div style="margin-bottom: 15px; line-height: 1.6;"><b>💡 专家分析：</b><br>{_text(item.get("correction", "无详细分析"))}</div>',
+    ]
+    evidence_list = _evidence_list(item)
+    if evidence_list:
+        parts.append('<div class="evidence-container">')
+        parts.append('<div style="color: #555; margin-bottom: 8px; font-weight:bold;">🔍 权威数据/原文证据：</div>')
+        for ev, badge in zip(evidence_list, badges):
+            parts.append(
+                f'<div class="quote-item"><span class="tag-pill">[{_text(ev.get("source_name", "来源"))}]</span>'
+                f'"{_text(ev.get("content", ""))}"<br>'
+                f'<a href="{_href(ev.get("url"))}" target="_blank" class="source-link" style="margin-top:4px; display:inline-block;">🔗 来源</a>{badge}</div>'
+            )
+        parts.append('</div>')
+    parts.append('</div>')
+    return "".join(parts)
+
+
+# --- 2. 学术检索卡片 ---
+@functools.lru_cache(maxsize=256)
+def overview_card(overview):
+    return (
+        '<div class="card-container overview-card">'
+        '<div style="font-size: 1.2em; font-weight: bold; margin-bottom: 10px;">🧪 学术综述 (Overview)</div>'
+        f'<div style="line-height: 1.6; font-size: 1.0em;">{_text(overview)}</div>'
+        '</div>'
+    )
+
+
+def paper_card(item):
+    badges = (link_badge(links.link_key(url=item.get("url"))), link_badge(links.link_key(doi=item.get("doi"))))
+    return _paper_card(_memo_key(item), badges)
+
+
+@functools.lru_cache(maxsize=1024)
+def _paper_card(item_json, badges):
+    item = json.loads(item_json)
+    local_tag = ' <span class="tag-pill">📚 摘要来自本地库</span>' if item.get('from_index') else ''
+    links_html = f'<a href="{_href(item.get("url"))}" target="_blank" class="source-link">🔗 原文</a>{badges[0]}'
+    if item.get('doi'):
+        links_html += f' <a href="{_href("https://x.sci-hub.org.cn/" + str(item.get("doi")))}" target="_blank" class="source-link scihub-btn">🔓 Sci-Hub</a>{badges[1]}'
+    return (
+        '<div class="card-container research-card">'
+        f'<div style="font-size: 1.2em; font-weight: bold; color: #63b3ed; margin-bottom: 5px;">📄 {_text(item.get("title", "无标题"))}</div>'
+        f'<div style="font-size: 0.9em; color: #a0aec0; margin-bottom: 15px;">'
+        f'{_text(item.get("authors", "N/A"))} | {_text(item.get("publication", "N/A"))}, {_text(item.get("year", "N/A"))}{local_tag}</div>'
+        '<div style="border-top: 1px solid #4a5568; margin-bottom: 10px;"></div>'
+        f'<div style="line-height: 1.6; color: #cbd5e0; font-family: \'Noto Serif SC\', serif; margin-bottom: 12px;">{_text(item.get("summary", "暂无摘要"))}</div>'
+        f'<div>{links_html}</div>'
+        '</div>'
+    )
+
+
+# --- 3. 收藏列表 ---
+def _fav_detail(item):
+    content = item.get('content')
+    category = item.get('category')
+    # 1. 学术文献
+    if category == "学术文献" and isinstance(content, dict):
+        return (
+            f'<div><b>Authors:</b> {_text(content.get("authors"))}</div>'
+            f'<div class="fav-note info">{_text(content.get("summary"))}</div>'
+            f'<a href="{_href(content.get("url"))}" target="_blank" class="source-link">🔗 原文链接</a>'
+        )
+    # 2. 核查结论
+    if category == "核查结论" and isinstance(content, dict):
+        evidence = "".join(
+            f'<li><a href="{_href(e.get("url"))}" target="_blank">{_text(e.get("source_name"))}</a>: {_text(e.get("content"))}</li>'
+            for e in content.get('evidence_list', [])
+        )
+        return (
+            f'<div><b>状态:</b> {_text(content.get("status"))}</div>'
+            f'<div class="fav-note warn"><b>分析:</b> {_text(content.get("correction"))}</div>'
+            f'<div><b>证据来源:</b></div><ul>{evidence}</ul>'
+        )
+    # 3. 改写结果
+    if category == "改写结果" and isinstance(content, dict):
+        body = (
+            f'<div class="fav-time">原始草稿:</div><div class="fav-draft">{_text(content.get("draft"))}</div><hr>'
+            f'<div><b>改写:</b></div><div>{_markdown(content.get("rewrite"))}</div>'
+        )
+        if content.get('translation'):
+            body += f'<div><b>翻译:</b></div><div>{_markdown(content.get("translation"))}</div>'
+        return body
+    # 4. 纯文本/其他 (如收藏的综述)
+    return _markdown(content)
+
+
+def _fav_item(item):
+    color = FAV_COLORS.get(item.get('category'), "#d69e2e")
+    return (
+        f'<div class="fav-item" style="border-left: 4px solid {color};">'
+        f'<div><b>[{_text(item.get("category"))}]</b> {_text(item.get("title"))}</div>'
+        f'<div class="fav-time">🕒 {_text(item.get("time"))}</div>'
+        f'<details><summary>查看详情</summary><div class="fav-detail">{_fav_detail(item)}</div></details>'
+        '</div>'
+    )
+
+
+_fav_cache = collections.OrderedDict()   # id -> (item, html)
+_fav_lock = threading.Lock()
+
+
+def favorite_item(item):
+    """
+    收藏存入后不再修改，按 id 缓存 (不对整条收藏做 JSON 序列化)；
+    命中时与缓存的条目比较 (通常是同一对象)，恢复的备份中 id 重复也不会串内容
+    """
+    key = item.get("id")
+    if key is None: return _fav_item(item)
+    with _fav_lock:
+        hit = _fav_cache.get(key)
+        if hit is not None and (hit[0] is item or hit[0] == item):
+            _fav_cache.move_to_end(key)
+            return hit[1]
+    body = _fav_item(item)
+    with _fav_lock:
+        _fav_cache[key] = (item, body)
+        _fav_cache.move_to_end(key)
+        while len(_fav_cache) > FAV_CACHE_SIZE:
+            _fav_cache.popitem(last=False)
+    return body
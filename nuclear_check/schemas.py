@@ -0,0 +1,159 @@
+"""
+结构化输出：Gemini responseSchema 与本地校验/规范化
+
+- CHECK_SCHEMA / SEARCH_SCHEMA 用于 generationConfig.responseSchema
+  (Gemini 不支持 JSON 模式与 google_search 同时使用，联网请求仅在去掉工具重试时生效)
+- validate_check / validate_search 返回 (规范化数据 或 None, 错误列表)；
+  个别不合格条目会被丢弃，只有整体不可用时才返回 None
+"""
+from .paper_index import PAPER_FIELDS
+
+_STRING = {"type": "STRING"}
+
+EVIDENCE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {"source_name": _STRING, "content": _STRING, "url": _STRING},
+    "required": ["source_name", "content"],
+}
+
+CHECK_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "claim": _STRING,
+            "status": {"type": "STRING", "enum": ["正确", "错误", "存疑", "数据不一致"]},
+            "correction": _STRING,
+            "evidence_list": {"type": "ARRAY", "items": EVIDENCE_SCHEMA},
+        },
+        "required": ["claim", "status", "correction", "evidence_list"],
+        "propertyOrdering": ["claim", "status", "correction", "evidence_list"],
+    },
+}
+
+PAPERS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {f: _STRING for f in PAPER_FIELDS},
+        "required": ["title"],
+        "propertyOrdering": PAPER_FIELDS,
+    },
+}
+
+SEARCH_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {"overview": _STRING, "papers": PAPERS_SCHEMA},
+    "required": ["overview", "papers"],
+    "propertyOrdering": ["overview", "papers"],
+}
+
+# "加载更多"：只有文献列表，没有综述
+SEARCH_MORE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {"papers": PAPERS_SCHEMA},
+    "required": ["papers"],
+}
+
+SCHEMAS = {"check": CHECK_SCHEMA, "search": SEARCH_SCHEMA, "search_more": SEARCH_MORE_SCHEMA}
+
+
+def generation_config(feature):
+    """JSON 模式的 generationConfig；不需要结构化输出的功能返回 None"""
+    schema = SCHEMAS.get(feature)
+    if schema is None: return None
+    return {"responseMimeType": "application/json", "responseSchema": schema}
+
+
+def _str(value):
+    if value is None: return ""
+    return value if isinstance(value, str) else str(value)
+
+
+# --- 校验 ---
+CHECK_STATUSES = CHECK_SCHEMA["items"]["properties"]["status"]["enum"]
+
+
+def validate_check(data):
+    """
+    缺少任一必填字段或 status 不在枚举内的条目直接丢弃，不补默认结论
+    (通常是被截断的最后一条，补成 "存疑" 等于编造核查结果)
+    """
+    if isinstance(data, dict):
+        # 偶尔会被包一层 {"results": [...]}，或只返回单条结论
+        lists = [v for v in data.values() if isinstance(v, list)]
+        data = lists[0] if lists and "claim" not in data else [data]
+    if not isinstance(data, list):
+        return None, ["顶层应为列表"]
+    items, errors = [], []
+    for i, item in enumerate(data):
+        if not isinstance(item, dict) or not item.get("claim"):
+            errors.append(f"[{i}] 缺少 claim")
+            continue
+        # 旧格式用 evidence_quote 代替 evidence_list，渲染时兜底
+        missing = [k for k in CHECK_SCHEMA["items"]["required"]
+                   if k not in item and not (k == "evidence_list" and "evidence_quote" in item)]
+        if missing:
+            errors.append(f"[{i}] 缺少 {', '.join(missing)}")
+            continue
+        status = _str(item.get("status")).strip()
+        if status not in CHECK_STATUSES:
+            errors.append(f"[{i}] status 无效: {status!r}")
+            continue
+        clean = dict(item)
+        for key in ("claim", "correction"):
+            clean[key] = _str(item.get(key))
+        clean["status"] = status
+        evidence = item.get("evidence_list", [])
+        if not isinstance(evidence, list):
+            errors.append(f"[{i}] evidence_list 应为列表")
+            evidence = []
+        clean["evidence_list"] = [
+            {"source_name": _str(ev.get("source_name")) or "来源", "content": _str(ev.get("content")), "url": _str(ev.get("url")) or "#"}
+            for ev in evidence if isinstance(ev, dict)
+        ]
+        items.append(clean)
+    return (items or None), errors
+
+
+def _validate_papers(raw_papers, errors):
+    papers = []
+    for i, paper in enumerate(raw_papers):
+        if not isinstance(paper, dict) or not paper.get("title"):
+            errors.append(f"[{i}] 缺少 title")
+            continue
+        clean = dict(paper)
+        for key in PAPER_FIELDS:
+            clean[key] = _str(paper.get(key))
+        papers.append(clean)
+    return papers
+
+
+def validate_search(data):
+    if isinstance(data, list):
+        data = {"overview": "", "papers": data}
+    if not isinstance(data, dict):
+        return None, ["顶层应为对象"]
+    errors = []
+    raw_papers = data.get("papers")
+    if not isinstance(raw_papers, list):
+        errors.append("papers 应为列表")
+        raw_papers = []
+    papers = _validate_papers(raw_papers, errors)
+    overview = _str(data.get("overview"))
+    if not overview and not papers:
+        return None, errors + ["overview 与 papers 均为空"]
+    return {**data, "overview": overview, "papers": papers}, errors
+
+
+def validate_search_more(data):
+    """续页只要求 papers 为列表；空列表表示没有更多文献，属于正常结果"""
+    if isinstance(data, list):
+        data = {"papers": data}
+    if not isinstance(data, dict) or not isinstance(data.get("papers"), list):
+        return None, ["papers 应为列表"]
+    errors = []
+    return {"papers": _validate_papers(data["papers"], errors)}, errors
+
+
+VALIDATORS = {"check": validate_check, "search": validate_search, "search_more": validate_search_more}
@@ -0,0 +1,277 @@
+"""
+轻量级埋点模块：Tracing Span + Prometheus 文本格式指标
+
+- 通过环境变量 NC_TRACING=1 开启；关闭时 span()/traced() 均为空操作，开销可忽略
+- NC_METRICS_PORT=9464 时启动旁路 HTTP 端点 (GET /metrics)
+- NC_METRICS_FILE=metrics.prom 时每次脚本运行结束写出指标文件
+- 模块级状态在 Streamlit rerun 之间保留 (模块只导入一次)，所有会话共享
+"""
+import os
+import time
+import uuid
+import logging
+import tempfile
+import threading
+import functools
+import contextvars
+import collections
+import http.server
+
+ENABLED = os.environ.get("NC_TRACING", "").lower() in ("1", "true", "yes")
+SPAN_LOG_SIZE = 2000
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_request_id = contextvars.ContextVar("nc_request_id", default=None)
+_current_span = contextvars.ContextVar("nc_current_span", default=None)
+_lock = threading.Lock()
+_file_lock = threading.Lock()                   # 串行写指标文件，与 _lock 分开避免渲染时嵌套加锁
+_counters = collections.defaultdict(float)      # (name, labels) -> value
+_histograms = {}                                # (name, labels) -> [bucket_counts, sum, count]
+_help = {}
+_metrics_server = None
+_metrics_server_failed = False   # 端口被占用等：记录一次，不在每次 rerun 重试
+_warned = set()
+
+logger = logging.getLogger(__name__)
+
+# 最近完成的 span，供调试查看
+span_log = collections.deque(maxlen=SPAN_LOG_SIZE)
+
+
+def configure(enabled=None):
+    """运行时开关 (基准测试/压测脚本使用)"""
+    global ENABLED
+    if enabled is not None:
+        ENABLED = bool(enabled)
+
+
+# --- 请求 ID 传播 ---
+def begin_request(feature=None):
+    """为一次用户操作生成请求 ID，后续 span 自动继承"""
+    request_id = f"{feature or 'req'}-{uuid.uuid4().hex[:12]}"
+    _request_id.set(request_id)
+    return request_id
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+# --- 指标 ---
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, help_text=None, **labels):
+    """计数器 +value"""
+    if not ENABLED: return
+    if help_text: _help.setdefault(name, help_text)
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def observe(name, value, help_text=None, buckets=DEFAULT_BUCKETS, **labels):
+    """直方图观测"""
+    if not ENABLED: return
+    if help_text: _help.setdefault(name, help_text)
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [buckets, [0] * len(buckets), 0.0, 0]
+        for i, bound in enumerate(hist[0]):
+            if value <= bound:
+                hist[1][i] += 1
+        hist[2] += value
+        hist[3] += 1
+
+
+def _fmt_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items: return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in items)
+    return "{" + body + "}"
+
+
+def render_prometheus():
+    """导出 Prometheus text exposition format (0.0.4)"""
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((k, [v[0], list(v[1]), v[2], v[3]]) for k, v in _histograms.items())
+    seen = set()
+    for (name, labels), value in counters:
+        if name not in seen:
+            seen.add(name)
+            if name in _help: lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+    for (name, labels), (buckets, counts, total, count) in histograms:
+        if name not in seen:
+            seen.add(name)
+            if name in _help: lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+        for bound, c in zip(buckets, counts):
+            lines.append(f"{name}_bucket{_fmt_labels(labels, {'le': f'{bound:g}'})} {c}")
+        lines.append(f"{name}_bucket{_fmt_labels(labels, {'le': '+Inf'})} {count}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {total:g}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """清空所有指标与 span 记录"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        span_log.clear()
+
+
+# --- Span ---
+class _NullSpan:
+    """关闭埋点时使用的空 span"""
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def set(self, **attrs): pass
+    def end(self, error=None): pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.span_id = uuid.uuid4().hex[:16]
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent else None
+        self.request_id = _request_id.get()
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        self._ended = False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self, error=None):
+        if self._ended: return
+        self._ended = True
+        duration = time.perf_counter() - self.start
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            pass  # 跨上下文结束时无法还原，忽略
+        status = "error" if error else "ok"
+        observe("nc_span_duration_seconds", duration, help_text="Duration of traced spans", span=self.name)
+        inc("nc_spans_total", help_text="Number of finished spans", span=self.name, status=status)
+        span_log.append({
+            "name": self.name,
+            "request_id": self.request_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration_ms": round(duration * 1000, 2),
+            "status": status,
+            "attrs": dict(self.attrs, error=str(error)) if error else dict(self.attrs),
+        })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(exc)
+        return False
+
+
+def span(name, **attrs):
+    """with tracing.span("api.attempt", model=...) as s: ..."""
+    if not ENABLED: return _NULL_SPAN
+    return Span(name, attrs)
+
+
+start_span = span  # 非 with 写法：s = start_span(...); ...; s.end()
+
+
+def traced(name):
+    """函数装饰器版本的 span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- 导出 ---
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _warn_once(key, message, *args):
+    if key in _warned: return
+    _warned.add(key)
+    logger.warning(message, *args)
+
+
+def start_metrics_server(port=None, host="127.0.0.1"):
+    """
+    启动旁路指标端点 (幂等，每个进程只启动一次)；
+    端口被占用或无效时记录一次警告并返回 None，埋点失败不影响页面
+    """
+    global _metrics_server, _metrics_server_failed
+    port = port or os.environ.get("NC_METRICS_PORT")
+    if not ENABLED or not port or _metrics_server is not None or _metrics_server_failed:
+        return _metrics_server
+    with _lock:
+        if _metrics_server is None and not _metrics_server_failed:
+            try:
+                server = http.server.ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except (OSError, ValueError) as e:
+                _metrics_server_failed = True
+                _warn_once("metrics_server", "metrics endpoint disabled: cannot listen on %s:%s (%s)", host, port, e)
+                return None
+            threading.Thread(target=server.serve_forever, daemon=True, name="nc-metrics").start()
+            _metrics_server = server
+    return _metrics_server
+
+
+def write_metrics_file(path=None):
+    """将当前指标写入文件 (供 node_exporter textfile collector 等读取)；写入失败只记录一次警告"""
+    path = path or os.environ.get("NC_METRICS_FILE")
+    if not ENABLED or not path: return
+    text = render_prometheus()
+    try:
+        _write_file(path, text)
+    except OSError as e:
+        _warn_once(("metrics_file", path), "cannot write metrics file %s (%s)", path, e)
+
+
+def _write_file(path, text):
+    # 每次写入使用独立的临时文件 (同目录以保证 os.replace 原子)，并发会话不会互相替换/删除
+    directory = os.path.dirname(os.path.abspath(path))
+    with _file_lock:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
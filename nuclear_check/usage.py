@@ -0,0 +1,113 @@
+"""
+用量与延迟统计 (usageMetadata)
+
+每次 smart_api_call 生成一条记录：功能、模型、尝试次数、token 用量、上游延迟、
+解析耗时与渲染耗时。记录写入进程级滚动缓存 (所有会话共享)，并追加到 JSONL 日志。
+"""
+import math
+import json
+import datetime
+import collections
+
+from . import tracing
+
+USAGE_LOG_FILE = "usage_log.jsonl"
+USAGE_STORE_SIZE = 1000
+
+# 进程级滚动缓存 (模块只导入一次，Streamlit rerun 之间保留)
+usage_store = collections.deque(maxlen=USAGE_STORE_SIZE)
+
+
+def extract_usage(response):
+    """提取 usageMetadata 与 groundingMetadata 中的计量信息"""
+    if not response: return {}
+    try:
+        data = response.json()
+    except Exception:
+        return {}
+    usage = data.get('usageMetadata') or {}
+    candidates = data.get('candidates') or [{}]
+    grounding = candidates[0].get('groundingMetadata') or {}
+    return {
+        "prompt_tokens": usage.get('promptTokenCount', 0),
+        "candidate_tokens": usage.get('candidatesTokenCount', 0),
+        "total_tokens": usage.get('totalTokenCount', 0),
+        "grounding_queries": len(grounding.get('webSearchQueries') or []),
+        "grounding_chunks": len(grounding.get('groundingChunks') or []),
+    }
+
+
+def new_usage_record(feature, response):
+    """为一次 smart_api_call 生成用量记录 (parse/render 耗时稍后补齐)"""
+    meta = getattr(response, "call_meta", None) or {}
+    record = {
+        "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "request_id": tracing.current_request_id(),
+        "feature": feature,
+        "model": meta.get("model", "N/A"),
+        "attempts": meta.get("attempts", 0),
+        "status_code": getattr(response, "status_code", None),
+        "latency_ms": meta.get("latency_ms"),
+        "total_ms": meta.get("total_ms"),
+        "parse_ms": None,
+        "render_ms": None,
+    }
+    record.update(extract_usage(response))
+    return record
+
+
+def record_usage(record, log_file=USAGE_LOG_FILE):
+    """写入滚动缓存，并追加到 JSONL 日志"""
+    usage_store.append(record)
+    if not log_file: return
+    try:
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except Exception:
+        pass
+
+
+def finish_usage(result, render_ms):
+    """首次渲染结果后补齐 render_ms 并落盘，后续 rerun 不重复记录"""
+    record = result.get("usage") if result else None
+    if not record or record.get("render_ms") is not None:
+        return
+    record["render_ms"] = round(render_ms, 1)
+    record_usage(record)
+
+
+def percentile(values, pct):
+    """最近秩法百分位数"""
+    values = sorted(v for v in values if v is not None)
+    if not values: return None
+    k = max(0, math.ceil(pct / 100 * len(values)) - 1)
+    return values[k]
+
+
+def _total_ms(record):
+    """端到端耗时 (含失败的尝试与 429/5xx 退避)；旧记录没有 total_ms 时退化为最后一次尝试的延迟"""
+    total = record.get("total_ms")
+    return total if total is not None else record.get("latency_ms")
+
+
+def summarize_usage(records, key):
+    """
+    按 feature / model 聚合 p50/p95 延迟与 token 用量：
+    p50_ms/p95_ms 为端到端耗时，last_attempt_p50_ms 为最后一次 (成功) 尝试的上游延迟
+    """
+    groups = {}
+    for r in records:
+        groups.setdefault(r.get(key) or "N/A", []).append(r)
+    rows = []
+    for name, items in sorted(groups.items()):
+        rows.append({
+            key: name,
+            "calls": len(items),
+            "p50_ms": percentile([_total_ms(r) for r in items], 50),
+            "p95_ms": percentile([_total_ms(r) for r in items], 95),
+            "last_attempt_p50_ms": percentile([r.get("latency_ms") for r in items], 50),
+            "avg_attempts": round(sum(r.get("attempts", 0) for r in items) / len(items), 2),
+            "avg_tokens": round(sum(r.get("total_tokens", 0) for r in items) / len(items)),
+            "total_tokens": sum(r.get("total_tokens", 0) for r in items),
+        })
+    return rows
@@ -0,0 +1,56 @@
+import pytest
+
+from nuclear_check.batch import claim_id, load_claims
+from nuclear_check.cli import main
+
+
+def test_load_csv_and_jsonl_content():
+    claims, errors = load_claims(content="id,claim\na1,中国有 55 座核电站\n,ITER 2025 首次等离子体\n,\n")
+    assert claims == [{"id": "a1", "claim": "中国有 55 座核电站"},
+                      {"id": claim_id("ITER 2025 首次等离子体"), "claim": "ITER 2025 首次等离子体"}]
+    assert errors == []
+    claims, _ = load_claims(content=b'{"text": "x"}\n"y"\n', fmt="jsonl")
+    assert [c["claim"] for c in claims] == ["x", "y"]
+
+
+def test_json_array_file(tmp_path):
+    path = tmp_path / "claims.json"
+    path.write_text('[\n  {"id": "a1", "claim": "x"},\n  "y",\n  3\n]\n', encoding="utf-8")
+    claims, errors = load_claims(path=str(path))
+    assert [c["claim"] for c in claims] == ["x", "y"] and claims[0]["id"] == "a1"
+    assert errors == ["第 3 项: 应为对象或字符串"]
+    claims, _ = load_claims(content=b'["a", "b"]')
+    assert [c["claim"] for c in claims] == ["a", "b"]
+
+
+def test_bad_jsonl_lines_are_skipped_with_errors():
+    claims, errors = load_claims(content='{"claim": "a"}\n{"claim": \n[1, 2]\n{"claim": "b"}\n', fmt="jsonl")
+    assert [c["claim"] for c in claims] == ["a", "b"]
+    assert [e.split(":")[0] for e in errors] == ["第 2 行", "第 3 行"]
+
+
+def test_ids_stable_when_lines_are_inserted():
+    before, _ = load_claims(content='"a"\n"b"\n', fmt="jsonl")
+    after, _ = load_claims(content='"new"\n"a"\n"b"\n', fmt="jsonl")
+    assert {c["claim"]: c["id"] for c in before} == {c["claim"]: c["id"] for c in after if c["claim"] != "new"}
+
+
+def test_duplicate_claims_get_distinct_ids():
+    claims, _ = load_claims(content='"a"\n"a"\n', fmt="jsonl")
+    assert claims[1]["id"] == claims[0]["id"] + "-2"
+
+
+def test_missing_path_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_claims(path=str(tmp_path / "missing.csv"))
+
+
+def test_cli_missing_file_and_bad_lines(tmp_path, capsys):
+    out = str(tmp_path / "out.jsonl")
+    assert main(["--api-key", "k", "batch", str(tmp_path / "missing.csv"), "-o", out]) == 2
+    assert "无法读取输入文件" in capsys.readouterr().err
+    bad = tmp_path / "bad.jsonl"
+    bad.write_text("{oops\n", encoding="utf-8")
+    assert main(["--api-key", "k", "batch", str(bad), "-o", out]) == 2
+    err = capsys.readouterr().err
+    assert "第 1 行" in err and "没有可核查的陈述" in err
@@ -0,0 +1,93 @@
+import gc
+import threading
+
+from nuclear_check.blobstore import BlobStore, SessionMemory
+
+
+def _blob(n, tag):
+    # 不可压缩的内容，便于按体积测试上限
+    import random
+    rng = random.Random(tag)
+    return {"data": [rng.getrandbits(64) for _ in range(n)], "usage": {"tag": tag}}
+
+
+def test_put_get_dedup_and_release():
+    store = BlobStore()
+    a = store.put({"x": 1})
+    assert store.put({"x": 1}) == a and store.stats["dedup_hits"] == 1
+    assert store.get(a) == {"x": 1}
+    store.release(a)
+    store.release(a)
+    assert store.summary()["referenced"] == 0
+
+
+def test_idle_blobs_trimmed_by_size():
+    store = BlobStore(max_bytes=1)
+    ref = store.put(_blob(50, 1))
+    assert store.get(ref) is not None   # 被引用的 blob 不淘汰
+    store.release(ref)
+    assert store.get(ref) is None and store.stats["evictions"] == 1
+
+
+def test_session_cap_evicts_oldest_result():
+    state = {}
+    mem = SessionMemory(state, BlobStore(), cap_bytes=1500)
+    mem.put("check_result", _blob(100, 1))
+    mem.put("search_result", _blob(100, 2))
+    assert mem.get("check_result") is None and mem.was_evicted("check_result")
+    assert mem.get("search_result")["usage"] == {"tag": 2}
+
+
+def test_render_reads_do_not_reorder_eviction():
+    store = BlobStore()
+    mem = SessionMemory({}, store, cap_bytes=1)
+    mem.put("probe", _blob(100, 0))
+    size = mem.footprint()["slots"]["probe"]["compressed_bytes"]
+    mem.drop("probe")
+    mem.cap_bytes = int(size * 2.5)
+
+    def rerun():   # 每次 rerun 按标签页顺序读取全部结果
+        for slot in ("check_result", "search_result", "rewrite_result"):
+            mem.get(slot)
+
+    for slot, tag in (("search_result", 1), ("check_result", 2), ("rewrite_result", 3)):
+        mem.put(slot, _blob(100, tag))
+        rerun()
+    # 最早产生的检索结果被淘汰，而不是用户最近的核查结果
+    assert mem.was_evicted("search_result") and not mem.was_evicted("check_result")
+    assert mem.get("check_result")["usage"] == {"tag": 2}
+
+
+def test_loader_slot_does_not_thrash_results():
+    loads = []
+
+    def load_favorites():
+        loads.append(1)
+        return [_blob(300, "fav")]
+
+    state = {}
+    mem = SessionMemory(state, BlobStore(), cap_bytes=3 * 1024, loaders={"favorites": load_favorites})
+    for _ in range(3):   # 模拟多次 rerun：写结果 → 读收藏夹 → 读结果
+        mem.put("check_result", _blob(50, "res"))
+        assert mem.get("favorites")
+        assert mem.get("check_result") is not None
+    assert not mem.was_evicted("check_result")
+    assert mem.meta.evictions == 0 and len(loads) == 1
+    fp = mem.footprint()
+    assert fp["reloadable_bytes"] > fp["cap_bytes"] > fp["compressed_bytes"]
+
+
+def test_session_gc_releases_refs_without_deadlock():
+    store = BlobStore()
+    state = {}
+    SessionMemory(state, store).put("check_result", {"data": [1, 2, 3]})
+    assert store.summary()["referenced"] == 1
+    del state
+    gc.collect()
+    # 回收发生在持锁期间也不能死锁：finalizer 只排队，由下一次操作释放
+    with store._lock:
+        store.defer_release(["missing"])
+    done = threading.Event()
+    threading.Thread(target=lambda: (store.put({"y": 1}), done.set()), daemon=True).start()
+    assert done.wait(5)
+    assert store.summary()["referenced"] == 1   # 只剩 {"y": 1}
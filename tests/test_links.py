@@ -0,0 +1,118 @@
+import socket
+import ipaddress
+
+import pytest
+import requests
+
+from nuclear_check import links
+
+
+class FakeResponse:
+    def __init__(self, code, location=None):
+        self.status_code = code
+        self.headers = {"location": location} if location else {}
+        self.is_redirect = location is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """按 (method, url) 返回预设结果；值为异常时抛出"""
+    def __init__(self, routes):
+        self.routes = routes
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url))
+        result = self.routes.get((method, url), FakeResponse(200))
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+
+@pytest.fixture
+def dns(monkeypatch):
+    """host -> IP；未列出的主机视为不存在 (NXDOMAIN)"""
+    table = {"doi.org": "104.18.0.1", "example.org": "93.184.216.34", "internal.test": "10.0.0.5",
+             "meta.test": "169.254.169.254"}
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        try:
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (str(ipaddress.ip_address(host)), port or 0))]
+        except ValueError:
+            pass
+        if host not in table:
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (table[host], port or 0))]
+
+    monkeypatch.setattr(links.socket, "getaddrinfo", getaddrinfo)
+    monkeypatch.setattr(links, "_dns_state", {"ok": None, "checked": 0.0})
+    return table
+
+
+@pytest.fixture
+def session(monkeypatch):
+    def install(routes):
+        fake = FakeSession(routes)
+        monkeypatch.setattr(links, "_get_session", lambda: fake)
+        return fake
+    return install
+
+
+def test_ok_and_dead_codes(dns, session):
+    session({("HEAD", "https://example.org/gone"): FakeResponse(404), ("GET", "https://example.org/gone"): FakeResponse(404)})
+    assert links._probe("https://example.org/a") == ("ok", 200)
+    assert links._probe("https://example.org/gone") == ("dead", 404)
+
+
+def test_connection_error_on_head_falls_back_to_get(dns, session):
+    fake = session({("HEAD", "https://example.org/a"): requests.ConnectionError("reset")})
+    assert links._probe("https://example.org/a") == ("ok", 200)
+    assert fake.calls == [("HEAD", "https://example.org/a"), ("GET", "https://example.org/a")]
+
+
+def test_network_errors_are_unknown(dns, session):
+    session({("HEAD", "https://example.org/a"): requests.ConnectionError("down"),
+             ("GET", "https://example.org/a"): requests.ConnectionError("down")})
+    assert links._probe("https://example.org/a") == ("unknown", None)
+
+
+def test_nxdomain_is_dead_only_when_dns_works(dns, session):
+    session({})
+    assert links._probe("https://no-such-host.test/x") == ("dead", None)
+    del dns["doi.org"]   # canary 也解析失败：本机 DNS 不可用
+    links._dns_state["ok"] = None
+    assert links._probe("https://no-such-host.test/x") == ("unknown", None)
+
+
+@pytest.mark.parametrize("url", ["http://127.0.0.1:8501/", "http://localhost/", "http://internal.test/",
+                                 "http://meta.test/latest/meta-data/", "http://[::1]/", "file:///etc/passwd"])
+def test_non_public_targets_are_not_requested(dns, session, url):
+    dns["localhost"] = "127.0.0.1"
+    fake = session({})
+    assert links._probe(url) == ("unknown", None)
+    assert fake.calls == []
+
+
+def test_redirect_to_internal_is_not_followed(dns, session):
+    fake = session({("HEAD", "https://example.org/r"): FakeResponse(302, "http://meta.test/"),
+                    ("GET", "https://example.org/r"): FakeResponse(302, "http://meta.test/")})
+    assert links._probe("https://example.org/r") == ("unknown", None)
+    assert all("meta.test" not in url for _, url in fake.calls)
+
+
+def test_doi_resolver_errors_are_unknown(dns, session):
+    session({("GET", f"{links.DOI_RESOLVER}/10.1/x"): requests.ConnectionError("down")})
+    assert links._probe("doi:10.1/x") == ("unknown", None)
+
+
+def test_link_key():
+    assert links.link_key(doi="https://doi.org/10.1/ABC") == "doi:10.1/abc"
+    assert links.link_key(url="ftp://x") is None
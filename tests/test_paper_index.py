@@ -0,0 +1,57 @@
+import pytest
+
+from nuclear_check.paper_index import PaperIndex, normalize_doi, paper_key, search_terms, title_key
+
+PAPERS = [
+    {"title": "中国环流三号 可控核聚变 能量增益突破", "authors": "核工业西南物理研究院", "publication": "核聚变与等离子体物理",
+     "year": "2024", "summary": "HL-3 装置实现高约束模运行", "doi": "10.1/hl3", "url": "https://a.org/1"},
+    {"title": "Tokamak energy confinement scaling", "authors": "ITER Physics Basis", "publication": "Nuclear Fusion",
+     "year": "1999", "summary": "H-mode confinement database", "doi": "", "url": ""},
+    {"title": "压水堆 燃料组件 设计", "authors": "某某", "publication": "核动力工程", "year": "2020", "summary": "燃料棒",
+     "doi": "", "url": ""},
+]
+
+
+@pytest.fixture(params=[True, False], ids=["fts", "like"])
+def index(request):
+    idx = PaperIndex(":memory:")
+    if not request.param:
+        idx.has_fts = False
+    idx.upsert_many(PAPERS)
+    yield idx
+    idx.close()
+
+
+@pytest.mark.parametrize("query", ["2024年可控核聚变突破性进展", "核聚变突破", "可控核聚变", "HL-3"])
+def test_unspaced_chinese_queries_hit(index, query):
+    hits = index.search(query)
+    assert hits and hits[0]["doi"] == "10.1/hl3"
+
+
+def test_english_and_short_terms(index):
+    assert index.search("confinement")[0]["title"].startswith("Tokamak")
+    assert index.search("燃料")[0]["title"].startswith("压水堆")
+    assert index.search("   ") == []
+
+
+def test_search_terms():
+    fts, like = search_terms("核聚变突破 ITER")
+    assert fts == ["核聚变", "聚变突", "变突破", "ITER"]
+    assert like == ["核聚", "聚变", "变突", "突破", "ITER"]
+    assert search_terms("堆") == ([], ["堆"])
+
+
+def test_upsert_dedupes_by_doi_and_title():
+    idx = PaperIndex(":memory:")
+    idx.upsert_many(PAPERS)
+    idx.upsert_many([{"title": "x", "doi": "https://doi.org/10.1/HL3"},
+                     {"title": "Tokamak energy confinement scaling (托卡马克)", "year": "1999", "summary": ""}])
+    assert idx.count() == 3
+    assert idx.lookup({"doi": "10.1/hl3"})["seen_count"] == 2
+
+
+def test_keys():
+    assert normalize_doi("doi: 10.1/ABC") == "10.1/abc" and normalize_doi("n/a") is None
+    assert title_key("Fusion Power (聚变功率)", "2024-01") == "fusionpower|2024"
+    assert paper_key({"doi": "https://doi.org/10.1/x", "title": "t"}) == "doi:10.1/x"
+    assert paper_key({"title": "T!", "year": 2020}) == "t|2020"
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from nuclear_check.parsing import parse_json_response, repair_json, split_rewrite
+from nuclear_check.schemas import validate_check
+
+PAPERS = {"overview": "综述", "papers": [{"title": "A", "year": "2024"}, {"title": "B", "year": "2023"}]}
+
+
+def test_parse_plain_and_fenced():
+    text = json.dumps(PAPERS, ensure_ascii=False)
+    assert parse_json_response(text) == PAPERS
+    assert parse_json_response(f"好的，以下是结果：\n```json\n{text}\n```") == PAPERS
+
+
+def test_parse_no_json():
+    assert parse_json_response("") is None
+    assert parse_json_response("没有任何 JSON") is None
+
+
+def test_repair_trailing_commas():
+    assert repair_json('{"a": [1, 2, ], "b": {"c": 3, }, }') == {"a": [1, 2], "b": {"c": 3}}
+
+
+def test_repair_raw_newlines_in_strings():
+    text = '[{"claim": "第一行\n第二行", "status": "正确\t"}]'
+    assert repair_json(text) == [{"claim": "第一行\n第二行", "status": "正确\t"}]
+
+
+def test_repair_stops_at_top_level_close():
+    assert repair_json('结果：[1, 2] 以上供参考 ]') == [1, 2]
+
+
+@pytest.mark.parametrize("cut", [40, 55, 70, 90])
+def test_repair_truncated_keeps_complete_items(cut):
+    text = json.dumps(PAPERS, ensure_ascii=False)[:cut]
+    data = repair_json(text)
+    assert isinstance(data, dict)
+    assert data["overview"] == "综述"
+    # 截断处之前的条目保留，半截的字符串值不保留
+    titles = [p["title"] for p in PAPERS["papers"]]
+    assert all(p.get("title") in titles for p in data.get("papers", []))
+
+
+def test_repair_truncated_inside_string():
+    # 没有可回退的位置时才补齐引号
+    assert repair_json('{"overview": "未完成的综') == {"overview": "未完成的综"}
+
+
+@pytest.mark.parametrize("tail", ['{"claim": "中国现在有5', '{"claim": "x", "status": "正'])
+def test_repair_truncated_check_item_is_not_a_verdict(tail):
+    item = {"claim": "中国现在有55座核电站", "status": "正确", "correction": "", "evidence_list": []}
+    text = json.dumps([item], ensure_ascii=False)[:-1] + ", " + tail
+    data, _ = validate_check(repair_json(text))
+    assert data == [item]
+
+
+def test_repair_truncated_after_key():
+    assert repair_json('{"overview": "x", "papers": [{"title": "A"}, {"title":') == {"overview": "x", "papers": [{"title": "A"}]}
+
+
+@pytest.mark.parametrize("text", ["[" * 2000 + "1", "[" * 3000, '{"a":' * 3000, "[" * 500 + "]" * 499])
+def test_repair_deep_nesting_does_not_raise(text):
+    assert repair_json(text) is None
+    parse_json_response(text)   # 不得抛出 RecursionError
+
+
+def test_repair_nothing_to_repair():
+    assert repair_json("") is None
+    assert repair_json("plain text") is None
+
+
+def test_split_rewrite():
+    assert split_rewrite("[REWRITE]\nabc\n\n[TRANSLATION]\n译文") == ("abc", "译文")
+    assert split_rewrite("只有正文") == ("只有正文", "")
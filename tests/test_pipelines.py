@@ -0,0 +1,45 @@
+from nuclear_check.pipelines import append_search_page
+
+
+def _result():
+    papers = [{"title": "A"}, {"title": "B"}]
+    return {"data": {"overview": "综述", "papers": papers}, "raw": "{}", "usage": {"feature": "search"},
+            "links": {"https://a": "ok"}, "pages": {"query": "q"}}
+
+
+def test_append_reuses_existing_papers():
+    res = _result()
+    page = {"data": {"papers": [{"title": "C"}]}, "raw": "{}", "usage": {"feature": "search_more"},
+            "links": {"https://c": "dead"}}
+    merged = append_search_page(res, page)
+    assert [p["title"] for p in merged["data"]["papers"]] == ["A", "B", "C"]
+    assert all(a is b for a, b in zip(merged["data"]["papers"], res["data"]["papers"]))
+    assert merged["data"]["overview"] == "综述"
+    assert merged["pages"] == {"query": "q", "added": [2, 1], "exhausted": False}
+    assert merged["usage"]["feature"] == "search_more"
+    assert merged["links"] == {"https://a": "ok", "https://c": "dead"}
+    # 原结果不被修改
+    assert len(res["data"]["papers"]) == 2 and "added" not in res["pages"]
+
+
+def test_append_empty_page_marks_exhausted():
+    merged = append_search_page(_result(), {"data": {"papers": []}, "raw": "{}"})
+    assert merged["pages"]["exhausted"] is True
+    assert merged["pages"]["added"] == [2, 0]
+    assert merged["usage"]["feature"] == "search"   # 缓存的续页不带 usage
+
+
+def test_append_dedupes_listed_papers():
+    page = {"data": {"papers": [{"title": "B"}, {"title": "C", "doi": "10.1/c"}, {"title": "C2", "doi": "https://doi.org/10.1/C"}]},
+            "raw": "{}"}
+    merged = append_search_page(_result(), page)
+    assert [p["title"] for p in merged["data"]["papers"]] == ["A", "B", "C"]
+    assert merged["pages"]["added"] == [2, 1]
+
+
+def test_append_unparsed_page_keeps_papers():
+    res = _result()
+    merged = append_search_page(res, {"data": None, "raw": "oops", "usage": {"feature": "search_more"}})
+    assert merged["data"] is res["data"]
+    assert "added" not in merged["pages"]
+    assert merged["usage"]["feature"] == "search_more"
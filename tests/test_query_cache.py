@@ -0,0 +1,75 @@
+import pytest
+
+from nuclear_check.query_cache import QueryCache, normalize_query, query_units, unit_overlap
+
+BASE = "可控核聚变 2024 突破"
+OTHERS = ["托卡马克 能量约束 纪录", "ITER 建设进度", "仿星器 W7-X 2023", "核电站 数量 2024",
+          "中国 核电 装机容量", "聚变 点火 NIF", "氚 增殖 包层"]
+
+
+@pytest.fixture(params=[0, len(OTHERS)], ids=["single", "populated"])
+def cache(request):
+    qc = QueryCache()
+    qc.put(BASE, {"data": "breakthrough"})
+    for q in OTHERS[:request.param]:
+        qc.put(q, {"data": q})
+    return qc
+
+
+def test_normalize_query():
+    assert normalize_query("２０２４年 可控核聚变的最新进展！") == "2024 可控核聚变"
+
+
+@pytest.mark.parametrize("query", ["2024年可控核聚变突破性进展", "可控核聚变突破 2024", "2024 可控核聚变 最新突破"])
+def test_rephrased_queries_hit(cache, query):
+    hit = cache.lookup(query)
+    assert hit is not None
+    assert hit[0] == {"data": "breakthrough"}
+    assert hit[1]["query"] == BASE
+
+
+@pytest.mark.parametrize("query", [
+    "可控核聚变 2024 失败", "可控核聚变 2024 挑战", "可控核聚变 2024 投资",   # 意图词不同
+    "可控核聚变 2023 突破",                                                   # 年份不同
+    "可控核聚变", "核裂变 2024 突破",
+])
+def test_different_intent_misses(cache, query):
+    assert cache.lookup(query) is None
+
+
+def test_unit_overlap():
+    assert unit_overlap(query_units(BASE), query_units("2024年可控核聚变突破性进展")) >= 0.8
+    assert unit_overlap(query_units(BASE), query_units("可控核聚变 2024 失败")) < 0.8
+    assert unit_overlap(set(), query_units(BASE)) == 0.0
+
+
+def test_ttl_and_capacity():
+    qc = QueryCache(ttl=-1)
+    qc.put(BASE, 1)
+    assert qc.lookup(BASE) is None and len(qc) == 0
+    qc = QueryCache(max_size=2)
+    for q in (BASE, OTHERS[0], OTHERS[1]):
+        qc.put(q, q)
+    assert len(qc) == 2 and qc.lookup(BASE) is None and qc.stats["evictions"] == 1
+
+
+def test_pages_follow_entry():
+    qc = QueryCache()
+    gen = qc.put(BASE, {"data": 1})
+    assert qc.lookup(BASE)[1]["generation"] == gen
+    qc.add_page(BASE, gen, 1, "skip")          # 页序号不连续时忽略
+    qc.add_page(BASE, gen, 0, "p1")
+    assert qc.page("可控核聚变突破 2024", gen, 0) is None   # 续页只按原查询精确查找
+    assert qc.page(BASE, gen, 0) == "p1" and qc.page(BASE, gen, 1) is None
+    assert qc.put(BASE, {"data": 2}) != gen    # 重新检索覆盖条目，续页一并失效
+    assert qc.page(BASE, gen, 0) is None
+
+
+def test_stale_session_page_not_attached_to_new_entry():
+    qc = QueryCache()
+    old = qc.put(BASE, {"data": "R1"})
+    new = qc.put(BASE, {"data": "R2"})         # 另一个会话 "重新检索"
+    qc.add_page(BASE, old, 0, "page built from R1")
+    assert qc.page(BASE, new, 0) is None and qc.page(BASE, old, 0) is None
+    qc.add_page(BASE, None, 0, "no generation")
+    assert qc.page(BASE, new, 0) is None
@@ -0,0 +1,50 @@
+from nuclear_check import render
+
+
+def _fav(category, content):
+    return render.favorite_item({"id": 1, "category": category, "title": "<b>标题</b>", "time": "2026-01-01", "content": content})
+
+
+def test_card_text_is_escaped():
+    html = render.paper_card({"title": "H<sub>2</sub> & <script>x</script>", "authors": "A", "summary": "第一行\n<tag>",
+                              "url": "javascript:alert(1)", "doi": '10.1/x"onmouseover="y'})
+    assert "<script>" not in html and "<sub>" not in html and "<tag>" not in html
+    assert "H&lt;sub&gt;2&lt;/sub&gt; &amp;" in html
+    assert "第一行<br>&lt;tag&gt;" in html
+    assert 'href="#"' in html                       # 非 http(s) 链接
+    assert '"onmouseover' not in html
+
+
+def test_check_card_escapes_evidence():
+    html = render.check_card({"claim": "<i>c</i>", "status": "错误", "correction": "x",
+                              "evidence_list": [{"source_name": "<b>s</b>", "content": "<img src=x>", "url": 'https://a.org/"x'}]})
+    assert "<img" not in html and "<b>s</b>" not in html and "<i>c</i>" not in html
+    assert 'href="https://a.org/&quot;x"' in html
+
+
+def test_rewrite_draft_is_literal_and_rewrite_keeps_markdown():
+    html = _fav("改写结果", {"draft": "a <sub>2</sub> **b**", "rewrite": "**粗体** 与 *斜体* [链接](https://a.org/p?q=1&r=2) <b>x</b>",
+                          "translation": "`code`"})
+    assert "&lt;b&gt;标题&lt;/b&gt;" in html
+    draft = html.split('class="fav-draft">')[1].split("</div>")[0]
+    assert draft == "a &lt;sub&gt;2&lt;/sub&gt; **b**"
+    assert "<b>粗体</b>" in html and "<i>斜体</i>" in html and "<code>code</code>" in html
+    assert '<a href="https://a.org/p?q=1&amp;r=2" target="_blank">链接</a>' in html
+    assert "&lt;b&gt;x&lt;/b&gt;" in html
+
+
+def test_markdown_link_rejects_other_schemes():
+    html = _fav("学术综述", "[点我](javascript:alert(1)) 2*3*4")
+    assert "<a " not in html and "javascript:alert(1)" in html
+
+
+def test_favorites_cached_by_id_beyond_old_limit():
+    favs = [{"id": f"f{i}", "category": "核查结论", "title": f"t{i}", "time": "", "content": "x"} for i in range(10000)]
+    first = [render.favorite_item(f) for f in favs]
+    assert all(a is b for a, b in zip(first, (render.favorite_item(f) for f in favs)))   # 第二轮全部命中
+
+
+def test_favorite_cache_detects_reused_id():
+    a = render.favorite_item({"id": "dup", "category": "c", "title": "甲", "time": "", "content": "x"})
+    b = render.favorite_item({"id": "dup", "category": "c", "title": "乙", "time": "", "content": "x"})
+    assert "甲" in a and "乙" in b
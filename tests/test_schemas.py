@@ -0,0 +1,65 @@
+from nuclear_check.schemas import generation_config, validate_check, validate_search, validate_search_more
+
+
+def test_generation_config():
+    assert generation_config("check")["responseMimeType"] == "application/json"
+    assert generation_config("search_more")["responseSchema"]["required"] == ["papers"]
+    assert generation_config("rewrite") is None
+
+
+def test_validate_check_normalizes_items():
+    data, errors = validate_check([
+        {"claim": "中国有 58 座核电站", "status": "错误", "correction": 55,
+         "evidence_list": [{"source_name": "IAEA", "content": "55"}, "bad"]},
+        {"status": "正确"},
+        {"claim": "无状态"},
+        {"claim": "旧格式", "status": "存疑 ", "correction": "", "evidence_quote": "q"},
+    ])
+    assert [d["claim"] for d in data] == ["中国有 58 座核电站", "旧格式"]
+    assert data[0]["correction"] == "55"
+    assert data[0]["evidence_list"] == [{"source_name": "IAEA", "content": "55", "url": "#"}]
+    assert data[1]["status"] == "存疑" and data[1]["evidence_list"] == []
+    assert errors == ["[1] 缺少 claim", "[2] 缺少 status, correction, evidence_list"]
+
+
+def test_validate_check_never_invents_status():
+    # 缺少 status 不补 "存疑"；不在枚举内的 status (截断成 "正") 不渲染为 ✅
+    data, errors = validate_check([
+        {"claim": "a", "correction": "", "evidence_list": []},
+        {"claim": "b", "status": "正", "correction": "", "evidence_list": []},
+    ])
+    assert data is None
+    assert errors == ["[0] 缺少 status", "[1] status 无效: '正'"]
+
+
+def test_validate_check_unwraps_dict():
+    item = {"claim": "c", "status": "正确", "correction": "", "evidence_list": []}
+    assert validate_check({"results": [item]})[0] == [item]
+    assert validate_check(item)[0] == [item]
+
+
+def test_validate_check_rejects_unusable():
+    assert validate_check(None)[0] is None
+    assert validate_check("text")[0] is None
+    assert validate_check([{"status": "正确"}])[0] is None
+
+
+def test_validate_search():
+    data, errors = validate_search({"overview": "综述", "papers": [{"title": "A", "year": 2024}, {"authors": "x"}]})
+    assert data["overview"] == "综述"
+    assert data["papers"] == [{"title": "A", "authors": "", "publication": "", "year": "2024", "summary": "", "doi": "", "url": ""}]
+    assert errors == ["[1] 缺少 title"]
+
+
+def test_validate_search_bare_list_and_empty():
+    assert validate_search([{"title": "A"}])[0]["papers"][0]["title"] == "A"
+    assert validate_search({"overview": "", "papers": []})[0] is None
+    assert validate_search({"overview": "只有综述", "papers": "bad"})[0]["papers"] == []
+    assert validate_search(None)[0] is None
+
+
+def test_validate_search_more():
+    assert validate_search_more({"papers": []}) == ({"papers": []}, [])
+    assert validate_search_more([{"title": "A"}])[0]["papers"][0]["title"] == "A"
+    assert validate_search_more({"overview": "x"})[0] is None
+    assert validate_search_more(None)[0] is None
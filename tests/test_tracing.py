@@ -0,0 +1,68 @@
+import os
+import threading
+
+import pytest
+
+from nuclear_check import tracing
+
+
+@pytest.fixture
+def enabled():
+    old = tracing.ENABLED
+    tracing.configure(True)
+    yield
+    tracing.configure(old)
+
+
+def test_concurrent_metrics_file_writes(enabled, tmp_path):
+    path = tmp_path / "metrics.prom"
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(20):
+                tracing.inc("nc_test_writes_total")
+                tracing.write_metrics_file(str(path))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert not errors
+    assert "nc_test_writes_total" in path.read_text(encoding="utf-8")
+    assert os.listdir(tmp_path) == ["metrics.prom"]   # 不残留临时文件
+
+
+def test_span_cleared_when_block_raises(enabled):
+    class Rerun(Exception):
+        pass
+
+    with pytest.raises(Rerun):
+        with tracing.span("render.test"):
+            assert tracing._current_span.get().name == "render.test"
+            raise Rerun()
+    assert tracing._current_span.get() is None
+    assert tracing.span_log[-1]["name"] == "render.test" and tracing.span_log[-1]["status"] == "error"
+
+
+def test_metrics_server_port_in_use_does_not_raise(enabled, monkeypatch, caplog):
+    import socket
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen()
+    port = sock.getsockname()[1]
+    monkeypatch.setattr(tracing, "_metrics_server", None)
+    monkeypatch.setattr(tracing, "_metrics_server_failed", False)
+    monkeypatch.setattr(tracing, "_warned", set())
+    try:
+        assert tracing.start_metrics_server(port) is None
+        assert tracing.start_metrics_server(port) is None   # 不再重试
+    finally:
+        sock.close()
+    assert tracing._metrics_server_failed
+    assert len([r for r in caplog.records if "metrics endpoint disabled" in r.message]) == 1
+
+
+def test_metrics_file_write_failure_does_not_raise(enabled, tmp_path):
+    tracing.write_metrics_file(str(tmp_path / "missing" / "metrics.prom"))
@@ -0,0 +1,15 @@
+from nuclear_check.usage import percentile, summarize_usage
+
+
+def test_percentile_nearest_rank():
+    assert percentile([3, None, 1, 2], 50) == 2
+    assert percentile([None], 95) is None
+
+
+def test_latency_percentiles_include_retries():
+    # 第一个模型 429 后退避 1s：最后一次尝试很快，但端到端超过 1s
+    records = [{"feature": "check", "attempts": 2, "latency_ms": 40.0, "total_ms": 1070.0, "total_tokens": 10},
+               {"feature": "check", "attempts": 1, "latency_ms": 50.0, "total_tokens": 10}]   # 旧记录没有 total_ms
+    row = summarize_usage(records, "feature")[0]
+    assert row["p50_ms"] == 50.0 and row["p95_ms"] == 1070.0
+    assert row["last_attempt_p50_ms"] == 40.0